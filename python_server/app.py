@@ -16,7 +16,11 @@ import secrets
 from dotenv import load_dotenv
 
 from python_server.data.storage import MemStorage
+from python_server.data.sqlite_storage import SqliteStorage
 from python_server.routes import register_all_routes
+from python_server.trading.alerts import PriceAlertMonitor
+from python_server.trading.evaluator import StrategyEvaluator
+from python_server.trading.paper import PaperTrader
 
 # Configure logging
 logging.basicConfig(
@@ -38,18 +42,47 @@ def create_app():
     app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=30)
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", secrets.token_hex(32))
     
+    # Service token for the market data feed's quote ingestion (unset disables it)
+    app.config["QUOTE_INGEST_TOKEN"] = os.getenv("QUOTE_INGEST_TOKEN")
+    
     # Enable CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
     # Initialize JWT
     jwt = JWTManager(app)
     
-    # Initialize storage
-    storage = MemStorage()
+    # Initialize storage ("memory" or "sqlite")
+    app.config["STORAGE_BACKEND"] = os.getenv("STORAGE_BACKEND", "memory").lower()
+    if app.config["STORAGE_BACKEND"] == "sqlite":
+        storage = SqliteStorage(os.getenv("SQLITE_PATH", "stockvision.db"))
+    else:
+        storage = MemStorage(
+            historical_dir=os.getenv("HISTORICAL_DATA_DIR"),
+            historical_writable=os.getenv("HISTORICAL_DATA_WRITABLE", "False").lower() in ["true", "1", "t", "yes"],
+            data_dir=os.getenv("STORAGE_DATA_DIR")
+        )
     
     # Register routes
     register_all_routes(app, storage)
     
+    # Evaluate active strategies on price changes and every interval (0 disables),
+    # optionally paper trading their signals
+    evaluation_interval = float(os.getenv("STRATEGY_EVALUATION_INTERVAL", "60"))
+    if evaluation_interval > 0:
+        paper_trading = os.getenv("PAPER_TRADING", "False").lower() in ["true", "1", "t", "yes"]
+        evaluator = StrategyEvaluator(storage, evaluation_interval,
+                                      trader=PaperTrader(storage) if paper_trading else None)
+        storage.add_price_listener(evaluator.notify)
+        evaluator.start()
+        app.extensions["strategy_evaluator"] = evaluator
+    
+    # Fire watchlist price alerts as prices change
+    if os.getenv("PRICE_ALERTS", "True").lower() in ["true", "1", "t", "yes"]:
+        alert_monitor = PriceAlertMonitor(storage)
+        storage.add_price_listener(alert_monitor.notify)
+        alert_monitor.start()
+        app.extensions["price_alert_monitor"] = alert_monitor
+    
     # Register error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -0,0 +1,88 @@
+"""
+Price alert benchmark for StockVisionPro API
+
+Lists a set of stocks and adds watchlist price alerts on them, half ABOVE
+and half BELOW, at prices spread around each stock's price. Then times
+ticks of quote batches that move every stock, each followed by a
+PriceAlertMonitor check of the moved stocks: finding the crossed alerts,
+holding them back and creating their notifications.
+
+Usage:
+
+    python -m python_server.benchmarks.alerts_benchmark --alerts 1000000 --stocks 1000 --ticks 20
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from python_server.data.storage import MemStorage
+from python_server.trading.alerts import PriceAlertMonitor
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=1000000)
+    parser.add_argument("--stocks", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--move", type=float, default=0.002, help="standard deviation of a tick's price move")
+    args = parser.parse_args()
+
+    storage = MemStorage()
+    rng = np.random.default_rng(0)
+    stock_ids = [f"bench-stock{i}" for i in range(args.stocks)]
+    for stock_id in stock_ids:
+        storage.create_stock({
+            "id": stock_id,
+            "symbol": stock_id.upper(),
+            "name": f"Benchmark Company {stock_id}",
+            "currentPrice": 100.0,
+            "dailyChange": 0.0,
+            "dailyChangePercent": 0.0,
+            "open": 100.0,
+            "high": 100.0,
+            "low": 100.0,
+            "previousClose": 100.0,
+            "volume": 0,
+            "exchange": "BENCH"
+        })
+
+    # Alert prices within 10% of the price, each user watching every stock
+    started = time.perf_counter()
+    prices = np.round(100 * (1 + rng.uniform(-0.1, 0.1, args.alerts)), 2).tolist()
+    for n, price in enumerate(prices):
+        storage.add_to_watchlist({
+            "userId": f"bench-user{n // args.stocks}",
+            "stockId": stock_ids[n % args.stocks],
+            "alertPrice": price,
+            "alertCondition": "ABOVE" if price > 100 else "BELOW"
+        })
+    print(f"{args.alerts:,} alerts on {args.stocks:,} stocks added in {time.perf_counter() - started:.1f} s")
+
+    monitor = PriceAlertMonitor(storage)
+
+    current = np.full(args.stocks, 100.0)
+    latencies = []
+    fired = 0
+    for _ in range(args.ticks):
+        current *= 1 + rng.normal(0, args.move, args.stocks)
+        storage.apply_quotes([
+            {"stockId": stock_id, "price": price} for stock_id, price in zip(stock_ids, current.tolist())
+        ])
+
+        tick_started = time.perf_counter()
+        fired += len(monitor.check(stock_ids))
+        latencies.append((time.perf_counter() - tick_started) * 1000)
+
+    print(f"  ticks moving all {args.stocks:,} stocks: {np.mean(latencies):.1f} ms mean, "
+          f"{np.median(latencies):.1f} ms median, {max(latencies):.1f} ms max")
+    print(f"  alerts fired: {fired:,} over {args.ticks} ticks ({fired / args.ticks:,.0f} per tick), "
+          f"{len(storage.notifications):,} notifications")
+
+if __name__ == "__main__":
+    main()
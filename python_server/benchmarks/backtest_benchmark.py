@@ -0,0 +1,126 @@
+"""
+Backtest benchmark for StockVisionPro API
+
+Fills storage with random-walk daily bars for a set of stocks, then times
+run_strategy_backtest for a trend-following strategy (SMA and RSI entry,
+RSI and trailing stop exits, stop loss) trading all of them. With
+--sweep, also times a parameter sweep of that many combinations across
+the process pool.
+
+Usage:
+
+    python -m python_server.benchmarks.backtest_benchmark --stocks 50 --years 10 --sweep 1000
+"""
+
+import argparse
+import logging
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from python_server.data.records import StrategyRecord
+from python_server.data.storage import MemStorage
+from python_server.trading.backtest import run_strategy_backtest
+from python_server.trading.indicators import indicator_cache
+from python_server.trading.sweep import run_sweep
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def build_storage(stocks: int, years: int) -> MemStorage:
+    """In-memory storage with stocks years of random-walk daily bars each"""
+    storage = MemStorage()
+    rng = np.random.default_rng(0)
+
+    # Weekdays only, like real trading days
+    days = np.arange(np.datetime64("2015-01-01"), np.datetime64("2015-01-01") + years * 365)
+    days = days[np.is_busday(days)]
+
+    for i in range(stocks):
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(days))))
+        open = close * (1 + rng.normal(0, 0.003, len(days)))
+        storage.historical_data.get_or_create(f"bench-stock{i}").extend(
+            days,
+            open,
+            np.maximum(open, close) * 1.005,
+            np.minimum(open, close) * 0.995,
+            close,
+            rng.integers(100000, 1000000, len(days))
+        )
+
+    return storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stocks", type=int, default=50)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sweep", type=int, default=0, help="sweep combinations to time")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    storage = build_storage(args.stocks, args.years)
+    strategy = StrategyRecord(
+        id="bench-strategy",
+        userId="bench-user",
+        name="Benchmark Trend Following",
+        indicators=[{"type": "SMA", "period": 50}, {"type": "RSI", "period": 14}],
+        entryConditions=[
+            {"indicator": "SMA", "condition": "PRICE_ABOVE_SMA"},
+            {"indicator": "RSI", "condition": "RSI_ABOVE", "value": 50}
+        ],
+        exitConditions=[
+            {"indicator": "TRAILING_STOP", "value": 10},
+            {"indicator": "RSI", "condition": "RSI_ABOVE", "value": 75}
+        ],
+        riskManagement={"stopLossPercent": 5},
+        targetStocks=[f"bench-stock{i}" for i in range(args.stocks)]
+    )
+
+    start_date = datetime(2015, 1, 1)
+    end_date = datetime(2015 + args.years, 1, 1)
+
+    # Cold runs compute every indicator; warm runs read them from the cache
+    timings = {"cold": [], "warm": []}
+    for _ in range(args.runs):
+        for temperature in ("cold", "warm"):
+            if temperature == "cold":
+                indicator_cache.invalidate()
+            started = time.perf_counter()
+            result = run_strategy_backtest(storage, strategy, start_date, end_date, 100000.0)
+            timings[temperature].append(time.perf_counter() - started)
+
+    print(f"{args.stocks} stocks x {args.years} years ({len(result.dates):,} trading days)")
+    for temperature, runs in timings.items():
+        print(f"  backtest ({temperature} indicators): {min(runs) * 1000:.1f} ms best, "
+              f"{np.median(runs) * 1000:.1f} ms median of {args.runs} runs")
+    print(f"  trades: {len(result.trades):,}, total return {result.total_return:.1f}%, "
+          f"Sharpe {result.sharpe_ratio:.2f}")
+
+    if args.sweep:
+        # RSI periods x stop-loss levels, at least args.sweep combinations
+        stop_losses = [2 + i * 0.5 for i in range(20)]
+        periods = list(range(5, 5 + -(-args.sweep // len(stop_losses))))
+        grid = {"indicators.RSI.period": periods, "riskManagement.stopLossPercent": stop_losses}
+
+        started = time.perf_counter()
+        first_result = None
+        results = 0
+        for event in run_sweep(storage, strategy, grid, start_date, end_date, 100000.0,
+                               max_workers=args.workers):
+            if event["type"] == "result":
+                results += 1
+                if first_result is None:
+                    first_result = time.perf_counter() - started
+        elapsed = time.perf_counter() - started
+
+        print(f"  sweep: {results:,} combinations on {args.workers} workers in {elapsed:.2f} s "
+              f"({results / elapsed:,.0f}/s), first result after {first_result * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Live strategy evaluation benchmark for StockVisionPro API
+
+Fills storage with random-walk daily bars, adds active strategies from
+many users that all trade the same stocks with a few RSI, SMA and MACD
+variants, then times evaluator ticks: each tick appends one bar to every
+stock and evaluates every strategy against it. With --paper, the
+signals are also paper traded, one batch of trades per tick.
+
+Usage:
+
+    python -m python_server.benchmarks.evaluator_benchmark --strategies 10000 --stocks 20 --ticks 20 --paper
+"""
+
+import argparse
+import logging
+
+import numpy as np
+
+from python_server.benchmarks.backtest_benchmark import build_storage
+from python_server.trading.evaluator import StrategyEvaluator
+from python_server.trading.paper import PaperTrader
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Condition variants the generated strategies pick from
+ENTRY_CONDITIONS = [
+    [{"indicator": "RSI", "condition": "RSI_BELOW", "value": 30}],
+    [{"indicator": "RSI", "condition": "RSI_ABOVE", "value": 50},
+     {"indicator": "SMA", "condition": "PRICE_ABOVE_SMA", "period": 50}],
+    [{"indicator": "MACD", "condition": "MACD_ABOVE_SIGNAL"}]
+]
+EXIT_CONDITIONS = [
+    [{"indicator": "RSI", "condition": "RSI_ABOVE", "value": 70}],
+    [{"indicator": "TRAILING_STOP", "value": 8}],
+    [{"indicator": "MACD", "condition": "MACD_BELOW_SIGNAL"}, {"indicator": "STOP_LOSS", "value": 5}]
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategies", type=int, default=10000)
+    parser.add_argument("--stocks", type=int, default=20)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--paper", action="store_true", help="paper trade the signals")
+    args = parser.parse_args()
+
+    storage = build_storage(args.stocks, args.years)
+    rng = np.random.default_rng(1)
+    stock_ids = [f"bench-stock{i}" for i in range(args.stocks)]
+
+    for i in range(args.strategies):
+        storage.create_user({
+            "id": f"bench-user{i}",
+            "username": f"bench-user{i}",
+            "email": f"bench-user{i}@example.com",
+            "fullName": f"Benchmark User {i}"
+        })
+        storage.create_strategy({
+            "userId": f"bench-user{i}",
+            "name": f"Benchmark Strategy {i}",
+            "entryConditions": ENTRY_CONDITIONS[i % len(ENTRY_CONDITIONS)],
+            "exitConditions": EXIT_CONDITIONS[i % len(EXIT_CONDITIONS)],
+            "riskManagement": {"stopLossPercent": 10},
+            "status": "ACTIVE",
+            "targetStocks": list(rng.choice(stock_ids, size=min(3, args.stocks), replace=False))
+        })
+
+    evaluator = StrategyEvaluator(storage, trader=PaperTrader(storage) if args.paper else None)
+
+    # The first tick computes every indicator over the whole history
+    first = evaluator.evaluate()
+
+    signals = 0
+    latencies = []
+    for _ in range(args.ticks):
+        for stock_id in stock_ids:
+            series = storage.historical_data.get(stock_id)
+            last = series.close[-1]
+            close = last * (1 + rng.normal(0.0003, 0.015))
+            storage.add_historical_data({
+                "stockId": stock_id,
+                "date": series.dates[-1] + np.timedelta64(1, "D"),
+                "open": last,
+                "high": max(last, close) * 1.005,
+                "low": min(last, close) * 0.995,
+                "close": close,
+                "volume": 500000
+            })
+        report = evaluator.evaluate(stock_ids)
+        signals += len(report.signals)
+        latencies.append(report.latency_ms)
+
+    print(f"{report.strategies:,} active strategies on {report.stocks} stocks")
+    print(f"  indicator requests per tick: {report.requests:,}, computed: {report.computations}")
+    print(f"  first tick (full indicator history): {first.latency_ms:.1f} ms")
+    print(f"  later ticks (one new bar per stock): {np.mean(latencies):.1f} ms mean, "
+          f"{np.median(latencies):.1f} ms median, {max(latencies):.1f} ms max")
+    print(f"  signals: {len(first.signals):,} on the first tick, {signals:,} over {args.ticks} ticks")
+    if args.paper:
+        closed = sum(strategy.performanceMetrics.get("live", {}).get("trades", 0)
+                     for strategy in storage.strategies)
+        print(f"  paper trading: {len(storage.transactions):,} transactions, {closed:,} closed round trips")
+
+if __name__ == "__main__":
+    main()
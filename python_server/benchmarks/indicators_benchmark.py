@@ -0,0 +1,73 @@
+"""
+Indicator benchmark for StockVisionPro API
+
+Times each indicator in trading/indicators.py over long random-walk
+series, two ways:
+
+- full: the vectorized computation over the whole series
+- append: extending a cached result by one new bar through
+  IndicatorCache, which advances the incremental state
+
+Usage:
+
+    python -m python_server.benchmarks.indicators_benchmark --bars 5000 --appends 1000
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from python_server.data.historical import HistoricalSeries
+from python_server.trading.indicators import INDICATORS, IndicatorCache
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def build_series(bars: int, extra: int) -> HistoricalSeries:
+    """A random-walk series with bars + extra daily bars"""
+    rng = np.random.default_rng(0)
+    count = bars + extra
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, count)))
+    series = HistoricalSeries("bench-stock", capacity=count)
+    series.extend(
+        np.arange(np.datetime64("2000-01-01"), np.datetime64("2000-01-01") + count),
+        close,
+        close * 1.01,
+        close * 0.99,
+        close,
+        np.full(count, 1000)
+    )
+    return series
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=5000)
+    parser.add_argument("--appends", type=int, default=1000)
+    args = parser.parse_args()
+
+    series = build_series(args.bars, args.appends)
+
+    for name, spec in INDICATORS.items():
+        window = series.window(0, args.bars)
+        started = time.perf_counter()
+        spec.compute(window.high, window.low, window.close, **spec.defaults)
+        full = time.perf_counter() - started
+
+        # Each request sees one more bar than the last
+        cache = IndicatorCache()
+        cache.get("bench-stock", name, None, window)
+        started = time.perf_counter()
+        for count in range(args.bars + 1, args.bars + args.appends + 1):
+            cache.get("bench-stock", name, None, series.window(0, count))
+        append = (time.perf_counter() - started) / args.appends
+
+        print(f"{name:>12}: full {full * 1000:7.2f} ms over {args.bars:,} bars, "
+              f"append {append * 1e6:6.1f} us per bar ({full / append:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Persistence benchmark for StockVisionPro API storage
+
+Builds a dataset of transactions and historical bars, then measures:
+
+- snapshot write time and size
+- durable write throughput (logged, fsynced create_transaction calls)
+  from one and from several writer threads
+- recovery time: snapshot load plus log replay
+
+Usage:
+
+    python -m python_server.benchmarks.persistence_benchmark \\
+        --transactions 2000000 --bars 20000000 --dir /var/tmp/svp-bench
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from python_server.data.persistence import StoragePersistence
+from python_server.data.storage import MemStorage
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def _directory_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def build_dataset(transactions: int, bars: int, stocks: int = 500) -> MemStorage:
+    """In-memory storage filled with synthetic transactions and bars"""
+    storage = MemStorage()
+    rng = np.random.default_rng(0)
+
+    for i in range(stocks):
+        storage.create_stock({
+            "id": f"bench-stock{i}",
+            "symbol": f"B{i:04d}",
+            "name": f"Benchmark Company {i}",
+            "currentPrice": 100.0,
+            "dailyChange": 0.0,
+            "dailyChangePercent": 0.0,
+            "open": 100.0,
+            "high": 100.0,
+            "low": 100.0,
+            "previousClose": 100.0,
+            "volume": 0,
+            "exchange": "BENCH"
+        })
+
+    start = datetime(2020, 1, 1)
+    prices = rng.uniform(10, 500, transactions)
+    quantities = rng.integers(1, 100, transactions)
+    for i in range(transactions):
+        price = float(prices[i])
+        quantity = int(quantities[i])
+        storage.create_transaction({
+            "userId": f"bench-user{i % 1000}",
+            "stockId": f"bench-stock{i % stocks}",
+            "type": "BUY" if i % 3 else "SELL",
+            "quantity": quantity,
+            "price": price,
+            "totalAmount": price * quantity,
+            "status": "COMPLETED",
+            "createdAt": start + timedelta(seconds=i)
+        })
+
+    per_stock = bars // stocks
+    if per_stock:
+        dates = np.datetime64("1990-01-01") + np.arange(per_stock)
+        for i in range(stocks):
+            close = rng.uniform(10, 500, per_stock)
+            storage.historical_data.get_or_create(f"bench-stock{i}").extend(
+                dates, close, close * 1.01, close * 0.99, close,
+                rng.integers(1000, 10 ** 7, per_stock)
+            )
+
+    return storage
+
+
+def measure_writes(storage: MemStorage, threads: int, seconds: float) -> float:
+    """Durable create_transaction calls per second across writer threads"""
+    counts = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def writer(index: int):
+        while time.perf_counter() < deadline:
+            storage.create_transaction({
+                "userId": f"bench-writer{index}",
+                "stockId": "bench-stock0",
+                "type": "BUY",
+                "quantity": 1,
+                "price": 100.0,
+                "totalAmount": 100.0,
+                "status": "COMPLETED"
+            })
+            counts[index] += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return sum(counts) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--bars", type=int, default=2000000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--dir", help="Data directory (default: a temporary directory)")
+    args = parser.parse_args()
+
+    # Recovery and snapshot timings are reported through the storage logger
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    directory = args.dir or tempfile.mkdtemp(prefix="svp-persistence-")
+    os.makedirs(directory, exist_ok=True)
+
+    try:
+        started = time.perf_counter()
+        storage = build_dataset(args.transactions, args.bars)
+        print(f"Built {args.transactions} transactions and {args.bars} bars "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        # Attach persistence to the prebuilt state; recovery of an empty
+        # directory writes the base snapshot
+        started = time.perf_counter()
+        storage._persistence = StoragePersistence(storage, directory, snapshot_bytes=1 << 40,
+                                                  snapshot_interval=3600)
+        storage._persistence.recover()
+        snapshot_size = _directory_size(directory)
+        print(f"Snapshot: {snapshot_size / 1e6:.1f} MB in {time.perf_counter() - started:.2f}s")
+
+        for threads in (1, args.threads):
+            rate = measure_writes(storage, threads, args.seconds)
+            print(f"Durable writes, {threads} thread(s): {rate:,.0f}/s")
+
+        logged = storage._persistence.wal.last_sequence
+        storage.close()
+        del storage
+
+        started = time.perf_counter()
+        recovered = MemStorage(data_dir=directory)
+        elapsed = time.perf_counter() - started
+        print(f"Startup with {logged} logged records to replay, including the new snapshot: {elapsed:.2f}s")
+        recovered.close()
+
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
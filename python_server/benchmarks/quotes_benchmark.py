@@ -0,0 +1,97 @@
+"""
+Quote ingestion benchmark for StockVisionPro API storage
+
+Lists a set of stocks, then times apply_quotes() on batches of
+random-walk quotes spread over them, some quoted by symbol and some
+carrying a volume, and reports the sustained quotes per second. A price
+listener counts the change events published.
+
+Usage:
+
+    python -m python_server.benchmarks.quotes_benchmark --stocks 5000 --batch 5000 --batches 50
+    python -m python_server.benchmarks.quotes_benchmark --dir /var/tmp/svp-bench   # with the write-ahead log
+    python -m python_server.benchmarks.quotes_benchmark --sqlite /var/tmp/svp-bench.db
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from python_server.data.storage import MemStorage
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stocks", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=5000, help="quotes per apply_quotes() call")
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--dir", help="enable MemStorage persistence in this directory")
+    parser.add_argument("--sqlite", help="benchmark SqliteStorage on this database file instead")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        from python_server.data.sqlite_storage import SqliteStorage
+        storage = SqliteStorage(args.sqlite)
+    else:
+        storage = MemStorage(data_dir=args.dir) if args.dir else MemStorage()
+
+    rng = np.random.default_rng(0)
+    prices = 100 * np.exp(rng.normal(0, 0.5, args.stocks))
+    for i in range(args.stocks):
+        if storage.get_stock(f"bench-stock{i}") is None:
+            storage.create_stock({
+                "id": f"bench-stock{i}",
+                "symbol": f"B{i:04d}",
+                "name": f"Benchmark Company {i}",
+                "currentPrice": float(prices[i]),
+                "dailyChange": 0.0,
+                "dailyChangePercent": 0.0,
+                "open": float(prices[i]),
+                "high": float(prices[i]),
+                "low": float(prices[i]),
+                "previousClose": float(prices[i]),
+                "volume": 0,
+                "marketCap": float(prices[i]) * 1e8,
+                "exchange": "BENCH"
+            })
+
+    events = []
+    storage.add_price_listener(events.append)
+
+    # Build every batch up front so only ingestion is timed
+    batches = []
+    volume = np.zeros(args.stocks, dtype=np.int64)
+    for _ in range(args.batches):
+        picks = rng.integers(0, args.stocks, args.batch)
+        prices[picks] *= 1 + rng.normal(0, 0.001, args.batch)
+        volume[picks] += rng.integers(100, 10000, args.batch)
+        batches.append([
+            {"symbol": f"B{i:04d}", "price": price, "volume": int(volume[i])} if n % 4 == 0
+            else {"stockId": f"bench-stock{i}", "price": price}
+            for n, (i, price) in enumerate(zip(picks.tolist(), prices[picks].tolist()))
+        ])
+
+    latencies = []
+    started = time.perf_counter()
+    for quotes in batches:
+        batch_started = time.perf_counter()
+        storage.apply_quotes(quotes)
+        latencies.append((time.perf_counter() - batch_started) * 1000)
+    elapsed = time.perf_counter() - started
+
+    total = args.batch * args.batches
+    print(f"{total:,} quotes on {args.stocks:,} stocks in batches of {args.batch:,}")
+    print(f"  {total / elapsed:,.0f} quotes/s")
+    print(f"  per batch: {np.mean(latencies):.1f} ms mean, {np.median(latencies):.1f} ms median, "
+          f"{max(latencies):.1f} ms max")
+    print(f"  change events published: {len(events)}")
+
+    storage.close()
+
+if __name__ == "__main__":
+    main()
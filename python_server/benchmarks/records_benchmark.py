@@ -0,0 +1,141 @@
+"""
+Storage record benchmark for StockVisionPro API
+
+Compares the slotted storage records (data/records.py) with the pydantic
+models they replace in MemStorage:
+
+- memory per row, measured with tracemalloc over many live rows
+- create throughput (building a row from a dict)
+- update throughput (the field stores update_account_balance and
+  update_stock make)
+
+Usage:
+
+    python -m python_server.benchmarks.records_benchmark --rows 200000
+"""
+
+import argparse
+import gc
+import logging
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from models.schemas import Stock, Transaction, User
+from python_server.data.records import StockRecord, TransactionRecord, UserRecord
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def _stock_data(i: int) -> Dict[str, Any]:
+    return {
+        "id": f"bench-stock{i}",
+        "symbol": f"B{i:06d}",
+        "name": f"Benchmark Company {i}",
+        "currentPrice": 100.0 + i % 50,
+        "dailyChange": 0.5,
+        "dailyChangePercent": 0.5,
+        "open": 100.0,
+        "high": 101.0,
+        "low": 99.0,
+        "previousClose": 99.5,
+        "volume": 1000 + i,
+        "marketCap": 1e9,
+        "sector": "Technology",
+        "exchange": "BENCH",
+        "updatedAt": datetime(2025, 1, 1)
+    }
+
+
+def _transaction_data(i: int) -> Dict[str, Any]:
+    return {
+        "id": f"bench-trans{i}",
+        "userId": f"bench-user{i % 1000}",
+        "stockId": f"bench-stock{i % 500}",
+        "type": "BUY" if i % 3 else "SELL",
+        "quantity": float(i % 100 + 1),
+        "price": 100.0,
+        "totalAmount": 100.0 * (i % 100 + 1),
+        "status": "COMPLETED",
+        "createdAt": datetime(2025, 1, 1),
+        "completedAt": datetime(2025, 1, 1)
+    }
+
+
+def _user_data(i: int) -> Dict[str, Any]:
+    return {
+        "id": f"bench-user{i}",
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "password": "x" * 60,
+        "fullName": f"Benchmark User {i}",
+        "createdAt": datetime(2025, 1, 1)
+    }
+
+
+# name -> (row data factory, pydantic model, record type, update function)
+CASES: Dict[str, Tuple[Callable[[int], Dict[str, Any]], type, type, Callable[[Any, int], None]]] = {
+    "Stock": (_stock_data, Stock, StockRecord, lambda row, i: (
+        setattr(row, "currentPrice", 100.0 + i), setattr(row, "updatedAt", datetime(2025, 1, 2)))),
+    "Transaction": (_transaction_data, Transaction, TransactionRecord, lambda row, i: (
+        setattr(row, "status", "FAILED"), setattr(row, "completedAt", None))),
+    "User": (_user_data, User, UserRecord, lambda row, i: (
+        setattr(row, "accountBalance", float(i)), setattr(row, "updatedAt", datetime(2025, 1, 2))))
+}
+
+
+def measure_memory(build: Callable[[Dict[str, Any]], Any], data: List[Dict[str, Any]]) -> float:
+    """Bytes allocated per live row"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = [build(item) for item in data]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Values a row shares with its input dict are not counted; copies are
+    per_row = (after - before) / len(rows)
+    del rows
+    return per_row
+
+
+def measure_rate(operation: Callable[[int], Any], count: int) -> float:
+    """Calls per second of operation(i) for i in range(count)"""
+    started = time.perf_counter()
+    for i in range(count):
+        operation(i)
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    for name, (factory, model, record_cls, update) in CASES.items():
+        data = [factory(i) for i in range(args.rows)]
+
+        model_bytes = measure_memory(lambda item: model(**item), data)
+        record_bytes = measure_memory(record_cls.from_dict, data)
+
+        model_creates = measure_rate(lambda i: model(**data[i]), args.rows)
+        record_creates = measure_rate(lambda i: record_cls.from_dict(data[i]), args.rows)
+
+        models = [model(**item) for item in data]
+        records = [record_cls.from_dict(item) for item in data]
+        model_updates = measure_rate(lambda i: update(models[i], i), args.rows)
+        record_updates = measure_rate(lambda i: update(records[i], i), args.rows)
+
+        print(f"{name}:")
+        print(f"  memory per row: {model_bytes:,.0f} B pydantic, {record_bytes:,.0f} B record "
+              f"({model_bytes / record_bytes:.1f}x)")
+        print(f"  creates: {model_creates:,.0f}/s pydantic, {record_creates:,.0f}/s record "
+              f"({record_creates / model_creates:.1f}x)")
+        print(f"  updates: {model_updates:,.0f}/s pydantic, {record_updates:,.0f}/s record "
+              f"({record_updates / model_updates:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Columnar historical price storage for StockVisionPro API
+
+Each stock's OHLCV history is held as contiguous NumPy arrays in date
+order. Reads hand out zero-copy views over those arrays instead of
+building one Python object per bar.
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Column layout shared by every series
+DATE_DTYPE = np.dtype("datetime64[D]")
+PRICE_DTYPE = np.dtype("float64")
+VOLUME_DTYPE = np.dtype("int64")
+PRICE_COLUMNS = ("open", "high", "low", "close")
+COLUMNS = ("dates",) + PRICE_COLUMNS + ("volume",)
+
+DateLike = Union[date, datetime, str, np.datetime64]
+
+
+def to_day(value: DateLike) -> np.datetime64:
+    """Convert a date-like value to a day-resolution datetime64"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, "D")
+
+
+class HistoricalWindow:
+    """A read-only, zero-copy view over a date range of one series"""
+
+    __slots__ = ("stock_id", "dates", "open", "high", "low", "close", "volume")
+
+    def __init__(self, stock_id: str, dates: np.ndarray, open: np.ndarray,
+                 high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                 volume: np.ndarray):
+        self.stock_id = stock_id
+        self.dates = dates
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def to_records(self, newest_first: bool = True) -> List[Dict[str, Any]]:
+        """Convert the window into a list of JSON-ready bar dicts"""
+        step = -1 if newest_first else 1
+        dates = np.datetime_as_string(self.dates[::step].astype("datetime64[s]")).tolist()
+
+        return [
+            {
+                "date": bar_date,
+                "open": bar_open,
+                "high": bar_high,
+                "low": bar_low,
+                "close": bar_close,
+                "volume": bar_volume
+            }
+            for bar_date, bar_open, bar_high, bar_low, bar_close, bar_volume in zip(
+                dates,
+                self.open[::step].tolist(),
+                self.high[::step].tolist(),
+                self.low[::step].tolist(),
+                self.close[::step].tolist(),
+                self.volume[::step].tolist()
+            )
+        ]
+
+
+def empty_window(stock_id: str) -> HistoricalWindow:
+    """A window with no bars, for stocks without history"""
+    return HistoricalWindow(
+        stock_id,
+        np.empty(0, dtype=DATE_DTYPE),
+        np.empty(0, dtype=PRICE_DTYPE),
+        np.empty(0, dtype=PRICE_DTYPE),
+        np.empty(0, dtype=PRICE_DTYPE),
+        np.empty(0, dtype=PRICE_DTYPE),
+        np.empty(0, dtype=VOLUME_DTYPE)
+    )
+
+
+class HistoricalSeries:
+    """Contiguous, date-ordered OHLCV arrays for a single stock
+
+    Arrays are over-allocated so that end-of-day appends are amortized
+    O(1). Only the first len(series) rows are valid.
+    """
+
+    def __init__(self, stock_id: str, capacity: int = 256):
+        self.stock_id = stock_id
+        self._size = 0
+        self._dates = np.empty(capacity, dtype=DATE_DTYPE)
+        self._open = np.empty(capacity, dtype=PRICE_DTYPE)
+        self._high = np.empty(capacity, dtype=PRICE_DTYPE)
+        self._low = np.empty(capacity, dtype=PRICE_DTYPE)
+        self._close = np.empty(capacity, dtype=PRICE_DTYPE)
+        self._volume = np.empty(capacity, dtype=VOLUME_DTYPE)
+
+        # Bumped on every write so cached derivations can detect staleness
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._dates)
+
+    # Column views over the valid rows
+    @property
+    def dates(self) -> np.ndarray:
+        return self._dates[:self._size]
+
+    @property
+    def open(self) -> np.ndarray:
+        return self._open[:self._size]
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._high[:self._size]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._low[:self._size]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._close[:self._size]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self._volume[:self._size]
+
+    @property
+    def first_date(self) -> Optional[np.datetime64]:
+        return self._dates[0] if self._size else None
+
+    @property
+    def last_date(self) -> Optional[np.datetime64]:
+        return self._dates[self._size - 1] if self._size else None
+
+    def _grow(self, min_capacity: int):
+        """Reallocate the columns with at least min_capacity rows"""
+        capacity = max(min_capacity, self.capacity * 2, 16)
+        for name in ("_dates", "_open", "_high", "_low", "_close", "_volume"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def _write_row(self, index: int, day: np.datetime64, open: float, high: float,
+                   low: float, close: float, volume: int):
+        """Write one bar into row index"""
+        self._dates[index] = day
+        self._open[index] = open
+        self._high[index] = high
+        self._low[index] = low
+        self._close[index] = close
+        self._volume[index] = volume
+
+    def append(self, bar_date: DateLike, open: float, high: float, low: float,
+               close: float, volume: int):
+        """Append an end-of-day bar
+
+        A bar for the last stored date replaces it (late corrections);
+        a bar dated before the last stored date is rejected.
+        """
+        day = to_day(bar_date)
+
+        if self._size and day <= self._dates[self._size - 1]:
+            if day == self._dates[self._size - 1]:
+                self._write_row(self._size - 1, day, open, high, low, close, volume)
+                self.version += 1
+                return
+            raise ValueError(
+                f"Bar for {day} is older than the last bar ({self._dates[self._size - 1]}) of {self.stock_id}"
+            )
+
+        if self._size == self.capacity:
+            self._grow(self._size + 1)
+
+        self._write_row(self._size, day, open, high, low, close, volume)
+        self._size += 1
+        self.version += 1
+
+    def extend(self, dates: np.ndarray, open: np.ndarray, high: np.ndarray,
+               low: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        """Bulk-append bars that are sorted and newer than the last stored bar"""
+        dates = np.asarray(dates).astype(DATE_DTYPE)
+        count = len(dates)
+        if not count:
+            return
+
+        if np.any(dates[1:] <= dates[:-1]):
+            raise ValueError("Bulk bars must be in strictly increasing date order")
+
+        if self._size and dates[0] <= self._dates[self._size - 1]:
+            raise ValueError(f"Bulk bars overlap the stored history of {self.stock_id}")
+
+        if self._size + count > self.capacity:
+            self._grow(self._size + count)
+
+        end = self._size + count
+        self._dates[self._size:end] = dates
+        self._open[self._size:end] = open
+        self._high[self._size:end] = high
+        self._low[self._size:end] = low
+        self._close[self._size:end] = close
+        self._volume[self._size:end] = volume
+        self._size = end
+        self.version += 1
+
+    def window(self, lo: int, hi: int) -> HistoricalWindow:
+        """Zero-copy view over rows [lo, hi)"""
+        return HistoricalWindow(
+            self.stock_id,
+            self._dates[lo:hi],
+            self._open[lo:hi],
+            self._high[lo:hi],
+            self._low[lo:hi],
+            self._close[lo:hi],
+            self._volume[lo:hi]
+        )
+
+    def slice(self, start: Optional[DateLike] = None,
+              end: Optional[DateLike] = None) -> HistoricalWindow:
+        """Zero-copy view of the bars dated within [start, end]"""
+        dates = self.dates
+        lo = 0 if start is None else int(np.searchsorted(dates, to_day(start), side="left"))
+        hi = self._size if end is None else int(np.searchsorted(dates, to_day(end), side="right"))
+        return self.window(lo, max(lo, hi))
+
+    def tail(self, count: int) -> HistoricalWindow:
+        """Zero-copy view of the most recent count bars"""
+        return self.window(max(0, self._size - count), self._size)
+
+
+class HistoricalStore:
+    """Per-stock collection of columnar historical series"""
+
+    def __init__(self):
+        self._series: Dict[str, HistoricalSeries] = {}
+
+    def __contains__(self, stock_id: str) -> bool:
+        return stock_id in self._series
+
+    def __iter__(self) -> Iterator[HistoricalSeries]:
+        return iter(self._series.values())
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def get(self, stock_id: str) -> Optional[HistoricalSeries]:
+        """Get a stock's series, if it has any history"""
+        return self._series.get(stock_id)
+
+    def get_or_create(self, stock_id: str) -> HistoricalSeries:
+        """Get a stock's series, creating an empty one if needed"""
+        series = self._series.get(stock_id)
+        if series is None:
+            series = self._series[stock_id] = HistoricalSeries(stock_id)
+        return series
+
+    def append(self, stock_id: str, bar_date: DateLike, open: float, high: float,
+               low: float, close: float, volume: int) -> HistoricalSeries:
+        """Append an end-of-day bar to a stock's series"""
+        series = self.get_or_create(stock_id)
+        series.append(bar_date, open, high, low, close, volume)
+        return series
+
+    def window(self, stock_id: str, start: Optional[DateLike] = None,
+               end: Optional[DateLike] = None) -> HistoricalWindow:
+        """Zero-copy view of a stock's bars within [start, end]"""
+        series = self._series.get(stock_id)
+        return series.slice(start, end) if series is not None else empty_window(stock_id)
+
+    def tail(self, stock_id: str, count: int) -> HistoricalWindow:
+        """Zero-copy view of a stock's most recent count bars"""
+        series = self._series.get(stock_id)
+        return series.tail(count) if series is not None else empty_window(stock_id)
@@ -0,0 +1,274 @@
+"""
+Memory-mapped on-disk format for historical price data
+
+Each stock's series lives in its own file:
+
+    header   64 bytes  magic, format version, capacity, count, data version
+    columns  6 x capacity x 8 bytes
+             dates (int64 days since epoch), open, high, low, close (float64),
+             volume (int64)
+
+Columns are stored back to back, each reserved to the full capacity, so
+an append only writes one slot per column and then bumps the count in the
+header. A small index.json in the same directory maps stock IDs to files.
+
+Files are opened with mmap, so a cold start only opens them and every
+worker process reading the same directory shares pages through the OS
+page cache. Only one process should open a directory writable.
+"""
+
+import json
+import logging
+import os
+import struct
+from typing import Dict, Optional
+
+import numpy as np
+
+from python_server.data.historical import (
+    DATE_DTYPE, PRICE_DTYPE, VOLUME_DTYPE,
+    HistoricalSeries, HistoricalStore
+)
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SVPOHLCV"
+FORMAT_VERSION = 1
+HEADER_SIZE = 64
+HEADER_STRUCT = struct.Struct("<8sII")  # magic, format version, reserved
+HEADER_FIELDS_OFFSET = 16  # uint64 capacity, count, data version
+INDEX_FILE = "index.json"
+FILE_SUFFIX = ".ohlcv"
+
+# Column order within a file
+FILE_COLUMNS = (
+    ("_dates", DATE_DTYPE),
+    ("_open", PRICE_DTYPE),
+    ("_high", PRICE_DTYPE),
+    ("_low", PRICE_DTYPE),
+    ("_close", PRICE_DTYPE),
+    ("_volume", VOLUME_DTYPE)
+)
+
+
+def _file_size(capacity: int) -> int:
+    """Size in bytes of a file reserving capacity rows"""
+    return HEADER_SIZE + len(FILE_COLUMNS) * capacity * 8
+
+
+def _padded_capacity(count: int) -> int:
+    """Capacity to reserve for count rows, leaving room for appends"""
+    return max(256, 1 << (count + count // 4).bit_length())
+
+
+def series_file_name(stock_id: str) -> str:
+    """File name of a stock's series within a store directory"""
+    return f"{stock_id}{FILE_SUFFIX}"
+
+
+def write_series_file(path: str, series: HistoricalSeries, capacity: Optional[int] = None):
+    """Write a series to path in the mapped file format
+
+    The file is written to a temporary name, fsynced and renamed into
+    place, so readers never see a partially written file.
+    """
+    count = len(series)
+    capacity = max(capacity or _padded_capacity(count), count, 1)
+
+    header = bytearray(HEADER_SIZE)
+    HEADER_STRUCT.pack_into(header, 0, MAGIC, FORMAT_VERSION, 0)
+    np.frombuffer(header, dtype="<u8", count=3, offset=HEADER_FIELDS_OFFSET)[:] = (
+        capacity, count, series.version
+    )
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for name, dtype in FILE_COLUMNS:
+            column = np.zeros(capacity, dtype=dtype)
+            column[:count] = getattr(series, name)[:count]
+            f.write(column.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+
+
+class MappedHistoricalSeries(HistoricalSeries):
+    """A HistoricalSeries whose columns are views into a memory-mapped file"""
+
+    def __init__(self, stock_id: str, path: str, writable: bool = False):
+        # Columns come from the file, so the in-memory constructor is skipped
+        self.stock_id = stock_id
+        self.path = path
+        self.writable = writable
+        self._map()
+
+    def _map(self):
+        """Map the file and point the column attributes at it"""
+        mode = "r+" if self.writable else "r"
+        self._mmap = np.memmap(self.path, dtype=np.uint8, mode=mode)
+        self._inode = os.stat(self.path).st_ino
+
+        magic, format_version, _ = HEADER_STRUCT.unpack_from(self._mmap[:HEADER_STRUCT.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a historical data file")
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} has unsupported format version {format_version}")
+
+        self._header = self._mmap[HEADER_FIELDS_OFFSET:HEADER_FIELDS_OFFSET + 24].view("<u8")
+        capacity = int(self._header[0])
+
+        if len(self._mmap) < _file_size(capacity):
+            raise ValueError(f"{self.path} is truncated")
+
+        offset = HEADER_SIZE
+        for name, dtype in FILE_COLUMNS:
+            column = self._mmap[offset:offset + capacity * 8].view(dtype)
+            setattr(self, name, column)
+            offset += capacity * 8
+
+    # Row count and data version live in the header, so readers in other
+    # processes see appends as soon as the writer publishes them
+    @property
+    def _size(self) -> int:
+        return int(self._header[1])
+
+    @_size.setter
+    def _size(self, value: int):
+        self._header[1] = value
+
+    @property
+    def version(self) -> int:
+        return int(self._header[2])
+
+    @version.setter
+    def version(self, value: int):
+        self._header[2] = value
+
+    def _grow(self, min_capacity: int):
+        """Rewrite the file with a larger reserved capacity and remap it"""
+        if not self.writable:
+            raise PermissionError(f"Historical data for {self.stock_id} is mapped read-only")
+
+        capacity = max(min_capacity, self.capacity * 2)
+        self.flush()
+        write_series_file(self.path, self, capacity)
+        self._map()
+
+        logger.info(f"Grew historical file for {self.stock_id} to {capacity} rows")
+
+    def _write_row(self, index: int, *args, **kwargs):
+        if not self.writable:
+            raise PermissionError(f"Historical data for {self.stock_id} is mapped read-only")
+        super()._write_row(index, *args, **kwargs)
+
+    def extend(self, *args, **kwargs):
+        if not self.writable:
+            raise PermissionError(f"Historical data for {self.stock_id} is mapped read-only")
+        super().extend(*args, **kwargs)
+
+    def flush(self):
+        """Flush written pages to disk"""
+        if self.writable:
+            self._mmap.flush()
+
+    def refresh(self):
+        """Remap the file if a writer has replaced it to grow its capacity"""
+        if os.stat(self.path).st_ino != self._inode:
+            self._map()
+
+
+class MappedHistoricalStore(HistoricalStore):
+    """A HistoricalStore backed by a directory of mapped series files"""
+
+    def __init__(self, directory: str, writable: bool = False):
+        super().__init__()
+        self.directory = directory
+        self.writable = writable
+
+    @classmethod
+    def open(cls, directory: str, writable: bool = False) -> "MappedHistoricalStore":
+        """Open every series listed in the directory's index"""
+        store = cls(directory, writable)
+
+        if writable:
+            os.makedirs(directory, exist_ok=True)
+
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                index = json.load(f)
+
+            for stock_id, entry in index["series"].items():
+                path = os.path.join(directory, entry["file"])
+                store._series[stock_id] = MappedHistoricalSeries(stock_id, path, writable)
+
+        logger.info(f"Mapped historical data for {len(store)} stocks from {directory}")
+
+        return store
+
+    def get_or_create(self, stock_id: str) -> HistoricalSeries:
+        """Get a stock's series, creating an empty file for it if needed"""
+        series = self._series.get(stock_id)
+        if series is not None:
+            return series
+
+        if not self.writable:
+            raise PermissionError(f"Historical data in {self.directory} is mapped read-only")
+
+        path = os.path.join(self.directory, series_file_name(stock_id))
+        write_series_file(path, HistoricalSeries(stock_id, capacity=0))
+        series = self._series[stock_id] = MappedHistoricalSeries(stock_id, path, writable=True)
+        self.write_index()
+
+        return series
+
+    def flush(self):
+        """Flush all written pages and the index to disk"""
+        for series in self._series.values():
+            series.flush()
+        if self.writable:
+            self.write_index()
+
+    def write_index(self):
+        """Rewrite index.json from the mapped series"""
+        write_store_index(self.directory, self._series)
+
+
+def write_store_index(directory: str, series_by_stock: Dict[str, HistoricalSeries]):
+    """Write the index.json that lists a directory's series files"""
+    index = {
+        "version": FORMAT_VERSION,
+        "series": {
+            stock_id: {
+                "file": series_file_name(stock_id),
+                "count": len(series),
+                "first": str(series.first_date) if len(series) else None,
+                "last": str(series.last_date) if len(series) else None
+            }
+            for stock_id, series in series_by_stock.items()
+        }
+    }
+
+    tmp_path = os.path.join(directory, f"{INDEX_FILE}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(directory, INDEX_FILE))
+
+
+def save_historical_store(store: HistoricalStore, directory: str):
+    """Write every series in a store to a directory in the mapped format"""
+    os.makedirs(directory, exist_ok=True)
+
+    series_by_stock = {}
+    for series in store:
+        write_series_file(os.path.join(directory, series_file_name(series.stock_id)), series)
+        series_by_stock[series.stock_id] = series
+
+    write_store_index(directory, series_by_stock)
+
+    logger.info(f"Saved historical data for {len(series_by_stock)} stocks to {directory}")
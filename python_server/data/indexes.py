@@ -0,0 +1,396 @@
+"""
+In-memory index structures for StockVisionPro API storage
+"""
+
+import bisect
+import logging
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+_sort_key = itemgetter(0)
+
+# Watchlist alertCondition values PriceAlertIndex checks
+ALERT_CONDITIONS = ("ABOVE", "BELOW")
+
+
+class SortedIndex:
+    """Item IDs kept ordered by a sort key, for range and top-N reads
+
+    Entries are (key, item_id) pairs in a sorted list. Lookups bisect and
+    updates are a bisect plus a list insert or delete, so reads never
+    need to sort.
+    """
+
+    # add_many() re-sorts once it moves more than 1/REBUILD_SHARE of the entries
+    REBUILD_SHARE = 8
+
+    def __init__(self):
+        self._entries: List[Tuple[Any, str]] = []
+        self._key_by_id: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._key_by_id
+
+    def key_of(self, item_id: str) -> Any:
+        """Current sort key of an item"""
+        return self._key_by_id.get(item_id)
+
+    def add(self, item_id: str, key: Any):
+        """Insert an item, or move it if it is already indexed"""
+        if item_id in self._key_by_id:
+            if self._key_by_id[item_id] == key:
+                return
+            self.discard(item_id)
+
+        bisect.insort(self._entries, (key, item_id))
+        self._key_by_id[item_id] = key
+
+    def add_many(self, items: Iterable[Tuple[str, Any]]):
+        """Insert or move many items at once (the last key given for an item wins)
+
+        Moving more than a small share of the entries one at a time costs
+        more than rebuilding the list, so large batches rebuild it.
+        """
+        key_by_id = self._key_by_id
+        changed = [(item_id, key) for item_id, key in dict(items).items()
+                   if item_id not in key_by_id or key_by_id[item_id] != key]
+
+        if len(changed) * self.REBUILD_SHARE <= len(self._entries):
+            for item_id, key in changed:
+                self.add(item_id, key)
+            return
+
+        # Drop the moved entries, then merge the two sorted runs
+        moved = {item_id for item_id, _ in changed}
+        key_by_id.update(changed)
+        entries = [entry for entry in self._entries if entry[1] not in moved]
+        entries.extend(sorted((key_by_id[item_id], item_id) for item_id in moved))
+        entries.sort()
+        self._entries = entries
+
+    def discard(self, item_id: str):
+        """Remove an item if it is indexed"""
+        if item_id not in self._key_by_id:
+            return
+
+        key = self._key_by_id.pop(item_id)
+        index = bisect.bisect_left(self._entries, (key, item_id))
+        if index < len(self._entries) and self._entries[index] == (key, item_id):
+            del self._entries[index]
+
+    def _bounds(self, lo: Optional[Any], hi: Optional[Any]) -> Tuple[int, int]:
+        """List positions covering keys within [lo, hi]"""
+        start = 0 if lo is None else bisect.bisect_left(self._entries, lo, key=_sort_key)
+        end = len(self._entries) if hi is None else bisect.bisect_right(self._entries, hi, key=_sort_key)
+        return start, max(start, end)
+
+    def count_range(self, lo: Optional[Any] = None, hi: Optional[Any] = None) -> int:
+        """Number of items with keys within [lo, hi]"""
+        start, end = self._bounds(lo, hi)
+        return end - start
+
+    def range(self, lo: Optional[Any] = None, hi: Optional[Any] = None) -> Iterator[str]:
+        """Iterate item IDs with keys within [lo, hi], in ascending key order"""
+        start, end = self._bounds(lo, hi)
+        for index in range(start, end):
+            yield self._entries[index][1]
+
+    def first(self, count: int) -> List[str]:
+        """Item IDs with the lowest keys, lowest first"""
+        return [item_id for _, item_id in self._entries[:count]]
+
+    def last(self, count: int) -> List[str]:
+        """Item IDs with the highest keys, highest first"""
+        if count <= 0:
+            return []
+        return [item_id for _, item_id in reversed(self._entries[-count:])]
+
+
+class PriceAlertIndex:
+    """Watchlist price alerts by stock, ordered by alert price
+
+    Each stock keeps its ABOVE and its BELOW alerts as sorted (alertPrice,
+    userId) lists, so the alerts a price move crosses are one bisected
+    slice: ABOVE alerts within (previous, price] on a rise, BELOW alerts
+    within [price, previous) on a fall. Nothing else is looked at.
+    """
+
+    def __init__(self):
+        self._alerts: Dict[str, Dict[str, List[Tuple[float, str]]]] = {}
+        self._alert_by_key: Dict[Tuple[str, str], Tuple[str, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._alert_by_key)
+
+    def add(self, user_id: str, stock_id: str, condition: Optional[str], price: Optional[float]):
+        """Index a user's alert on a stock, replacing any previous one
+
+        An alert without a price or with an unknown condition is only
+        removed.
+        """
+        self.discard(user_id, stock_id)
+        if price is None or condition not in ALERT_CONDITIONS:
+            return
+
+        alerts = self._alerts.get(stock_id)
+        if alerts is None:
+            alerts = self._alerts[stock_id] = {name: [] for name in ALERT_CONDITIONS}
+        bisect.insort(alerts[condition], (price, user_id))
+        self._alert_by_key[user_id, stock_id] = (condition, price)
+
+    def discard(self, user_id: str, stock_id: str):
+        """Remove a user's alert on a stock if it is indexed"""
+        alert = self._alert_by_key.pop((user_id, stock_id), None)
+        if alert is None:
+            return
+
+        condition, price = alert
+        alerts = self._alerts[stock_id]
+        entries = alerts[condition]
+        index = bisect.bisect_left(entries, (price, user_id))
+        if index < len(entries) and entries[index] == (price, user_id):
+            del entries[index]
+        if not any(alerts.values()):
+            del self._alerts[stock_id]
+
+    def crossed(self, stock_id: str, previous: float, price: float) -> List[str]:
+        """IDs of the users whose alerts on a stock a move from previous to price crosses"""
+        alerts = self._alerts.get(stock_id)
+        if alerts is None or price == previous:
+            return []
+
+        if price > previous:
+            entries = alerts["ABOVE"]
+            start = bisect.bisect_right(entries, previous, key=_sort_key)
+            end = bisect.bisect_right(entries, price, key=_sort_key)
+        else:
+            entries = alerts["BELOW"]
+            start = bisect.bisect_left(entries, price, key=_sort_key)
+            end = bisect.bisect_left(entries, previous, key=_sort_key)
+        return [user_id for _, user_id in entries[start:end]]
+
+
+def substring_trigrams(text: str) -> Set[str]:
+    """Trigrams of text, used to find substring matches"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def fuzzy_trigrams(text: str) -> Set[str]:
+    """Padded trigrams of text, used for typo-tolerant similarity"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    """A node of the symbol prefix trie"""
+
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.ids: Set[str] = set()
+
+
+class StockSearchIndex:
+    """Prebuilt search index over stock symbols, names and descriptions
+
+    Matches are ranked in tiers: exact symbol, symbol prefix, name prefix,
+    then substring of symbol, name or description. When those do not fill
+    the page, stocks whose symbol and name are trigram-similar to the
+    query are added, which tolerates typos.
+    """
+
+    # Minimum share of the query's trigrams a fuzzy match must contain
+    FUZZY_THRESHOLD = 0.5
+
+    def __init__(self):
+        self._trie = _TrieNode()
+        self._names: List[Tuple[str, str]] = []  # sorted (lowercased name, stockId)
+        self._text_by_id: Dict[str, Tuple[str, str, str]] = {}  # symbol, name, description
+        self._substring_postings: Dict[str, Set[str]] = {}
+        self._fuzzy_postings: Dict[str, Set[str]] = {}
+        self._fuzzy_grams_by_id: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._text_by_id)
+
+    def add(self, stock_id: str, symbol: str, name: str, description: Optional[str] = None):
+        """Index a stock, replacing any previous entry for it"""
+        if stock_id in self._text_by_id:
+            self.discard(stock_id)
+
+        symbol = symbol.lower()
+        name = name.lower()
+        description = (description or "").lower()
+        self._text_by_id[stock_id] = (symbol, name, description)
+
+        # Symbol trie
+        node = self._trie
+        for char in symbol:
+            node = node.children.setdefault(char, _TrieNode())
+        node.ids.add(stock_id)
+
+        # Name prefix list
+        bisect.insort(self._names, (name, stock_id))
+
+        # Substring trigrams over all searchable text
+        for gram in substring_trigrams(symbol) | substring_trigrams(name) | substring_trigrams(description):
+            self._substring_postings.setdefault(gram, set()).add(stock_id)
+
+        # Similarity trigrams over symbol and name
+        grams = fuzzy_trigrams(symbol) | fuzzy_trigrams(name)
+        self._fuzzy_grams_by_id[stock_id] = grams
+        for gram in grams:
+            self._fuzzy_postings.setdefault(gram, set()).add(stock_id)
+
+    def discard(self, stock_id: str):
+        """Remove a stock from the index if present"""
+        text = self._text_by_id.pop(stock_id, None)
+        if text is None:
+            return
+
+        symbol, name, description = text
+
+        # Symbol trie (empty branches are left in place; they are cheap)
+        node = self._trie
+        for char in symbol:
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            node.ids.discard(stock_id)
+
+        # Name prefix list
+        index = bisect.bisect_left(self._names, (name, stock_id))
+        if index < len(self._names) and self._names[index] == (name, stock_id):
+            del self._names[index]
+
+        # Trigram postings
+        for postings, grams in (
+            (self._substring_postings,
+             substring_trigrams(symbol) | substring_trigrams(name) | substring_trigrams(description)),
+            (self._fuzzy_postings, self._fuzzy_grams_by_id.pop(stock_id, set()))
+        ):
+            for gram in grams:
+                ids = postings.get(gram)
+                if ids is not None:
+                    ids.discard(stock_id)
+                    if not ids:
+                        del postings[gram]
+
+    def _symbol_prefix_matches(self, query: str) -> Iterator[str]:
+        """Stocks whose symbol starts with query, shortest symbols first"""
+        node = self._trie
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return
+
+        level = [node]
+        while level:
+            next_level = []
+            for current in level:
+                yield from sorted(current.ids, key=lambda stock_id: self._text_by_id[stock_id][0])
+                next_level.extend(current.children[char] for char in sorted(current.children))
+            level = next_level
+
+    def _name_prefix_matches(self, query: str) -> Iterator[str]:
+        """Stocks whose name starts with query, alphabetically"""
+        index = bisect.bisect_left(self._names, (query,))
+        while index < len(self._names) and self._names[index][0].startswith(query):
+            yield self._names[index][1]
+            index += 1
+
+    def _substring_matches(self, query: str, limit: int) -> List[str]:
+        """Up to limit stocks with query inside their symbol or name, then
+        inside their description, alphabetically by name within each group"""
+        grams = substring_trigrams(query)
+        if not grams:
+            return []
+
+        # Intersect postings starting from the rarest trigram
+        postings = sorted((self._substring_postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates &= ids
+            if not candidates:
+                return []
+
+        # Broad queries walk the names in order and stop once the page
+        # is full; narrow ones rank their few candidates directly
+        if len(candidates) * 8 > len(self._names):
+            entries = ((name, stock_id) for name, stock_id in self._names if stock_id in candidates)
+        else:
+            entries = sorted((self._text_by_id[stock_id][1], stock_id) for stock_id in candidates)
+
+        # Trigram hits can be false positives, so confirm the substring
+        name_matches = []
+        description_matches = []
+        for name, stock_id in entries:
+            symbol, _, description = self._text_by_id[stock_id]
+            if query in symbol or query in name:
+                name_matches.append(stock_id)
+                if len(name_matches) >= limit:
+                    break
+            elif query in description and len(description_matches) < limit:
+                description_matches.append(stock_id)
+
+        return (name_matches + description_matches)[:limit]
+
+    def _fuzzy_matches(self, query: str) -> List[str]:
+        """Stocks whose symbol and name contain most of query's trigrams"""
+        grams = fuzzy_trigrams(query)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for stock_id in self._fuzzy_postings.get(gram, ()):
+                shared[stock_id] = shared.get(stock_id, 0) + 1
+
+        # Rank by share of query trigrams matched, then by how little
+        # extra text the stock carries
+        scored = []
+        for stock_id, count in shared.items():
+            similarity = count / len(grams)
+            if similarity >= self.FUZZY_THRESHOLD:
+                scored.append((-similarity, len(self._fuzzy_grams_by_id[stock_id]), stock_id))
+
+        scored.sort()
+        return [stock_id for _, _, stock_id in scored]
+
+    def search(self, query: str, limit: int = 10) -> List[str]:
+        """Ranked stock IDs matching query"""
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        results: List[str] = []
+        seen: Set[str] = set()
+
+        def collect(stock_ids) -> bool:
+            for stock_id in stock_ids:
+                if stock_id not in seen:
+                    seen.add(stock_id)
+                    results.append(stock_id)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        # Exact symbol and symbol prefix come out of the trie in that order
+        if collect(self._symbol_prefix_matches(query)):
+            return results
+
+        if collect(self._name_prefix_matches(query)):
+            return results
+
+        if collect(self._substring_matches(query, limit + len(results))):
+            return results
+
+        if len(query) >= 3:
+            collect(self._fuzzy_matches(query))
+
+        return results
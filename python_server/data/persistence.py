@@ -0,0 +1,466 @@
+"""
+Write-ahead log and snapshot persistence for StockVisionPro API storage
+
+Every successful mutating storage call is appended to a write-ahead log
+as (method name, arguments, timestamp) and made durable before the call
+returns. Concurrent writers share fsyncs: a background flusher writes and
+syncs whatever has accumulated since its last sync (group commit), so the
+fsync cost is amortized across all writers waiting on it.
+
+Periodically the primary collections are written to a compact binary
+snapshot and the log is rotated. On startup the latest valid snapshot is
+loaded and the log records after it are replayed through the same storage
+methods, so every derived index is rebuilt exactly as it was.
+
+Directory layout:
+
+    snapshot-<sequence>.bin  state after log record <sequence>
+    wal-<sequence>.log       log segment whose first record is <sequence>
+
+Log records are framed as (payload length, CRC32, sequence number) plus a
+pickled payload. A torn or corrupt record ends replay at the last good one.
+"""
+
+import functools
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct("<IIQ")  # payload length, crc32, sequence number
+SNAPSHOT_MAGIC = b"SVPSNAP1"
+SNAPSHOT_HEADER = struct.Struct("<8sQQI")  # magic, sequence, payload length, crc32
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".bin"
+SEGMENT_PREFIX = "wal-"
+SEGMENT_SUFFIX = ".log"
+
+# Take a snapshot once this much log has been written since the last one
+DEFAULT_SNAPSHOT_BYTES = 64 * 1024 * 1024
+
+# ... or once this many seconds have passed with any writes at all
+DEFAULT_SNAPSHOT_INTERVAL = 300.0
+
+
+def _snapshot_name(sequence: int) -> str:
+    return f"{SNAPSHOT_PREFIX}{sequence:020d}{SNAPSHOT_SUFFIX}"
+
+
+def _segment_name(sequence: int) -> str:
+    return f"{SEGMENT_PREFIX}{sequence:020d}{SEGMENT_SUFFIX}"
+
+
+def _list_sequenced(directory: str, prefix: str, suffix: str) -> List[Tuple[int, str]]:
+    """(sequence, path) of files named prefix<sequence>suffix, in sequence order"""
+    entries = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix):
+            try:
+                sequence = int(name[len(prefix):-len(suffix)])
+            except ValueError:
+                continue
+            entries.append((sequence, os.path.join(directory, name)))
+    return sorted(entries)
+
+
+def _fsync_directory(directory: str):
+    """Make file creations and renames in a directory durable"""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """Append-only, group-committed log of storage mutations
+
+    append() only buffers a record and returns its sequence number; wait()
+    blocks until that record is on disk. A single flusher thread writes and
+    fsyncs everything buffered since its previous sync in one go.
+    """
+
+    def __init__(self, directory: str, next_sequence: int):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._pending = threading.Condition(self._lock)
+        self._synced = threading.Condition(self._lock)
+        # Serializes file writes between the flusher and rotate()
+        self._io_lock = threading.Lock()
+
+        self._buffer: List[bytes] = []
+        self._next_sequence = next_sequence
+        self._durable_sequence = next_sequence - 1
+        self._bytes_since_rotate = 0
+        self._error: Optional[Exception] = None
+        self._closed = False
+
+        self._file = self._open_segment(next_sequence)
+
+        self._thread = threading.Thread(target=self._run, name="wal-flusher", daemon=True)
+        self._thread.start()
+
+    def _open_segment(self, first_sequence: int):
+        """Open a new segment file whose first record will be first_sequence
+
+        Any existing file of that name holds no intact records (they would
+        have been replayed or rotated past), so it is truncated.
+        """
+        path = os.path.join(self.directory, _segment_name(first_sequence))
+        segment = open(path, "wb")
+        _fsync_directory(self.directory)
+        return segment
+
+    @property
+    def bytes_since_rotate(self) -> int:
+        """Bytes appended since the last rotation"""
+        return self._bytes_since_rotate
+
+    @property
+    def last_sequence(self) -> int:
+        """Sequence number of the most recently appended record"""
+        return self._next_sequence - 1
+
+    def append(self, payload: bytes) -> int:
+        """Buffer a record for the next group commit and return its sequence"""
+        with self._lock:
+            if self._error is not None:
+                raise IOError(f"Write-ahead log is unusable: {self._error}")
+            if self._closed:
+                raise IOError("Write-ahead log is closed")
+
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            frame = RECORD_HEADER.pack(len(payload), zlib.crc32(payload), sequence) + payload
+            self._buffer.append(frame)
+            self._bytes_since_rotate += len(frame)
+            self._pending.notify()
+
+        return sequence
+
+    def wait(self, sequence: int):
+        """Block until the record with the given sequence is durable"""
+        with self._lock:
+            while self._durable_sequence < sequence and self._error is None:
+                self._synced.wait()
+            if self._durable_sequence < sequence:
+                raise IOError(f"Write-ahead log is unusable: {self._error}")
+
+    def _write_buffered(self):
+        """Write and fsync everything buffered so far (caller holds _io_lock)"""
+        with self._lock:
+            frames = self._buffer
+            self._buffer = []
+            last_sequence = self._next_sequence - 1
+            segment = self._file
+
+        if frames:
+            segment.write(b"".join(frames))
+            segment.flush()
+            os.fsync(segment.fileno())
+
+        with self._lock:
+            if last_sequence > self._durable_sequence:
+                self._durable_sequence = last_sequence
+            self._synced.notify_all()
+
+    def _run(self):
+        """Flusher loop: one write and one fsync per batch of records"""
+        while True:
+            with self._lock:
+                while not self._buffer and not self._closed:
+                    self._pending.wait()
+                if not self._buffer and self._closed:
+                    return
+
+            try:
+                with self._io_lock:
+                    self._write_buffered()
+            except Exception as e:
+                logger.error(f"Write-ahead log flush failed: {str(e)}")
+                with self._lock:
+                    self._error = e
+                    self._synced.notify_all()
+                return
+
+    def rotate(self) -> int:
+        """Sync and close the current segment and start a new one
+
+        Returns the sequence of the last record in the closed segments. The
+        caller must ensure no records are appended concurrently.
+        """
+        with self._io_lock:
+            self._write_buffered()
+            with self._lock:
+                last_sequence = self._next_sequence - 1
+                old_segment = self._file
+                self._file = self._open_segment(last_sequence + 1)
+                self._bytes_since_rotate = 0
+            old_segment.close()
+
+        return last_sequence
+
+    def close(self):
+        """Flush remaining records and stop the flusher"""
+        with self._lock:
+            self._closed = True
+            self._pending.notify()
+        self._thread.join()
+        self._file.close()
+
+
+def read_log(directory: str, after_sequence: int) -> Iterator[Tuple[int, bytes]]:
+    """Yield (sequence, payload) of every intact record after after_sequence
+
+    Records must follow each other without gaps. Reading stops at the first
+    torn or corrupt record, or at a gap in the sequence numbers.
+    """
+    expected = after_sequence + 1
+
+    for first_sequence, path in _list_sequenced(directory, SEGMENT_PREFIX, SEGMENT_SUFFIX):
+        if first_sequence > expected:
+            logger.warning(f"Write-ahead log is missing records {expected}..{first_sequence - 1}; "
+                           f"stopping replay")
+            return
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            length, checksum, sequence = RECORD_HEADER.unpack_from(data, offset)
+            start = offset + RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                logger.warning(f"Torn or corrupt record at offset {offset} of {path}; "
+                               f"ignoring the rest of this segment")
+                break
+
+            offset = start + length
+            if sequence < expected:
+                continue
+            if sequence > expected:
+                logger.warning(f"Unexpected record {sequence} in {path} (expected {expected}); "
+                               f"ignoring the rest of this segment")
+                break
+
+            yield sequence, payload
+            expected += 1
+
+
+def write_snapshot(directory: str, sequence: int, payload: bytes) -> str:
+    """Durably write a snapshot taken after log record sequence"""
+    path = os.path.join(directory, _snapshot_name(sequence))
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, sequence, len(payload), zlib.crc32(payload)))
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+    _fsync_directory(directory)
+
+    return path
+
+
+def load_latest_snapshot(directory: str) -> Optional[Tuple[int, bytes]]:
+    """(sequence, payload) of the newest intact snapshot, if any"""
+    for sequence, path in reversed(_list_sequenced(directory, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX)):
+        with open(path, "rb") as f:
+            header = f.read(SNAPSHOT_HEADER.size)
+            if len(header) < SNAPSHOT_HEADER.size:
+                logger.warning(f"Ignoring truncated snapshot {path}")
+                continue
+
+            magic, header_sequence, length, checksum = SNAPSHOT_HEADER.unpack(header)
+            payload = f.read(length)
+
+        if magic != SNAPSHOT_MAGIC or header_sequence != sequence or \
+                len(payload) < length or zlib.crc32(payload) != checksum:
+            logger.warning(f"Ignoring corrupt snapshot {path}")
+            continue
+
+        return sequence, payload
+
+    return None
+
+
+def prune(directory: str, sequence: int):
+    """Delete snapshots older than sequence and log segments it covers"""
+    for snapshot_sequence, path in _list_sequenced(directory, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX):
+        if snapshot_sequence < sequence:
+            os.remove(path)
+
+    # A segment is fully covered when the next segment starts at or before sequence + 1
+    segments = _list_sequenced(directory, SEGMENT_PREFIX, SEGMENT_SUFFIX)
+    for (_, path), (next_first, _) in zip(segments, segments[1:]):
+        if next_first <= sequence + 1:
+            os.remove(path)
+
+
+def logged_mutation(method: Callable) -> Callable:
+    """Record a storage method in the write-ahead log when it succeeds
+
+    The call always runs under the storage's write lock, so background
+    writers (the evaluator, paper trader and alert monitor) don't race
+    request threads. With persistence enabled it also runs with a fixed
+    clock, so every timestamp it sets can be reproduced on replay.
+    Arguments are logged after the call, which captures IDs the method
+    fills in. Calls that return None or False changed nothing and are not
+    logged; nested mutations are covered by the outermost call's record.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        persistence = self._persistence
+        if persistence is None:
+            with self._write_lock:
+                return method(self, *args, **kwargs)
+
+        with self._write_lock:
+            if self._clock is not None:
+                return method(self, *args, **kwargs)
+
+            self._clock = datetime.now()
+            try:
+                result = method(self, *args, **kwargs)
+                if result is None or result is False:
+                    return result
+                sequence = persistence.record(name, args, kwargs, self._clock)
+            finally:
+                self._clock = None
+
+        # Wait for the group commit outside the lock so other writers can join it
+        persistence.wait(sequence)
+
+        return result
+
+    return wrapper
+
+
+class StoragePersistence:
+    """Write-ahead log, snapshots and recovery for one storage instance"""
+
+    def __init__(self, storage, directory: str,
+                 snapshot_bytes: int = DEFAULT_SNAPSHOT_BYTES,
+                 snapshot_interval: float = DEFAULT_SNAPSHOT_INTERVAL):
+        self.storage = storage
+        self.directory = directory
+        self.snapshot_bytes = snapshot_bytes
+        self.snapshot_interval = snapshot_interval
+        self.wal: Optional[WriteAheadLog] = None
+
+        self._checkpoint_lock = threading.Lock()
+        self._checkpoint_requested = threading.Event()
+        self._stopping = False
+        self._checkpointer: Optional[threading.Thread] = None
+
+        os.makedirs(directory, exist_ok=True)
+
+    def recover(self):
+        """Load the latest snapshot, replay the log after it and start logging"""
+        started = time.perf_counter()
+        storage = self.storage
+
+        snapshot = load_latest_snapshot(self.directory)
+        last_sequence = 0
+        if snapshot is not None:
+            last_sequence, payload = snapshot
+            storage._restore_state(pickle.loads(payload))
+
+        replayed = 0
+        for sequence, payload in read_log(self.directory, last_sequence):
+            name, args, kwargs, timestamp = pickle.loads(payload)
+            with storage._write_lock:
+                storage._clock = timestamp
+                try:
+                    getattr(storage, name)(*args, **kwargs)
+                except Exception as e:
+                    logger.warning(f"Skipping log record {sequence} ({name}): {str(e)}")
+                finally:
+                    storage._clock = None
+            last_sequence = sequence
+            replayed += 1
+
+        logger.info(f"Recovered storage from {self.directory} "
+                    f"({'snapshot ' + str(snapshot[0]) if snapshot else 'no snapshot'}, "
+                    f"{replayed} log records) in {time.perf_counter() - started:.2f}s")
+
+        self.wal = WriteAheadLog(self.directory, last_sequence + 1)
+
+        # Give a fresh directory a base snapshot, and fold a replayed log into a new one
+        if snapshot is None or replayed:
+            self.checkpoint()
+
+        self._checkpointer = threading.Thread(target=self._run_checkpoints, name="storage-checkpointer",
+                                              daemon=True)
+        self._checkpointer.start()
+
+    def record(self, name: str, args: Tuple, kwargs: Dict[str, Any], timestamp: datetime) -> int:
+        """Append a mutation to the log and return its sequence"""
+        payload = pickle.dumps((name, args, kwargs, timestamp), protocol=pickle.HIGHEST_PROTOCOL)
+        sequence = self.wal.append(payload)
+
+        if self.wal.bytes_since_rotate >= self.snapshot_bytes:
+            self._checkpoint_requested.set()
+
+        return sequence
+
+    def wait(self, sequence: int):
+        """Block until a logged mutation is durable"""
+        self.wal.wait(sequence)
+
+    def checkpoint(self) -> int:
+        """Write a snapshot of the current state and drop the log it covers
+
+        Writers are blocked while the state is captured, which copies
+        every record's fields including nested containers; it is
+        serialized and written after the lock is released.
+        """
+        with self._checkpoint_lock:
+            storage = self.storage
+            with storage._write_lock:
+                state = storage._snapshot_state()
+                sequence = self.wal.rotate()
+
+            payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+            write_snapshot(self.directory, sequence, payload)
+            prune(self.directory, sequence)
+
+            logger.info(f"Wrote storage snapshot at record {sequence} ({len(payload)} bytes)")
+
+            return sequence
+
+    def _run_checkpoints(self):
+        """Take snapshots when enough log has built up or the interval passes"""
+        while True:
+            self._checkpoint_requested.wait(self.snapshot_interval)
+            self._checkpoint_requested.clear()
+            if self._stopping:
+                return
+
+            if self.wal.bytes_since_rotate:
+                try:
+                    self.checkpoint()
+                except Exception as e:
+                    logger.error(f"Storage snapshot failed: {str(e)}")
+
+    def close(self):
+        """Stop taking snapshots and flush the log"""
+        self._stopping = True
+        self._checkpoint_requested.set()
+        if self._checkpointer is not None:
+            self._checkpointer.join()
+        if self.wal is not None:
+            self.wal.close()
@@ -0,0 +1,158 @@
+"""
+Bulk quote ingestion for StockVisionPro API storage
+
+A quote is {"stockId": ... or "symbol": ..., "price": last trade price,
+"volume": session volume so far (optional)}. Storage apply_quotes() takes
+thousands of them per call:
+
+- parse_quotes() validates the batch into arrays, before anything changes
+- derive_quote_fields() matches the quotes to stocks and computes the new
+  Stock fields of every quoted stock with a few NumPy operations:
+    currentPrice        the stock's last quote in the batch
+    dailyChange         currentPrice - previousClose
+    dailyChangePercent  dailyChange as a percentage of previousClose
+    high / low          widened to the batch's highest and lowest quote
+    volume              the last volume quoted, else unchanged
+
+The storage then writes the fields back, updates its indexes once and
+publishes one price change for the whole batch.
+"""
+
+import logging
+from operator import attrgetter
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Stock fields apply_quotes() sets, in derive_quote_fields() column order
+QUOTE_FIELDS = ("currentPrice", "dailyChange", "dailyChangePercent", "high", "low", "volume")
+
+_NUMBER_TYPES = (int, float)
+
+
+class QuoteBatch(NamedTuple):
+    """Validated quotes as parallel columns"""
+    stock_ids: List[Optional[str]]
+    symbols: List[Optional[str]]
+    prices: np.ndarray
+    # -1 where a quote has no volume
+    volumes: np.ndarray
+
+
+class QuoteResult(NamedTuple):
+    """What an apply_quotes() call did"""
+    quotes: int
+    updated: List[str]
+    unknown: List[str]
+
+
+def parse_quotes(quotes: List[Dict[str, Any]]) -> QuoteBatch:
+    """Validate a list of quote dicts; raises ValueError naming the first bad one"""
+    if not isinstance(quotes, list):
+        raise ValueError("quotes must be a list")
+
+    stock_ids = []
+    symbols = []
+    prices = []
+    volumes = []
+    for position, quote in enumerate(quotes):
+        if not isinstance(quote, dict):
+            raise ValueError(f"Invalid quote {position + 1}: quote must be an object")
+
+        stock_id = quote.get("stockId")
+        symbol = quote.get("symbol")
+        if stock_id is not None:
+            if not isinstance(stock_id, str):
+                raise ValueError(f"Invalid quote {position + 1}: stockId must be a string")
+        elif not isinstance(symbol, str):
+            raise ValueError(f"Invalid quote {position + 1}: stockId or symbol is required")
+
+        price = quote.get("price")
+        if price.__class__ not in _NUMBER_TYPES or not 0 < price < float("inf"):
+            raise ValueError(f"Invalid quote {position + 1}: price must be a positive number")
+
+        volume = quote.get("volume")
+        if volume is None:
+            volume = -1
+        elif volume.__class__ is not int or volume < 0:
+            raise ValueError(f"Invalid quote {position + 1}: volume must be a non-negative integer")
+
+        stock_ids.append(stock_id)
+        symbols.append(symbol)
+        prices.append(price)
+        volumes.append(volume)
+
+    return QuoteBatch(
+        stock_ids,
+        symbols,
+        np.array(prices, dtype=np.float64),
+        np.array(volumes, dtype=np.int64)
+    )
+
+
+def derive_quote_fields(batch: QuoteBatch, stocks_by_id: Mapping[str, Any],
+                        stocks_by_symbol: Mapping[str, Any]) -> Tuple[List[Any], Dict[str, List], List[str]]:
+    """Match quotes to stocks and compute their new fields
+
+    stocks_by_symbol is keyed by upper-case symbol; the stocks need the
+    id, previousClose, high, low and volume attributes. Returns the quoted
+    stocks, each QUOTE_FIELDS column as a list in the same order, and the
+    stockIds or symbols that matched no stock.
+    """
+    stocks: List[Any] = []
+    slots: Dict[str, int] = {}
+    positions = []
+    matched = []
+    unknown = []
+    for index, (stock_id, symbol) in enumerate(zip(batch.stock_ids, batch.symbols)):
+        if stock_id is not None:
+            stock = stocks_by_id.get(stock_id)
+        else:
+            stock = stocks_by_symbol.get(symbol.upper())
+        if stock is None:
+            unknown.append(stock_id if stock_id is not None else symbol)
+            continue
+
+        slot = slots.get(stock.id)
+        if slot is None:
+            slot = slots[stock.id] = len(stocks)
+            stocks.append(stock)
+        positions.append(slot)
+        matched.append(index)
+
+    if not stocks:
+        return [], {name: [] for name in QUOTE_FIELDS}, unknown
+
+    count = len(stocks)
+    previous_close = np.fromiter(map(attrgetter("previousClose"), stocks), np.float64, count)
+    high = np.fromiter(map(attrgetter("high"), stocks), np.float64, count)
+    low = np.fromiter(map(attrgetter("low"), stocks), np.float64, count)
+    volume = np.fromiter(map(attrgetter("volume"), stocks), np.int64, count)
+
+    # Group each stock's quotes together, keeping their batch order
+    positions = np.array(positions, dtype=np.intp)
+    matched = np.array(matched, dtype=np.intp)
+    order = np.argsort(positions, kind="stable")
+    prices = batch.prices[matched[order]]
+    volumes = batch.volumes[matched[order]]
+    starts = np.flatnonzero(np.diff(positions[order], prepend=-1))
+    ends = np.append(starts[1:], len(order)) - 1
+
+    price = prices[ends]
+    change = price - previous_close
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_percent = np.where(previous_close > 0, change / previous_close * 100, 0.0)
+    high = np.maximum(high, np.maximum.reduceat(prices, starts))
+    batch_low = np.minimum.reduceat(prices, starts)
+    # A low of 0 means none was recorded yet
+    low = np.where(low > 0, np.minimum(low, batch_low), batch_low)
+
+    # Last quote per stock that carried a volume
+    quoted = np.maximum.reduceat(np.where(volumes >= 0, np.arange(len(volumes)), -1), starts)
+    volume = np.where(quoted >= 0, volumes[quoted], volume)
+
+    columns = (price, change, change_percent, high, low, volume)
+    return stocks, {name: column.tolist() for name, column in zip(QUOTE_FIELDS, columns)}, unknown
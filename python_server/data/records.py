@@ -0,0 +1,118 @@
+"""
+Compact internal records for StockVisionPro API storage
+
+MemStorage holds every row as a record: a slotted dataclass generated
+from the matching pydantic model in models/schemas.py. A record has the
+model's field names, defaults and model_dump() output, but no
+per-instance __dict__ and no validation, so internal writes such as
+update_account_balance are plain attribute stores.
+
+Records trust their input. Data from HTTP clients is validated with the
+pydantic request models at the route before it reaches storage.
+"""
+
+import logging
+from copy import deepcopy
+from dataclasses import field, make_dataclass
+from types import UnionType
+from typing import Any, ClassVar, Dict, FrozenSet, Tuple, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from models.schemas import (
+    User, Stock, AIRecommendation,
+    Watchlist, Portfolio, Strategy, Transaction,
+    Notification, ChatMessage
+)
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+class Record:
+    """Base class for slotted storage records"""
+
+    __slots__ = ()
+
+    # Set on each generated record type
+    schema: ClassVar[Type[BaseModel]]
+    field_names: ClassVar[Tuple[str, ...]]
+    field_set: ClassVar[FrozenSet[str]]
+    container_fields: ClassVar[Tuple[str, ...]]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Record":
+        """Build a record from a dict, ignoring keys that are not fields"""
+        field_set = cls.field_set
+        if data.keys() <= field_set:
+            return cls(**data)
+        return cls(**{key: value for key, value in data.items() if key in field_set})
+
+    def model_dump(self) -> Dict[str, Any]:
+        """Field values as a dict, like BaseModel.model_dump()"""
+        data = {name: getattr(self, name) for name in self.field_names}
+
+        # Nested containers are copied so callers can't mutate the stored row
+        for name in self.container_fields:
+            data[name] = deepcopy(data[name])
+
+        return data
+
+    def to_model(self) -> BaseModel:
+        """Convert to the pydantic model (without re-validating)"""
+        return self.schema.model_construct(**self.model_dump())
+
+
+def _is_container(annotation: Any) -> bool:
+    """Whether a field annotation is a dict or list, possibly Optional or in a Union"""
+    if annotation in (dict, list):
+        return True
+
+    origin = get_origin(annotation)
+    if origin is Union or origin is UnionType:
+        return any(_is_container(arg) for arg in get_args(annotation))
+    return origin in (dict, list)
+
+
+def record_type(model: Type[BaseModel]) -> Type[Record]:
+    """Generate the slotted record type for a pydantic model"""
+    fields = []
+    container_fields = []
+
+    for name, info in model.model_fields.items():
+        if info.default_factory is not None:
+            spec = field(default_factory=info.default_factory)
+        elif info.is_required():
+            spec = field()
+        elif isinstance(info.default, (dict, list)):
+            # Mutable defaults ({} and []) get a fresh copy per record
+            spec = field(default_factory=type(info.default))
+        else:
+            spec = field(default=info.default)
+
+        if _is_container(info.annotation):
+            container_fields.append(name)
+
+        fields.append((name, info.annotation, spec))
+
+    name = f"{model.__name__}Record"
+    cls = make_dataclass(name, fields, bases=(Record,), slots=True, kw_only=True)
+    cls.__module__ = __name__
+    cls.__doc__ = f"Storage record for {model.__name__}"
+    cls.schema = model
+    cls.field_names = tuple(model.model_fields)
+    cls.field_set = frozenset(cls.field_names)
+    cls.container_fields = tuple(container_fields)
+
+    return cls
+
+
+UserRecord = record_type(User)
+StockRecord = record_type(Stock)
+AIRecommendationRecord = record_type(AIRecommendation)
+WatchlistRecord = record_type(Watchlist)
+PortfolioRecord = record_type(Portfolio)
+StrategyRecord = record_type(Strategy)
+TransactionRecord = record_type(Transaction)
+NotificationRecord = record_type(Notification)
+ChatMessageRecord = record_type(ChatMessage)
@@ -0,0 +1,1264 @@
+"""
+SQLite storage backend for StockVisionPro API
+
+SqliteStorage implements the MemStorage interface on a local SQLite file,
+so datasets larger than RAM can be served and several worker processes
+can share one database without a network server. The file is opened in
+WAL mode, so readers never block the writer or each other.
+
+Each thread gets its own connection from a pool. All SQL is built once
+per table and reused verbatim, so sqlite3's per-connection statement
+cache keeps every statement prepared. Dict and list model fields are
+stored as JSON text and datetimes as ISO-8601 text with microseconds,
+which sorts chronologically.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import typing
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Type
+
+import numpy as np
+from pydantic import BaseModel
+
+from models.schemas import (
+    User, Stock, AIRecommendation,
+    Watchlist, Portfolio, Strategy, Transaction,
+    Notification, ChatMessage
+)
+from python_server.data.historical import (
+    DATE_DTYPE, PRICE_DTYPE, VOLUME_DTYPE,
+    HistoricalWindow, empty_window, to_day
+)
+from python_server.data.quotes import QUOTE_FIELDS, QuoteResult, derive_quote_fields, parse_quotes
+from python_server.data.storage import MemStorage, decode_transaction_cursor
+from python_server.trading.conditions import CompiledStrategy, compile_strategy
+from python_server.trading.paper import apply_fill, drop_position
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the schema below changes
+SCHEMA_VERSION = 1
+
+# Table name -> model stored in it (one column per model field)
+TABLE_MODELS: Dict[str, Type[BaseModel]] = {
+    "users": User,
+    "stocks": Stock,
+    "ai_recommendations": AIRecommendation,
+    "watchlists": Watchlist,
+    "portfolios": Portfolio,
+    "strategies": Strategy,
+    "transactions": Transaction,
+    "notifications": Notification,
+    "chat_messages": ChatMessage
+}
+
+# Extra table constraints
+TABLE_CONSTRAINTS = {
+    "watchlists": "UNIQUE (userId, stockId)",
+    "portfolios": "UNIQUE (userId, stockId)"
+}
+
+SCHEMA_EXTRAS = (
+    # Latest recommendation per stock, for top and per-stock reads
+    """CREATE TABLE IF NOT EXISTS latest_ai_recommendations (
+        stockId TEXT PRIMARY KEY,
+        id TEXT NOT NULL,
+        createdAt TEXT NOT NULL,
+        type TEXT NOT NULL,
+        confidence REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS historical_prices (
+        stockId TEXT NOT NULL,
+        date TEXT NOT NULL,
+        open REAL NOT NULL,
+        high REAL NOT NULL,
+        low REAL NOT NULL,
+        close REAL NOT NULL,
+        volume INTEGER NOT NULL,
+        PRIMARY KEY (stockId, date)
+    ) WITHOUT ROWID"""
+)
+
+SCHEMA_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_users_username ON users (username COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_users_email ON users (email COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_stocks_symbol ON stocks (symbol COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_stocks_sector ON stocks (sector)",
+    "CREATE INDEX IF NOT EXISTS idx_stocks_exchange ON stocks (exchange)",
+    "CREATE INDEX IF NOT EXISTS idx_stocks_price ON stocks (currentPrice)",
+    "CREATE INDEX IF NOT EXISTS idx_ai_stock_created ON ai_recommendations (stockId, createdAt, id)",
+    "CREATE INDEX IF NOT EXISTS idx_ai_type ON ai_recommendations (type)",
+    "CREATE INDEX IF NOT EXISTS idx_ai_sentiment ON ai_recommendations (sentiment)",
+    "CREATE INDEX IF NOT EXISTS idx_latest_ai_confidence ON latest_ai_recommendations (confidence)",
+    "CREATE INDEX IF NOT EXISTS idx_latest_ai_type_confidence ON latest_ai_recommendations (type, confidence)",
+    "CREATE INDEX IF NOT EXISTS idx_watchlists_stock ON watchlists (stockId)",
+    "CREATE INDEX IF NOT EXISTS idx_watchlists_alerts ON watchlists (stockId, alertCondition, alertPrice)",
+    "CREATE INDEX IF NOT EXISTS idx_portfolios_stock ON portfolios (stockId)",
+    "CREATE INDEX IF NOT EXISTS idx_strategies_user ON strategies (userId)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_user_created ON transactions (userId, createdAt, id)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_user_type_created ON transactions (userId, type, createdAt, id)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_stock ON transactions (stockId)",
+    "CREATE INDEX IF NOT EXISTS idx_notifications_user_created ON notifications (userId, createdAt)",
+    "CREATE INDEX IF NOT EXISTS idx_chat_messages_user_created ON chat_messages (userId, createdAt)"
+)
+
+# Columns behind the built-in get_top_stocks rankings
+STOCK_RANKING_COLUMNS = {
+    "performance": "dailyChangePercent",
+    "volume": "volume",
+    "market_cap": "marketCap",
+    "dailyChange": "dailyChange",
+    "dividendYield": "dividendYield"
+}
+
+
+def _column_type(annotation: Any) -> str:
+    """SQLite column affinity for a model field annotation"""
+    if typing.get_origin(annotation) is typing.Union:
+        annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+    if annotation is bool or annotation is int:
+        return "INTEGER"
+    if annotation is float:
+        return "REAL"
+    return "TEXT"
+
+
+def _is_json_field(annotation: Any) -> bool:
+    """Whether a model field holds a dict or list (stored as JSON)"""
+    return annotation in (dict, list) or typing.get_origin(annotation) in (dict, list)
+
+
+def _encode(value: Any) -> Any:
+    """Convert a model field value to its column value"""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="microseconds")
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _encode_datetime(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat(timespec="microseconds") if value is not None else None
+
+
+class _Table:
+    """Column layout and prebuilt SQL for one model table"""
+
+    def __init__(self, name: str, model: Type[BaseModel]):
+        self.name = name
+        self.model = model
+        self.fields = tuple(model.model_fields)
+        self.json_fields = tuple(
+            field for field, info in model.model_fields.items() if _is_json_field(info.annotation)
+        )
+
+        columns = ", ".join(self.fields)
+        placeholders = ", ".join("?" for _ in self.fields)
+        assignments = ", ".join(f"{field} = ?" for field in self.fields if field != "id")
+
+        self.create_sql = "CREATE TABLE IF NOT EXISTS {} ({}{})".format(
+            name,
+            ", ".join(
+                f"{field} {_column_type(info.annotation)}" + (" PRIMARY KEY" if field == "id" else "")
+                for field, info in model.model_fields.items()
+            ),
+            f", {TABLE_CONSTRAINTS[name]}" if name in TABLE_CONSTRAINTS else ""
+        )
+        self.insert_sql = f"INSERT INTO {name} ({columns}) VALUES ({placeholders})"
+        self.update_sql = f"UPDATE {name} SET {assignments} WHERE id = ?"
+        self.select_by_id_sql = f"SELECT * FROM {name} WHERE id = ?"
+
+    def values(self, item: BaseModel) -> List[Any]:
+        """Column values of a model instance, in column order"""
+        return [_encode(getattr(item, field)) for field in self.fields]
+
+    def update_values(self, item: BaseModel) -> List[Any]:
+        """Parameters for update_sql"""
+        return [_encode(getattr(item, field)) for field in self.fields if field != "id"] + [item.id]
+
+    def load(self, row: sqlite3.Row) -> BaseModel:
+        """Build a model instance from a row"""
+        data = dict(row)
+        for field in self.json_fields:
+            if data.get(field) is not None:
+                data[field] = json.loads(data[field])
+        return self.model.model_validate(data)
+
+
+TABLES = {name: _Table(name, model) for name, model in TABLE_MODELS.items()}
+
+
+class _QuotedStock(NamedTuple):
+    """The stock columns apply_quotes() derives the new fields from"""
+    id: str
+    symbol: str
+    previousClose: float
+    high: float
+    low: float
+    volume: int
+
+
+class ConnectionPool:
+    """One SQLite connection per thread, opened on first use"""
+
+    def __init__(self, path: str, cached_statements: int = 256):
+        self.path = path
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def get(self) -> sqlite3.Connection:
+        """The calling thread's connection"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode; writes open explicit transactions
+            connection = sqlite3.connect(
+                self.path,
+                timeout=30,
+                isolation_level=None,
+                cached_statements=self.cached_statements,
+                check_same_thread=False
+            )
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA temp_store = MEMORY")
+            connection.execute("PRAGMA cache_size = -65536")
+            connection.execute("PRAGMA mmap_size = 268435456")
+
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+
+        return connection
+
+    def close_all(self):
+        """Close every connection handed out by the pool"""
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+class SqliteStorage:
+    """SQLite storage implementation for StockVisionPro API
+
+    A drop-in replacement for MemStorage. A new database file is created
+    with the schema and, unless seed_sample_data is False, the same sample
+    data MemStorage starts with.
+    """
+
+    def __init__(self, path: str, seed_sample_data: bool = True):
+        """Open (and if needed create) the database at path"""
+        self.path = path
+        self._pool = ConnectionPool(path)
+
+        # Rankings registered at runtime with a Python key function
+        self._python_rankings: Dict[str, Callable[[Stock], Optional[float]]] = {}
+
+        # Compiled strategy conditions by strategy ID, with the updatedAt they were compiled at
+        self._compiled_strategies: Dict[str, Tuple[Optional[datetime], CompiledStrategy]] = {}
+
+        # Callbacks run with the IDs of stocks whose price or bars changed
+        self._price_listeners: List[Callable[[List[str]], None]] = []
+
+        self._initialize_schema(seed_sample_data)
+
+    def _initialize_schema(self, seed_sample_data: bool):
+        """Create tables and indexes, and seed a new database"""
+        with self._write() as connection:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                return
+
+            for table in TABLES.values():
+                connection.execute(table.create_sql)
+            for sql in SCHEMA_EXTRAS + SCHEMA_INDEXES:
+                connection.execute(sql)
+
+            if seed_sample_data:
+                self._seed(connection, MemStorage())
+
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        logger.info(f"Initialized SQLite storage schema in {self.path}")
+
+    def _seed(self, connection: sqlite3.Connection, source: MemStorage):
+        """Copy another storage's collections in with batched inserts"""
+        for name in TABLE_MODELS:
+            items = getattr(source, name)
+            if isinstance(items, dict):
+                items = items.values()
+            self._insert_many(connection, name, items)
+
+        for recommendation in source.ai_recommendations:
+            self._update_latest_recommendation(connection, recommendation)
+
+        bars = []
+        for series in source.historical_data:
+            for day, bar_open, bar_high, bar_low, bar_close, bar_volume in zip(
+                series.dates.astype(str).tolist(), series.open.tolist(), series.high.tolist(),
+                series.low.tolist(), series.close.tolist(), series.volume.tolist()
+            ):
+                bars.append((series.stock_id, day, bar_open, bar_high, bar_low, bar_close, bar_volume))
+        connection.executemany(
+            "INSERT OR REPLACE INTO historical_prices VALUES (?, ?, ?, ?, ?, ?, ?)", bars
+        )
+
+    def add_price_listener(self, listener: Callable[[List[str]], None]):
+        """Call listener with the stock IDs of every price or bar change
+
+        Only changes made through this instance are seen, not writes by
+        other processes sharing the database.
+        """
+        self._price_listeners.append(listener)
+
+    def _publish_prices(self, stock_ids: List[str]):
+        """Tell the price listeners which stocks changed"""
+        for listener in self._price_listeners:
+            try:
+                listener(stock_ids)
+            except Exception as e:
+                logger.error(f"Error in price listener: {str(e)}")
+
+    def close(self):
+        """Close all pooled connections"""
+        self._pool.close_all()
+
+    # Connection and row helpers
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Run a block in a write transaction (joins an enclosing one)"""
+        connection = self._pool.get()
+        if connection.in_transaction:
+            yield connection
+            return
+
+        # Take the write lock up front so read-modify-write blocks are atomic
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[sqlite3.Row]:
+        return self._pool.get().execute(sql, tuple(params)).fetchall()
+
+    def _load_all(self, table: str, sql: str, params: Iterable[Any] = ()) -> List[Any]:
+        loader = TABLES[table].load
+        return [loader(row) for row in self._query(sql, params)]
+
+    def _load_one(self, table: str, sql: str, params: Iterable[Any] = ()) -> Optional[Any]:
+        row = self._pool.get().execute(sql, tuple(params)).fetchone()
+        return TABLES[table].load(row) if row is not None else None
+
+    def _get_by_id(self, table: str, item_id: str) -> Optional[Any]:
+        return self._load_one(table, TABLES[table].select_by_id_sql, (item_id,))
+
+    def _insert(self, connection: sqlite3.Connection, table: str, item: BaseModel):
+        connection.execute(TABLES[table].insert_sql, TABLES[table].values(item))
+
+    def _insert_many(self, connection: sqlite3.Connection, table: str, items: Iterable[BaseModel]):
+        """Insert many rows with one prepared statement"""
+        spec = TABLES[table]
+        connection.executemany(spec.insert_sql, (spec.values(item) for item in items))
+
+    def _save(self, connection: sqlite3.Connection, table: str, item: BaseModel):
+        """Write every column of an existing row back"""
+        connection.execute(TABLES[table].update_sql, TABLES[table].update_values(item))
+
+    def _create(self, table: str, data: Dict[str, Any]) -> Any:
+        """Insert a new row built from data, generating an ID if needed"""
+        if "id" not in data:
+            data["id"] = str(uuid.uuid4())
+
+        item = TABLES[table].model(**data)
+        with self._write() as connection:
+            self._insert(connection, table, item)
+
+        return item
+
+    def _modify(self, table: str, item_id: str, apply: Callable[[Any], None]) -> Optional[Any]:
+        """Load a row, apply a change to its model and write it back"""
+        with self._write() as connection:
+            item = self._get_by_id(table, item_id)
+            if item is None:
+                return None
+            apply(item)
+            self._save(connection, table, item)
+        return item
+
+    @staticmethod
+    def _apply_fields(item: BaseModel, data: Dict[str, Any]):
+        """Set every known field in data on a model"""
+        for key, value in data.items():
+            if hasattr(item, key):
+                setattr(item, key, value)
+
+    # User methods
+    def get_user_by_username(self, username: str) -> Optional[User]:
+        """Get a user by username (case-insensitive)"""
+        return self._load_one("users", "SELECT * FROM users WHERE username = ? COLLATE NOCASE LIMIT 1",
+                              (username,))
+
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        """Get a user by email (case-insensitive)"""
+        return self._load_one("users", "SELECT * FROM users WHERE email = ? COLLATE NOCASE LIMIT 1", (email,))
+
+    def get_user(self, user_id: str) -> Optional[User]:
+        """Get a user by ID"""
+        return self._get_by_id("users", user_id)
+
+    def create_user(self, user_data: Dict[str, Any]) -> User:
+        """Create a new user"""
+        return self._create("users", user_data)
+
+    def update_user(self, user_id: str, user_data: Dict[str, Any]) -> Optional[User]:
+        """Update a user"""
+        def apply(user: User):
+            self._apply_fields(user, user_data)
+            user.updatedAt = datetime.now()
+
+        return self._modify("users", user_id, apply)
+
+    def update_account_balance(self, user_id: str, balance: float) -> Optional[User]:
+        """Update a user's account balance"""
+        def apply(user: User):
+            user.accountBalance = balance
+            user.updatedAt = datetime.now()
+
+        return self._modify("users", user_id, apply)
+
+    def update_last_login(self, user_id: str) -> Optional[User]:
+        """Update a user's last login time"""
+        def apply(user: User):
+            user.lastLogin = datetime.now()
+
+        return self._modify("users", user_id, apply)
+
+    # Stock methods
+    def get_all_stocks(self, limit: int = 100, offset: int = 0,
+                       sector: Optional[str] = None,
+                       exchange: Optional[str] = None,
+                       min_price: Optional[float] = None,
+                       max_price: Optional[float] = None) -> List[Stock]:
+        """Get all stocks with optional filtering, in listing order"""
+        return self._load_all(
+            "stocks",
+            "SELECT * FROM stocks "
+            "WHERE (?1 IS NULL OR sector = ?1) AND (?2 IS NULL OR exchange = ?2) "
+            "AND (?3 IS NULL OR currentPrice >= ?3) AND (?4 IS NULL OR currentPrice <= ?4) "
+            "ORDER BY rowid LIMIT ?5 OFFSET ?6",
+            (sector or None, exchange or None, min_price, max_price, limit, offset)
+        )
+
+    def get_stock(self, stock_id: str) -> Optional[Stock]:
+        """Get a stock by ID"""
+        return self._get_by_id("stocks", stock_id)
+
+    def get_stocks_by_ids(self, stock_ids: Iterable[str]) -> Dict[str, Stock]:
+        """Get the stocks with the given IDs, keyed by ID (missing IDs are omitted)"""
+        stock_ids = list(dict.fromkeys(stock_ids))
+        if not stock_ids:
+            return {}
+
+        found = {
+            stock.id: stock
+            for stock in self._load_all(
+                "stocks",
+                "SELECT * FROM stocks WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(stock_ids),)
+            )
+        }
+        return {stock_id: found[stock_id] for stock_id in stock_ids if stock_id in found}
+
+    def get_stock_by_symbol(self, symbol: str) -> Optional[Stock]:
+        """Get a stock by symbol (case-insensitive)"""
+        return self._load_one("stocks", "SELECT * FROM stocks WHERE symbol = ? COLLATE NOCASE LIMIT 1",
+                              (symbol,))
+
+    def create_stock(self, stock_data: Dict[str, Any]) -> Stock:
+        """Create a stock listing"""
+        return self._create("stocks", stock_data)
+
+    def update_stock(self, stock_id: str, stock_data: Dict[str, Any]) -> Optional[Stock]:
+        """Update a stock listing"""
+        def apply(stock: Stock):
+            self._apply_fields(stock, stock_data)
+            stock.updatedAt = datetime.now()
+
+        stock = self._modify("stocks", stock_id, apply)
+        if stock is not None and "currentPrice" in stock_data:
+            self._publish_prices([stock_id])
+        return stock
+
+    def apply_quotes(self, quotes: List[Dict[str, Any]]) -> QuoteResult:
+        """Apply a batch of quotes to the stocks they name (see data/quotes.py)
+
+        Reads the quoted stocks and writes their new fields in one
+        transaction. Raises ValueError for a malformed quote, before any
+        stock changes.
+        """
+        batch = parse_quotes(quotes)
+        stock_ids = json.dumps(list(dict.fromkeys(stock_id for stock_id in batch.stock_ids if stock_id is not None)))
+        symbols = json.dumps(list(dict.fromkeys(symbol.upper() for stock_id, symbol in
+                                                zip(batch.stock_ids, batch.symbols) if stock_id is None)))
+
+        with self._write() as connection:
+            stocks = [
+                _QuotedStock(*row) for row in connection.execute(
+                    "SELECT id, symbol, previousClose, high, low, volume FROM stocks "
+                    "WHERE id IN (SELECT value FROM json_each(?)) "
+                    "OR symbol COLLATE NOCASE IN (SELECT value FROM json_each(?))",
+                    (stock_ids, symbols)
+                )
+            ]
+            stocks, fields, unknown = derive_quote_fields(
+                batch,
+                {stock.id: stock for stock in stocks},
+                {stock.symbol.upper(): stock for stock in stocks}
+            )
+
+            now = _encode_datetime(datetime.now())
+            connection.executemany(
+                "UPDATE stocks SET currentPrice = ?, dailyChange = ?, dailyChangePercent = ?, "
+                "high = ?, low = ?, volume = ?, updatedAt = ? WHERE id = ?",
+                [(*values, now, stock.id)
+                 for stock, values in zip(stocks, zip(*(fields[name] for name in QUOTE_FIELDS)))]
+            )
+
+        updated = [stock.id for stock in stocks]
+        if updated:
+            self._publish_prices(updated)
+        return QuoteResult(len(batch.prices), updated, unknown)
+
+    def get_top_stocks(self, limit: int = 5,
+                       filter_by: str = "performance") -> List[Stock]:
+        """Get top stocks by a registered ranking (highest first)
+
+        Stocks without a value for the ranking are left out. An unknown
+        filter_by returns stocks in listing order.
+        """
+        column = STOCK_RANKING_COLUMNS.get(filter_by)
+        if column is not None:
+            return self._load_all(
+                "stocks",
+                f"SELECT * FROM stocks WHERE {column} IS NOT NULL ORDER BY {column} DESC, id DESC LIMIT ?",
+                (limit,)
+            )
+
+        key_fn = self._python_rankings.get(filter_by)
+        if key_fn is not None:
+            ranked = [(key_fn(stock), stock.id, stock)
+                      for stock in self._load_all("stocks", "SELECT * FROM stocks")]
+            ranked = sorted((entry for entry in ranked if entry[0] is not None), reverse=True)
+            return [stock for _, _, stock in ranked[:limit]]
+
+        return self._load_all("stocks", "SELECT * FROM stocks ORDER BY rowid LIMIT ?", (limit,))
+
+    def register_stock_ranking(self, name: str, key_fn: Callable[[Stock], Optional[float]]) -> None:
+        """Register a ranking for get_top_stocks under filter_by=name
+
+        Rankings computed in Python cannot use an index, so each read
+        scans the stocks table.
+        """
+        self._python_rankings[name] = key_fn
+
+    def search_stocks(self, query: str, limit: int = 10) -> List[Stock]:
+        """Search stocks by symbol, name or description
+
+        Results are ranked: exact symbol, symbol prefix, name prefix, then
+        substring of symbol or name, then of description. Queries shorter
+        than 3 characters only match prefixes. There is no typo-tolerant
+        tier; substring matches scan the table.
+        """
+        query = query.strip()
+        if not query or limit <= 0:
+            return []
+
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        prefix = f"{escaped}%"
+        contains = f"%{escaped}%" if len(query) >= 3 else prefix
+
+        return self._load_all(
+            "stocks",
+            "SELECT * FROM ("
+            "  SELECT *, CASE"
+            "    WHEN symbol = ?1 COLLATE NOCASE THEN 0"
+            "    WHEN symbol LIKE ?2 ESCAPE '\\' THEN 1"
+            "    WHEN name LIKE ?2 ESCAPE '\\' THEN 2"
+            "    WHEN symbol LIKE ?3 ESCAPE '\\' OR name LIKE ?3 ESCAPE '\\' THEN 3"
+            "    ELSE 4 END AS tier"
+            "  FROM stocks"
+            "  WHERE symbol LIKE ?3 ESCAPE '\\' OR name LIKE ?3 ESCAPE '\\'"
+            "     OR description LIKE ?3 ESCAPE '\\'"
+            ") ORDER BY tier, CASE WHEN tier = 1 THEN length(symbol) END,"
+            "  CASE WHEN tier = 1 THEN lower(symbol) ELSE lower(name) END"
+            " LIMIT ?4",
+            (query, prefix, contains, limit)
+        )
+
+    def get_unique_sectors(self) -> List[str]:
+        """Get all unique sectors"""
+        return [row[0] for row in self._query(
+            "SELECT DISTINCT sector FROM stocks WHERE sector IS NOT NULL AND sector != '' ORDER BY sector"
+        )]
+
+    def get_unique_exchanges(self) -> List[str]:
+        """Get all unique exchanges"""
+        return [row[0] for row in self._query("SELECT DISTINCT exchange FROM stocks ORDER BY exchange")]
+
+    # AI recommendation methods
+    def get_all_ai_suggestions(self, limit: int = 100, offset: int = 0,
+                              suggestion_type: Optional[str] = None,
+                              sentiment: Optional[str] = None) -> List[AIRecommendation]:
+        """Get all AI suggestions with optional filtering"""
+        return self._load_all(
+            "ai_recommendations",
+            "SELECT * FROM ai_recommendations "
+            "WHERE (?1 IS NULL OR type = ?1) AND (?2 IS NULL OR sentiment = ?2) "
+            "ORDER BY rowid LIMIT ?3 OFFSET ?4",
+            (suggestion_type.upper() if suggestion_type else None,
+             sentiment.upper() if sentiment else None, limit, offset)
+        )
+
+    def _ranked_suggestions(self, suggestion_type: Optional[str], limit: int) -> List[AIRecommendation]:
+        """Highest-confidence latest suggestions, optionally of one type"""
+        return self._load_all(
+            "ai_recommendations",
+            "SELECT r.* FROM latest_ai_recommendations l "
+            "JOIN ai_recommendations r ON r.id = l.id "
+            "WHERE (?1 IS NULL OR l.type = ?1) "
+            "ORDER BY l.confidence DESC, l.id DESC LIMIT ?2",
+            (suggestion_type, limit)
+        )
+
+    def get_top_ai_suggestions(self, limit: int = 5,
+                              suggestion_type: Optional[str] = None) -> List[AIRecommendation]:
+        """Get top AI suggestions based on confidence score
+
+        Only each stock's latest suggestion is ranked.
+        """
+        return self._ranked_suggestions(suggestion_type.upper() if suggestion_type else None, limit)
+
+    def get_stock_ai_suggestion(self, stock_id: str) -> Optional[AIRecommendation]:
+        """Get the latest AI suggestion for a specific stock"""
+        return self._load_one(
+            "ai_recommendations",
+            "SELECT r.* FROM latest_ai_recommendations l "
+            "JOIN ai_recommendations r ON r.id = l.id WHERE l.stockId = ?",
+            (stock_id,)
+        )
+
+    def get_stock_ai_suggestion_history(self, stock_id: str, limit: int = 100,
+                                        offset: int = 0) -> List[AIRecommendation]:
+        """Get a stock's AI suggestions, newest first"""
+        return self._load_all(
+            "ai_recommendations",
+            "SELECT * FROM ai_recommendations WHERE stockId = ? "
+            "ORDER BY createdAt DESC, id DESC LIMIT ? OFFSET ?",
+            (stock_id, limit, offset)
+        )
+
+    def get_suggestions_by_type(self, suggestion_type: str, limit: int = 10) -> List[AIRecommendation]:
+        """Get AI suggestions by type, highest confidence first
+
+        Only each stock's latest suggestion is ranked.
+        """
+        return self._ranked_suggestions(suggestion_type, limit)
+
+    def _update_latest_recommendation(self, connection: sqlite3.Connection,
+                                      recommendation: AIRecommendation):
+        """Make a recommendation its stock's latest if it is the newest"""
+        connection.execute(
+            "INSERT INTO latest_ai_recommendations (stockId, id, createdAt, type, confidence) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (stockId) DO UPDATE SET id = excluded.id, createdAt = excluded.createdAt, "
+            "type = excluded.type, confidence = excluded.confidence "
+            "WHERE (excluded.createdAt, excluded.id) > "
+            "(latest_ai_recommendations.createdAt, latest_ai_recommendations.id)",
+            (recommendation.stockId, recommendation.id, _encode_datetime(recommendation.createdAt),
+             recommendation.type, recommendation.confidence)
+        )
+
+    def create_ai_suggestion(self, suggestion_data: Dict[str, Any]) -> AIRecommendation:
+        """Record a new AI suggestion for a stock"""
+        if "id" not in suggestion_data:
+            suggestion_data["id"] = str(uuid.uuid4())
+
+        suggestion = AIRecommendation(**suggestion_data)
+        with self._write() as connection:
+            self._insert(connection, "ai_recommendations", suggestion)
+            self._update_latest_recommendation(connection, suggestion)
+
+        return suggestion
+
+    # Historical data methods
+    @staticmethod
+    def _window(stock_id: str, rows: List[sqlite3.Row]) -> HistoricalWindow:
+        """Build an oldest-first columnar window from bar rows"""
+        if not rows:
+            return empty_window(stock_id)
+
+        dates, opens, highs, lows, closes, volumes = zip(*rows)
+        return HistoricalWindow(
+            stock_id,
+            np.array(dates, dtype=DATE_DTYPE),
+            np.array(opens, dtype=PRICE_DTYPE),
+            np.array(highs, dtype=PRICE_DTYPE),
+            np.array(lows, dtype=PRICE_DTYPE),
+            np.array(closes, dtype=PRICE_DTYPE),
+            np.array(volumes, dtype=VOLUME_DTYPE)
+        )
+
+    def get_stock_historical_data(self, stock_id: str, days: int = 30,
+                                  start_date: Optional[datetime] = None,
+                                  end_date: Optional[datetime] = None) -> HistoricalWindow:
+        """Get historical data for a stock
+
+        Returns the bars dated within [start_date, end_date] when either
+        bound is given, otherwise the most recent days bars, as an
+        oldest-first columnar window.
+        """
+        if start_date is not None or end_date is not None:
+            rows = self._query(
+                "SELECT date, open, high, low, close, volume FROM historical_prices "
+                "WHERE stockId = ?1 AND (?2 IS NULL OR date >= ?2) AND (?3 IS NULL OR date <= ?3) "
+                "ORDER BY date",
+                (stock_id,
+                 str(to_day(start_date)) if start_date is not None else None,
+                 str(to_day(end_date)) if end_date is not None else None)
+            )
+        else:
+            rows = self._query(
+                "SELECT date, open, high, low, close, volume FROM historical_prices "
+                "WHERE stockId = ? ORDER BY date DESC LIMIT ?",
+                (stock_id, days)
+            )[::-1]
+
+        return self._window(stock_id, rows)
+
+    def add_historical_data(self, historical_data: Dict[str, Any]) -> HistoricalWindow:
+        """Append an end-of-day bar to a stock's history
+
+        A bar for the last stored date replaces it; a bar dated before the
+        last stored date is rejected.
+        """
+        stock_id = historical_data["stockId"]
+        day = str(to_day(historical_data["date"]))
+        bar = (day, float(historical_data["open"]), float(historical_data["high"]),
+               float(historical_data["low"]), float(historical_data["close"]), int(historical_data["volume"]))
+
+        with self._write() as connection:
+            last_day = connection.execute(
+                "SELECT max(date) FROM historical_prices WHERE stockId = ?", (stock_id,)
+            ).fetchone()[0]
+            if last_day is not None and day < last_day:
+                raise ValueError(f"Bar for {day} is older than the last bar ({last_day}) of {stock_id}")
+
+            connection.execute(
+                "INSERT OR REPLACE INTO historical_prices VALUES (?, ?, ?, ?, ?, ?, ?)", (stock_id,) + bar
+            )
+
+        self._publish_prices([stock_id])
+        return self._window(stock_id, [bar])
+
+    # Watchlist methods
+    def get_user_watchlist(self, user_id: str) -> List[Watchlist]:
+        """Get a user's watchlist"""
+        return self._load_all("watchlists", "SELECT * FROM watchlists WHERE userId = ? ORDER BY rowid", (user_id,))
+
+    def is_stock_in_watchlist(self, user_id: str, stock_id: str) -> bool:
+        """Check if a stock is in a user's watchlist"""
+        return bool(self._query("SELECT 1 FROM watchlists WHERE userId = ? AND stockId = ?", (user_id, stock_id)))
+
+    def _upsert_membership(self, table: str, data: Dict[str, Any]) -> Any:
+        """Insert a (userId, stockId) row, replacing any existing one"""
+        if "id" not in data:
+            data["id"] = str(uuid.uuid4())
+
+        spec = TABLES[table]
+        item = spec.model(**data)
+        with self._write() as connection:
+            connection.execute("DELETE FROM {} WHERE userId = ? AND stockId = ?".format(table),
+                               (item.userId, item.stockId))
+            self._insert(connection, table, item)
+
+        return item
+
+    def _get_membership(self, table: str, user_id: str, stock_id: str) -> Optional[Any]:
+        return self._load_one(table, "SELECT * FROM {} WHERE userId = ? AND stockId = ?".format(table),
+                              (user_id, stock_id))
+
+    def _modify_membership(self, table: str, user_id: str, stock_id: str,
+                           apply: Callable[[Any], None]) -> Optional[Any]:
+        with self._write() as connection:
+            item = self._get_membership(table, user_id, stock_id)
+            if item is None:
+                return None
+            apply(item)
+            self._save(connection, table, item)
+        return item
+
+    def add_to_watchlist(self, watchlist_data: Dict[str, Any]) -> Watchlist:
+        """Add a stock to a user's watchlist"""
+        return self._upsert_membership("watchlists", watchlist_data)
+
+    def update_watchlist_item(self, user_id: str, stock_id: str,
+                             alert_price: Optional[float],
+                             alert_condition: Optional[str]) -> Optional[Watchlist]:
+        """Update a watchlist item"""
+        def apply(item: Watchlist):
+            item.alertPrice = alert_price
+            item.alertCondition = alert_condition
+            item.updatedAt = datetime.now()
+
+        return self._modify_membership("watchlists", user_id, stock_id, apply)
+
+    def remove_from_watchlist(self, user_id: str, stock_id: str) -> bool:
+        """Remove a stock from a user's watchlist"""
+        with self._write() as connection:
+            cursor = connection.execute("DELETE FROM watchlists WHERE userId = ? AND stockId = ?",
+                                        (user_id, stock_id))
+        return cursor.rowcount > 0
+
+    def get_crossed_alerts(self, stock_id: str, previous_price: float, price: float) -> List[Watchlist]:
+        """Watchlist items whose price alert a move from previous_price to price crosses
+
+        A rise crosses ABOVE alerts in (previous_price, price], a fall BELOW
+        alerts in [price, previous_price); either is one range scan of
+        idx_watchlists_alerts.
+        """
+        if price > previous_price:
+            return self._load_all(
+                "watchlists",
+                "SELECT * FROM watchlists WHERE stockId = ? AND alertCondition = 'ABOVE' "
+                "AND alertPrice > ? AND alertPrice <= ? ORDER BY alertPrice",
+                (stock_id, previous_price, price)
+            )
+        if price < previous_price:
+            return self._load_all(
+                "watchlists",
+                "SELECT * FROM watchlists WHERE stockId = ? AND alertCondition = 'BELOW' "
+                "AND alertPrice >= ? AND alertPrice < ? ORDER BY alertPrice",
+                (stock_id, price, previous_price)
+            )
+        return []
+
+    # Portfolio methods
+    def get_user_portfolio(self, user_id: str) -> List[Portfolio]:
+        """Get a user's portfolio"""
+        return self._load_all("portfolios", "SELECT * FROM portfolios WHERE userId = ? ORDER BY rowid", (user_id,))
+
+    def get_portfolio_item(self, user_id: str, stock_id: str) -> Optional[Portfolio]:
+        """Get a specific portfolio item"""
+        return self._get_membership("portfolios", user_id, stock_id)
+
+    def create_portfolio_item(self, portfolio_data: Dict[str, Any]) -> Portfolio:
+        """Create a portfolio item"""
+        return self._upsert_membership("portfolios", portfolio_data)
+
+    def update_portfolio_item(self, user_id: str, stock_id: str,
+                             quantity: float, average_buy_price: float) -> Optional[Portfolio]:
+        """Update a portfolio item"""
+        def apply(item: Portfolio):
+            item.quantity = quantity
+            item.averageBuyPrice = average_buy_price
+            item.updatedAt = datetime.now()
+
+        return self._modify_membership("portfolios", user_id, stock_id, apply)
+
+    def delete_portfolio_item(self, user_id: str, stock_id: str) -> bool:
+        """Delete a portfolio item"""
+        with self._write() as connection:
+            cursor = connection.execute("DELETE FROM portfolios WHERE userId = ? AND stockId = ?",
+                                        (user_id, stock_id))
+        return cursor.rowcount > 0
+
+    def get_stock_holders(self, stock_id: str) -> Set[str]:
+        """IDs of the users holding a stock in their portfolio"""
+        return {row[0] for row in self._query("SELECT userId FROM portfolios WHERE stockId = ?", (stock_id,))}
+
+    def get_stock_watchers(self, stock_id: str) -> Set[str]:
+        """IDs of the users with a stock on their watchlist"""
+        return {row[0] for row in self._query("SELECT userId FROM watchlists WHERE stockId = ?", (stock_id,))}
+
+    def get_portfolio_value(self, user_id: str) -> Dict[str, Any]:
+        """Get the total value of a user's portfolio"""
+        total_value, total_investment = self._query(
+            "SELECT coalesce(sum(s.currentPrice * p.quantity), 0.0), "
+            "coalesce(sum(p.averageBuyPrice * p.quantity), 0.0) "
+            "FROM portfolios p JOIN stocks s ON s.id = p.stockId WHERE p.userId = ?",
+            (user_id,)
+        )[0]
+
+        # Calculate profit/loss
+        total_profit_loss = total_value - total_investment
+        total_profit_loss_percent = (total_profit_loss / total_investment * 100) if total_investment > 0 else 0
+
+        return {
+            "totalValue": total_value,
+            "totalInvestment": total_investment,
+            "totalProfitLoss": total_profit_loss,
+            "totalProfitLossPercent": total_profit_loss_percent
+        }
+
+    # Strategy methods
+    def get_user_strategies(self, user_id: str) -> List[Strategy]:
+        """Get a user's trading strategies"""
+        return self._load_all("strategies", "SELECT * FROM strategies WHERE userId = ? ORDER BY rowid", (user_id,))
+
+    def get_strategy(self, strategy_id: str) -> Optional[Strategy]:
+        """Get a strategy by ID"""
+        return self._get_by_id("strategies", strategy_id)
+
+    def get_active_strategies(self) -> List[Strategy]:
+        """Get every strategy with ACTIVE status"""
+        return self._load_all("strategies", "SELECT * FROM strategies WHERE status = 'ACTIVE' ORDER BY rowid")
+
+    def get_compiled_strategy(self, strategy_id: str) -> Optional[CompiledStrategy]:
+        """Get a strategy's compiled conditions, compiling them on first use
+
+        Other processes may update the row, so the cached form is only
+        reused while the row's updatedAt is unchanged. Raises ValueError if
+        the stored conditions don't compile.
+        """
+        strategy = self.get_strategy(strategy_id)
+        if strategy is None:
+            self._compiled_strategies.pop(strategy_id, None)
+            return None
+
+        cached = self._compiled_strategies.get(strategy_id)
+        if cached is not None and cached[0] == strategy.updatedAt:
+            return cached[1]
+
+        compiled = compile_strategy(strategy)
+        self._compiled_strategies[strategy_id] = (strategy.updatedAt, compiled)
+        return compiled
+
+    def create_strategy(self, strategy_data: Dict[str, Any]) -> Strategy:
+        """Create a trading strategy"""
+        return self._create("strategies", strategy_data)
+
+    def update_strategy(self, strategy_id: str, strategy_data: Dict[str, Any]) -> Optional[Strategy]:
+        """Update a trading strategy"""
+        def apply(strategy: Strategy):
+            self._apply_fields(strategy, strategy_data)
+            strategy.updatedAt = datetime.now()
+
+        strategy = self._modify("strategies", strategy_id, apply)
+        self._compiled_strategies.pop(strategy_id, None)
+        return strategy
+
+    def update_strategy_metrics(self, strategy_id: str, name: str,
+                                metrics: Dict[str, Any]) -> Optional[Strategy]:
+        """Set one entry of a strategy's performanceMetrics, such as "backtest"
+
+        Metrics aren't part of the definition, so updatedAt and the
+        compiled strategy are left alone.
+        """
+        def apply(strategy: Strategy):
+            strategy.performanceMetrics[name] = metrics
+
+        return self._modify("strategies", strategy_id, apply)
+
+    def delete_strategy(self, strategy_id: str) -> bool:
+        """Delete a trading strategy"""
+        with self._write() as connection:
+            cursor = connection.execute("DELETE FROM strategies WHERE id = ?", (strategy_id,))
+        self._compiled_strategies.pop(strategy_id, None)
+        return cursor.rowcount > 0
+
+    def toggle_strategy_status(self, strategy_id: str) -> Optional[Strategy]:
+        """Toggle a strategy's active status"""
+        def apply(strategy: Strategy):
+            strategy.status = "INACTIVE" if strategy.status == "ACTIVE" else "ACTIVE"
+            strategy.updatedAt = datetime.now()
+
+        return self._modify("strategies", strategy_id, apply)
+
+    # Transaction methods
+    def get_transaction(self, transaction_id: str) -> Optional[Transaction]:
+        """Get a transaction by ID"""
+        return self._get_by_id("transactions", transaction_id)
+
+    def get_user_transactions(self, user_id: str, limit: int = 100, offset: int = 0,
+                              transaction_type: Optional[str] = None,
+                              start_date: Optional[datetime] = None,
+                              end_date: Optional[datetime] = None,
+                              after: Optional[str] = None) -> List[Transaction]:
+        """Get a user's transactions (newest first)
+
+        start_date and end_date bound createdAt inclusively. after is a
+        cursor from encode_transaction_cursor; only transactions older
+        than the one it points at are returned.
+        """
+        after_created, after_id = decode_transaction_cursor(after) if after else (None, None)
+
+        return self._load_all(
+            "transactions",
+            "SELECT * FROM transactions "
+            "WHERE userId = ?1 AND (?2 IS NULL OR type = ?2) "
+            "AND (?3 IS NULL OR createdAt >= ?3) AND (?4 IS NULL OR createdAt <= ?4) "
+            "AND (?5 IS NULL OR (createdAt, id) < (?5, ?6)) "
+            "ORDER BY createdAt DESC, id DESC LIMIT ?7 OFFSET ?8",
+            (user_id, transaction_type.upper() if transaction_type else None,
+             _encode_datetime(start_date), _encode_datetime(end_date),
+             _encode_datetime(after_created), after_id, max(limit, 0), max(offset, 0))
+        )
+
+    def get_transaction_summary(self, user_id: str,
+                                start_date: Optional[datetime] = None,
+                                end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get buy/sell totals for a user's completed transactions, overall and by stock"""
+        rows = self._query(
+            "SELECT stockId, type, count(*), sum(totalAmount) FROM transactions "
+            "WHERE userId = ?1 AND status = 'COMPLETED' "
+            "AND (?2 IS NULL OR createdAt >= ?2) AND (?3 IS NULL OR createdAt <= ?3) "
+            "GROUP BY stockId, type ORDER BY min(rowid)",
+            (user_id, _encode_datetime(start_date), _encode_datetime(end_date))
+        )
+
+        summary = MemStorage._new_transaction_summary()
+        for stock_id, transaction_type, count, amount in rows:
+            stock_summary = summary["byStock"].setdefault(stock_id, {
+                "buyCount": 0,
+                "sellCount": 0,
+                "totalBuyAmount": 0.0,
+                "totalSellAmount": 0.0
+            })
+            summary["totalTransactions"] += count
+
+            if transaction_type == "BUY":
+                summary["buyCount"] += count
+                summary["totalBuyAmount"] += amount
+                stock_summary["buyCount"] += count
+                stock_summary["totalBuyAmount"] += amount
+            elif transaction_type == "SELL":
+                summary["sellCount"] += count
+                summary["totalSellAmount"] += amount
+                stock_summary["sellCount"] += count
+                stock_summary["totalSellAmount"] += amount
+
+        # Derive profit/loss figures
+        summary["netProfitLoss"] = summary["totalSellAmount"] - summary["totalBuyAmount"]
+        for stock_summary in summary["byStock"].values():
+            stock_summary["profitLoss"] = stock_summary["totalSellAmount"] - stock_summary["totalBuyAmount"]
+
+        return summary
+
+    def create_transaction(self, transaction_data: Dict[str, Any]) -> Transaction:
+        """Create a transaction record"""
+        # If completed time not provided and status is COMPLETED, set to current time
+        if "completedAt" not in transaction_data and transaction_data.get("status") == "COMPLETED":
+            transaction_data["completedAt"] = datetime.now()
+
+        return self._create("transactions", transaction_data)
+
+    def apply_trades(self, trades: List[Dict[str, Any]]) -> List[Transaction]:
+        """Execute a batch of trades in one write transaction
+
+        Each trade has userId, stockId, type (BUY or SELL), quantity and
+        price, and optionally notes and strategyId. A trade moves the
+        user's balance and portfolio the way the portfolio routes do; one
+        the balance or holding can't cover is recorded as a FAILED
+        transaction and changes nothing else. Completed trades with a
+        strategyId also update that strategy's performanceMetrics["live"];
+        a failed SELL drops the live position if the portfolio no longer
+        holds its shares.
+        """
+        transactions = []
+        # Per strategy, its trades in order and whether each completed
+        fills: Dict[str, List[Tuple[Dict[str, Any], bool]]] = {}
+
+        with self._write():
+            for trade in trades:
+                status = self._execute_trade(trade)
+                transactions.append(self.create_transaction({
+                    "userId": trade["userId"],
+                    "stockId": trade["stockId"],
+                    "type": trade["type"],
+                    "quantity": trade["quantity"],
+                    "price": trade["price"],
+                    "totalAmount": trade["quantity"] * trade["price"],
+                    "status": status,
+                    "notes": trade.get("notes")
+                }))
+                if not trade.get("strategyId"):
+                    continue
+                if status == "COMPLETED":
+                    fills.setdefault(trade["strategyId"], []).append((trade, True))
+                elif trade["type"] == "SELL":
+                    item = self.get_portfolio_item(trade["userId"], trade["stockId"])
+                    if item is None or item.quantity < trade["quantity"]:
+                        fills.setdefault(trade["strategyId"], []).append((trade, False))
+
+            # One row write per strategy; updatedAt is for edits to the definition
+            now = datetime.now()
+            for strategy_id, strategy_fills in fills.items():
+                def apply(strategy: Strategy):
+                    live = strategy.performanceMetrics.setdefault("live", {})
+                    for fill, completed in strategy_fills:
+                        if completed:
+                            apply_fill(live, fill["type"], fill["stockId"], fill["quantity"], fill["price"], now)
+                        else:
+                            drop_position(live, fill["stockId"])
+
+                self._modify("strategies", strategy_id, apply)
+
+        return transactions
+
+    def _execute_trade(self, trade: Dict[str, Any]) -> str:
+        """Apply one trade to the balance and portfolio; returns its status"""
+        user_id, stock_id = trade["userId"], trade["stockId"]
+        quantity, price = trade["quantity"], trade["price"]
+        amount = quantity * price
+
+        user = self.get_user(user_id)
+        item = self.get_portfolio_item(user_id, stock_id)
+        if user is None or not quantity > 0 or not price > 0:
+            return "FAILED"
+
+        if trade["type"] == "BUY":
+            if user.accountBalance < amount:
+                return "FAILED"
+
+            if item is None:
+                self.create_portfolio_item({
+                    "userId": user_id,
+                    "stockId": stock_id,
+                    "quantity": quantity,
+                    "averageBuyPrice": price
+                })
+            else:
+                total_shares = item.quantity + quantity
+                average_price = (item.quantity * item.averageBuyPrice + amount) / total_shares
+                self.update_portfolio_item(user_id, stock_id, total_shares, average_price)
+
+            self.update_account_balance(user_id, user.accountBalance - amount)
+        else:
+            if item is None or item.quantity < quantity:
+                return "FAILED"
+
+            remaining_shares = item.quantity - quantity
+            if remaining_shares > 0:
+                self.update_portfolio_item(user_id, stock_id, remaining_shares, item.averageBuyPrice)
+            else:
+                self.delete_portfolio_item(user_id, stock_id)
+
+            self.update_account_balance(user_id, user.accountBalance + amount)
+
+        return "COMPLETED"
+
+    # Notification methods
+    def get_user_notifications(self, user_id: str, limit: int = 100, offset: int = 0,
+                              include_read: bool = False) -> List[Notification]:
+        """Get a user's notifications (newest first)"""
+        return self._load_all(
+            "notifications",
+            "SELECT * FROM notifications WHERE userId = ?1 AND (?2 OR isRead = 0) "
+            "ORDER BY createdAt DESC, rowid LIMIT ?3 OFFSET ?4",
+            (user_id, int(include_read), limit, offset)
+        )
+
+    def get_notification(self, notification_id: str) -> Optional[Notification]:
+        """Get a notification by ID"""
+        return self._get_by_id("notifications", notification_id)
+
+    def count_unread_notifications(self, user_id: str) -> int:
+        """Count a user's unread notifications"""
+        return self._query(
+            "SELECT count(*) FROM notifications WHERE userId = ? AND isRead = 0", (user_id,)
+        )[0][0]
+
+    def create_notification(self, notification_data: Dict[str, Any]) -> Notification:
+        """Create a notification"""
+        return self._create("notifications", notification_data)
+
+    def create_notifications(self, notifications_data: List[Dict[str, Any]]) -> List[Notification]:
+        """Create a batch of notifications in one write transaction"""
+        with self._write():
+            return [self._create("notifications", notification_data) for notification_data in notifications_data]
+
+    def mark_notification_as_read(self, notification_id: str) -> Optional[Notification]:
+        """Mark a notification as read"""
+        def apply(notification: Notification):
+            notification.isRead = True
+            notification.readAt = datetime.now()
+
+        return self._modify("notifications", notification_id, apply)
+
+    def mark_all_notifications_as_read(self, user_id: str) -> int:
+        """Mark all notifications for a user as read"""
+        with self._write() as connection:
+            cursor = connection.execute(
+                "UPDATE notifications SET isRead = 1, readAt = ? WHERE userId = ? AND isRead = 0",
+                (_encode_datetime(datetime.now()), user_id)
+            )
+        return cursor.rowcount
+
+    def delete_notification(self, notification_id: str) -> bool:
+        """Delete a notification"""
+        with self._write() as connection:
+            cursor = connection.execute("DELETE FROM notifications WHERE id = ?", (notification_id,))
+        return cursor.rowcount > 0
+
+    def clear_user_notifications(self, user_id: str) -> int:
+        """Delete all of a user's notifications"""
+        with self._write() as connection:
+            cursor = connection.execute("DELETE FROM notifications WHERE userId = ?", (user_id,))
+        return cursor.rowcount
+
+    def get_notification_settings(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's notification settings (None if never set)"""
+        user = self.get_user(user_id)
+        if not user:
+            return None
+        return user.preferences.get("notificationSettings")
+
+    def update_notification_settings(self, user_id: str, settings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Merge settings into a user's notification settings"""
+        def apply(user: User):
+            user.preferences.setdefault("notificationSettings", {}).update(settings)
+            user.updatedAt = datetime.now()
+
+        user = self._modify("users", user_id, apply)
+        return dict(user.preferences["notificationSettings"]) if user else None
+
+    # Chat methods
+    def get_user_chat_history(self, user_id: str, limit: int = 100, offset: int = 0) -> List[ChatMessage]:
+        """Get a user's chat history (newest first)"""
+        return self._load_all(
+            "chat_messages",
+            "SELECT * FROM chat_messages WHERE userId = ? ORDER BY createdAt DESC, rowid LIMIT ? OFFSET ?",
+            (user_id, limit, offset)
+        )
+
+    def create_chat_message(self, message_data: Dict[str, Any]) -> ChatMessage:
+        """Create a chat message"""
+        return self._create("chat_messages", message_data)
+
+    def update_chat_response(self, message_id: str, response: str) -> Optional[ChatMessage]:
+        """Update a chat message with an AI response"""
+        def apply(message: ChatMessage):
+            message.response = response
+            message.respondedAt = datetime.now()
+
+        return self._modify("chat_messages", message_id, apply)
+
+    def clear_chat_history(self, user_id: str) -> int:
+        """Clear a user's chat history"""
+        with self._write() as connection:
+            cursor = connection.execute("DELETE FROM chat_messages WHERE userId = ?", (user_id,))
+        return cursor.rowcount
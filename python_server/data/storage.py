@@ -2,46 +2,586 @@
 In-memory storage implementation for StockVisionPro API
 """
 
+import base64
+import bisect
+import heapq
 import logging
+import threading
 import uuid
-from datetime import datetime
-from typing import Dict, List, Optional, Any, Union
+from copy import deepcopy
+from datetime import date, datetime, time, timedelta
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
-from models.schemas import (
-    User, Stock, AIRecommendation, HistoricalData, 
-    Watchlist, Portfolio, Strategy, Transaction, 
-    Notification, ChatMessage
+from python_server.data.records import (
+    UserRecord, StockRecord, AIRecommendationRecord,
+    WatchlistRecord, PortfolioRecord, StrategyRecord, TransactionRecord,
+    NotificationRecord, ChatMessageRecord
 )
+from python_server.data.historical import HistoricalStore, HistoricalWindow
+from python_server.data.historical_file import MappedHistoricalStore
+from python_server.data.indexes import PriceAlertIndex, SortedIndex, StockSearchIndex
+from python_server.data.persistence import StoragePersistence, logged_mutation
+from python_server.data.quotes import QUOTE_FIELDS, QuoteResult, derive_quote_fields, parse_quotes
+from python_server.trading.conditions import CompiledStrategy, compile_strategy
+from python_server.trading.paper import apply_fill, drop_position
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
 
+# Built-in rankings for get_top_stocks: filter_by key -> ranked value
+DEFAULT_STOCK_RANKINGS: Dict[str, Callable[[StockRecord], Optional[float]]] = {
+    "performance": lambda stock: stock.dailyChangePercent,
+    "volume": lambda stock: stock.volume,
+    "market_cap": lambda stock: stock.marketCap,
+    "dailyChange": lambda stock: stock.dailyChange,
+    "dividendYield": lambda stock: stock.dividendYield
+}
+
+
+# Primary collections captured in persistence snapshots, with their record types
+SNAPSHOT_COLLECTIONS = (
+    ("users", UserRecord),
+    ("stocks", StockRecord),
+    ("ai_recommendations", AIRecommendationRecord),
+    ("watchlists", WatchlistRecord),
+    ("portfolios", PortfolioRecord),
+    ("strategies", StrategyRecord),
+    ("transactions", TransactionRecord),
+    ("notifications", NotificationRecord),
+    ("chat_messages", ChatMessageRecord)
+)
+
+
+def _transaction_sort_key(transaction: TransactionRecord) -> Tuple[datetime, str]:
+    """Ordering key for the per-user transaction index"""
+    return (transaction.createdAt, transaction.id)
+
+
+def _recommendation_sort_key(recommendation: AIRecommendationRecord) -> Tuple[datetime, str]:
+    """Chronological ordering key for a stock's recommendation history"""
+    return recommendation.createdAt, recommendation.id
+
+
+def encode_transaction_cursor(transaction: TransactionRecord) -> str:
+    """Encode an opaque keyset cursor pointing at a transaction"""
+    raw = f"{transaction.createdAt.isoformat()},{transaction.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_transaction_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a keyset cursor into its (createdAt, id) position"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, transaction_id = raw.split(",", 1)
+        return datetime.fromisoformat(created_at), transaction_id
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid transaction cursor: {cursor}") from e
+
+
 class MemStorage:
     """In-memory storage implementation for StockVisionPro API"""
     
-    def __init__(self):
-        """Initialize storage with empty collections"""
+    def __init__(self, historical_dir: Optional[str] = None,
+                 historical_writable: bool = False,
+                 data_dir: Optional[str] = None):
+        """Initialize storage with empty collections
+        
+        If historical_dir is given, historical prices are memory-mapped
+        from that directory instead of seeded with sample bars. Only one
+        process should open it with historical_writable set.
+        
+        If data_dir is given, mutations are logged there and the state is
+        recovered from it on startup (see data/persistence.py). Only one
+        process should open a data_dir.
+        """
+        # Mutations run under the write lock, and with persistence also with a fixed clock
+        self._persistence: Optional[StoragePersistence] = None
+        self._write_lock = threading.RLock()
+        self._clock: Optional[datetime] = None
+        
         # Main data collections
-        self.users: List[User] = []
-        self.stocks: List[Stock] = []
-        self.ai_recommendations: List[AIRecommendation] = []
-        self.historical_data: List[HistoricalData] = []
-        self.watchlists: List[Watchlist] = []
-        self.portfolios: List[Portfolio] = []
-        self.strategies: List[Strategy] = []
-        self.transactions: List[Transaction] = []
-        self.notifications: List[Notification] = []
-        self.chat_messages: List[ChatMessage] = []
+        self.users: List[UserRecord] = []
+        self.stocks: List[StockRecord] = []
+        self.ai_recommendations: List[AIRecommendationRecord] = []
+        self.historical_data = HistoricalStore()
+        # Watchlist and portfolio items keyed by (userId, stockId)
+        self.watchlists: Dict[Tuple[str, str], WatchlistRecord] = {}
+        self.portfolios: Dict[Tuple[str, str], PortfolioRecord] = {}
+        self.strategies: List[StrategyRecord] = []
+        self.transactions: List[TransactionRecord] = []
+        self.notifications: List[NotificationRecord] = []
+        self.chat_messages: List[ChatMessageRecord] = []
+        
+        # User lookup indexes (username and email keys are lowercased)
+        self._users_by_id: Dict[str, UserRecord] = {}
+        self._users_by_username: Dict[str, UserRecord] = {}
+        self._users_by_email: Dict[str, UserRecord] = {}
+        
+        # Stock lookup indexes (symbol keys are uppercased)
+        self._stocks_by_id: Dict[str, StockRecord] = {}
+        self._stocks_by_symbol: Dict[str, StockRecord] = {}
+        
+        # Listing sequence of each stock (its position in self.stocks)
+        self._stock_listing: Dict[str, int] = {}
+        
+        # Stock filter indexes: sector/exchange -> {stockId: stock} in listing order, and price order
+        self._stocks_by_sector: Dict[str, Dict[str, StockRecord]] = {}
+        self._stocks_by_exchange: Dict[str, Dict[str, StockRecord]] = {}
+        self._stock_price_index = SortedIndex()
+        
+        # Ranked symbol/name/description search
+        self._stock_search_index = StockSearchIndex()
+        
+        # Live top-N rankings: filter_by key -> value function and ordered index
+        self._stock_rankings: Dict[str, Callable[[StockRecord], Optional[float]]] = dict(DEFAULT_STOCK_RANKINGS)
+        self._stock_ranking_indexes: Dict[str, SortedIndex] = {}
+        
+        # AI recommendations: by ID, per-stock history sorted by (createdAt, id),
+        # insertion-ordered lists per (type, sentiment) filter (None matches any),
+        # and confidence rankings of each stock's latest recommendation
+        self._recommendations_by_id: Dict[str, AIRecommendationRecord] = {}
+        self._recommendations_by_stock: Dict[str, List[AIRecommendationRecord]] = {}
+        self._recommendations_by_filter: Dict[Tuple[Optional[str], Optional[str]], List[AIRecommendationRecord]] = {}
+        self._recommendation_rankings: Dict[Tuple[Optional[str], Optional[str]], SortedIndex] = {}
+        
+        # Per-user membership: userId -> {stockId: item}, in insertion order
+        self._watchlist_by_user: Dict[str, Dict[str, WatchlistRecord]] = {}
+        self._portfolio_by_user: Dict[str, Dict[str, PortfolioRecord]] = {}
+        
+        # Watchlist price alerts by stock, ordered by alert price
+        self._price_alerts = PriceAlertIndex()
+        
+        # Reverse membership: stockId -> {userId} holding or watching it
+        self._holders_by_stock: Dict[str, Set[str]] = {}
+        self._watchers_by_stock: Dict[str, Set[str]] = {}
+        
+        # Strategies by ID and per user, in insertion order
+        self._strategies_by_id: Dict[str, StrategyRecord] = {}
+        self._strategies_by_user: Dict[str, Dict[str, StrategyRecord]] = {}
+        
+        # Compiled strategy conditions by strategy ID, filled on first use
+        self._compiled_strategies: Dict[str, CompiledStrategy] = {}
+        
+        # Transactions by ID
+        self._transactions_by_id: Dict[str, TransactionRecord] = {}
+        
+        # Per-user transactions sorted by (createdAt, id), overall and by type
+        self._transactions_by_user: Dict[str, List[TransactionRecord]] = {}
+        self._transactions_by_user_type: Dict[Tuple[str, str], List[TransactionRecord]] = {}
+        
+        # Running transaction summaries per user, overall and bucketed by day
+        self._transaction_totals: Dict[str, Dict[str, Any]] = {}
+        self._transaction_days: Dict[str, Dict[date, Dict[str, Any]]] = {}
+        self._transaction_day_keys: Dict[str, List[date]] = {}
+        
+        # Notifications by ID, per user in insertion order, and unread counts
+        self._notifications_by_id: Dict[str, NotificationRecord] = {}
+        self._notifications_by_user: Dict[str, Dict[str, NotificationRecord]] = {}
+        self._unread_notification_counts: Dict[str, int] = {}
+        
+        # Callbacks run with the IDs of stocks whose price or bars changed
+        self._price_listeners: List[Callable[[List[str]], None]] = []
         
         # Initialize with sample data
         self._initialize_sample_data()
+        
+        # Map on-disk historical data in place of the sample bars
+        if historical_dir:
+            self.historical_data = MappedHistoricalStore.open(historical_dir, historical_writable)
+        
+        # Build lookup indexes over the initial data
+        self._rebuild_indexes()
+        
+        # Replace the sample data with the persisted state, if any
+        if data_dir:
+            self._persistence = StoragePersistence(self, data_dir)
+            self._persistence.recover()
+    
+    def _now(self) -> datetime:
+        """Current time, pinned for the duration of a logged mutation"""
+        return self._clock or datetime.now()
+    
+    def _snapshot_state(self) -> Dict[str, Any]:
+        """Capture the primary collections as plain field tuples
+        
+        Called under _write_lock. Nested containers are copied, since
+        writers edit them in place once the lock is released.
+        """
+        state = {"collections": {}}
+        
+        for name, record_cls in SNAPSHOT_COLLECTIONS:
+            items = getattr(self, name)
+            if isinstance(items, dict):
+                items = items.values()
+            fields = record_cls.field_names
+            getter = attrgetter(*fields)
+            rows = [getter(item) for item in items]
+            if record_cls.container_fields:
+                positions = [fields.index(field) for field in record_cls.container_fields]
+                for i, row in enumerate(rows):
+                    row = list(row)
+                    for position in positions:
+                        row[position] = deepcopy(row[position])
+                    rows[i] = tuple(row)
+            state["collections"][name] = (fields, rows)
+        
+        # Mapped historical data is persisted by its own files
+        if not isinstance(self.historical_data, MappedHistoricalStore):
+            state["historical"] = [
+                (series.stock_id, series.version, series.dates.copy(), series.open.copy(),
+                 series.high.copy(), series.low.copy(), series.close.copy(), series.volume.copy())
+                for series in self.historical_data
+            ]
+        
+        return state
+    
+    def _restore_state(self, state: Dict[str, Any]):
+        """Replace the primary collections with a snapshot and rebuild indexes"""
+        for name, record_cls in SNAPSHOT_COLLECTIONS:
+            fields, rows = state["collections"].get(name, ((), []))
+            if fields == record_cls.field_names:
+                items = [record_cls(**dict(zip(fields, row))) for row in rows]
+            else:
+                # Fields were added or removed since the snapshot; fill in defaults
+                items = [record_cls.from_dict(dict(zip(fields, row))) for row in rows]
+            if isinstance(getattr(self, name), dict):
+                setattr(self, name, {(item.userId, item.stockId): item for item in items})
+            else:
+                setattr(self, name, items)
+        
+        if "historical" in state and not isinstance(self.historical_data, MappedHistoricalStore):
+            self.historical_data = HistoricalStore()
+            for stock_id, version, *columns in state["historical"]:
+                series = self.historical_data.get_or_create(stock_id)
+                series.extend(*columns)
+                series.version = version
+        
+        self._rebuild_indexes()
+    
+    def add_price_listener(self, listener: Callable[[List[str]], None]):
+        """Call listener with the stock IDs of every price or bar change
+        
+        Listeners run on the writing thread, inside any write lock, so they
+        should only record the IDs and return.
+        """
+        self._price_listeners.append(listener)
+    
+    def _publish_prices(self, stock_ids: List[str]):
+        """Tell the price listeners which stocks changed"""
+        for listener in self._price_listeners:
+            try:
+                listener(stock_ids)
+            except Exception as e:
+                logger.error(f"Error in price listener: {str(e)}")
+    
+    @staticmethod
+    def _discard_member(index: Dict[str, Set[str]], stock_id: str, user_id: str):
+        """Remove a user from a stock's reverse membership set"""
+        members = index.get(stock_id)
+        if members is not None:
+            members.discard(user_id)
+            if not members:
+                del index[stock_id]
+    
+    def close(self):
+        """Flush and stop persistence, if enabled"""
+        if self._persistence is not None:
+            self._persistence.close()
+            self._persistence = None
+    
+    def _rebuild_indexes(self):
+        """Rebuild all lookup indexes from the main data collections"""
+        self._users_by_id = {}
+        self._users_by_username = {}
+        self._users_by_email = {}
+        for user in self.users:
+            self._index_user(user)
+        
+        self._stocks_by_id = {}
+        self._stocks_by_symbol = {}
+        self._stock_listing = {}
+        self._stocks_by_sector = {}
+        self._stocks_by_exchange = {}
+        self._stock_price_index = SortedIndex()
+        self._stock_ranking_indexes = {name: SortedIndex() for name in self._stock_rankings}
+        self._stock_search_index = StockSearchIndex()
+        for stock in self.stocks:
+            self._index_stock(stock)
+        
+        self._recommendations_by_id = {}
+        self._recommendations_by_stock = {}
+        self._recommendations_by_filter = {}
+        self._recommendation_rankings = {}
+        for recommendation in self.ai_recommendations:
+            self._index_recommendation(recommendation)
+        
+        self._watchlist_by_user = {}
+        self._watchers_by_stock = {}
+        self._price_alerts = PriceAlertIndex()
+        for (user_id, stock_id), item in self.watchlists.items():
+            self._watchlist_by_user.setdefault(user_id, {})[stock_id] = item
+            self._watchers_by_stock.setdefault(stock_id, set()).add(user_id)
+            self._price_alerts.add(user_id, stock_id, item.alertCondition, item.alertPrice)
+        
+        self._portfolio_by_user = {}
+        self._holders_by_stock = {}
+        for (user_id, stock_id), item in self.portfolios.items():
+            self._portfolio_by_user.setdefault(user_id, {})[stock_id] = item
+            self._holders_by_stock.setdefault(stock_id, set()).add(user_id)
+        
+        self._strategies_by_id = {}
+        self._strategies_by_user = {}
+        self._compiled_strategies = {}
+        for strategy in self.strategies:
+            self._index_strategy(strategy)
+        
+        self._transactions_by_id = {}
+        self._transactions_by_user = {}
+        self._transactions_by_user_type = {}
+        self._transaction_totals = {}
+        self._transaction_days = {}
+        self._transaction_day_keys = {}
+        for transaction in self.transactions:
+            self._index_transaction(transaction)
+            self._aggregate_transaction(transaction)
+        
+        self._notifications_by_id = {}
+        self._notifications_by_user = {}
+        self._unread_notification_counts = {}
+        for notification in self.notifications:
+            self._index_notification(notification)
+    
+    def _index_user(self, user: UserRecord):
+        """Add a user to the lookup indexes"""
+        self._users_by_id[user.id] = user
+        self._users_by_username[user.username.lower()] = user
+        self._users_by_email[user.email.lower()] = user
+    
+    def _index_stock(self, stock: StockRecord, buckets: bool = True):
+        """Add a stock to the lookup and filter indexes
+        
+        buckets=False leaves the sector and exchange buckets alone, for
+        updates that don't change either.
+        """
+        self._stock_listing.setdefault(stock.id, len(self._stock_listing))
+        self._stocks_by_id[stock.id] = stock
+        self._stocks_by_symbol[stock.symbol.upper()] = stock
+        if buckets:
+            if stock.sector:
+                self._add_to_bucket(self._stocks_by_sector, stock.sector, stock)
+            self._add_to_bucket(self._stocks_by_exchange, stock.exchange, stock)
+        self._stock_price_index.add(stock.id, stock.currentPrice)
+        self._stock_search_index.add(stock.id, stock.symbol, stock.name, stock.description)
+        for name, key_fn in self._stock_rankings.items():
+            value = key_fn(stock)
+            if value is not None:
+                self._stock_ranking_indexes[name].add(stock.id, value)
+    
+    def _add_to_bucket(self, index: Dict[str, Dict[str, StockRecord]], key: str, stock: StockRecord):
+        """Add a stock to a sector or exchange bucket, keeping it in listing order"""
+        bucket = index.setdefault(key, {})
+        listed_after = bool(bucket) and self._stock_listing[next(reversed(bucket))] > self._stock_listing[stock.id]
+        bucket[stock.id] = stock
+        
+        # A stock moved in from another bucket may belong before the end
+        if listed_after:
+            index[key] = dict(sorted(bucket.items(), key=lambda entry: self._stock_listing[entry[0]]))
+    
+    def _unindex_stock(self, stock: StockRecord, buckets: bool = True):
+        """Remove a stock from the lookup and filter indexes"""
+        self._stocks_by_id.pop(stock.id, None)
+        self._stocks_by_symbol.pop(stock.symbol.upper(), None)
+        if buckets:
+            for index, key in ((self._stocks_by_sector, stock.sector),
+                               (self._stocks_by_exchange, stock.exchange)):
+                bucket = index.get(key)
+                if bucket is not None:
+                    bucket.pop(stock.id, None)
+                    if not bucket:
+                        del index[key]
+        self._stock_price_index.discard(stock.id)
+        self._stock_search_index.discard(stock.id)
+        for index in self._stock_ranking_indexes.values():
+            index.discard(stock.id)
+    
+    @staticmethod
+    def _recommendation_filter_keys(recommendation: AIRecommendationRecord) -> List[Tuple[Optional[str], Optional[str]]]:
+        """(type, sentiment) filter keys a recommendation is listed under"""
+        return [
+            (None, None),
+            (recommendation.type, None),
+            (None, recommendation.sentiment),
+            (recommendation.type, recommendation.sentiment)
+        ]
+    
+    def _index_recommendation(self, recommendation: AIRecommendationRecord):
+        """Add a recommendation to the lookup, history and ranking indexes"""
+        self._recommendations_by_id[recommendation.id] = recommendation
+        
+        for key in self._recommendation_filter_keys(recommendation):
+            self._recommendations_by_filter.setdefault(key, []).append(recommendation)
+        
+        history = self._recommendations_by_stock.setdefault(recommendation.stockId, [])
+        previous = history[-1] if history else None
+        if previous is None or _recommendation_sort_key(previous) <= _recommendation_sort_key(recommendation):
+            history.append(recommendation)
+        else:
+            bisect.insort(history, recommendation, key=_recommendation_sort_key)
+        
+        # Only each stock's latest recommendation is ranked
+        if history[-1] is not recommendation:
+            return
+        
+        if previous is not None:
+            for key in self._recommendation_filter_keys(previous):
+                ranking = self._recommendation_rankings.get(key)
+                if ranking is not None:
+                    ranking.discard(previous.id)
+        
+        for key in self._recommendation_filter_keys(recommendation):
+            ranking = self._recommendation_rankings.get(key)
+            if ranking is None:
+                ranking = self._recommendation_rankings[key] = SortedIndex()
+            ranking.add(recommendation.id, recommendation.confidence)
+    
+    def _index_strategy(self, strategy: StrategyRecord):
+        """Add a strategy to the lookup indexes"""
+        self._strategies_by_id[strategy.id] = strategy
+        self._strategies_by_user.setdefault(strategy.userId, {})[strategy.id] = strategy
+    
+    def _unindex_strategy(self, strategy: StrategyRecord):
+        """Remove a strategy from the lookup indexes"""
+        self._strategies_by_id.pop(strategy.id, None)
+        user_strategies = self._strategies_by_user.get(strategy.userId)
+        if user_strategies is not None:
+            user_strategies.pop(strategy.id, None)
+            if not user_strategies:
+                del self._strategies_by_user[strategy.userId]
+    
+    def _index_notification(self, notification: NotificationRecord):
+        """Add a notification to the lookup indexes and unread counts"""
+        self._notifications_by_id[notification.id] = notification
+        self._notifications_by_user.setdefault(notification.userId, {})[notification.id] = notification
+        if not notification.isRead:
+            self._unread_notification_counts[notification.userId] = (
+                self._unread_notification_counts.get(notification.userId, 0) + 1
+            )
+    
+    def _unindex_notification(self, notification: NotificationRecord):
+        """Remove a notification from the lookup indexes and unread counts"""
+        self._notifications_by_id.pop(notification.id, None)
+        user_notifications = self._notifications_by_user.get(notification.userId)
+        if user_notifications is not None:
+            user_notifications.pop(notification.id, None)
+            if not user_notifications:
+                del self._notifications_by_user[notification.userId]
+        if not notification.isRead:
+            self._mark_read_count(notification.userId, 1)
+    
+    def _mark_read_count(self, user_id: str, count: int):
+        """Take count notifications off a user's unread count"""
+        remaining = self._unread_notification_counts.get(user_id, 0) - count
+        if remaining > 0:
+            self._unread_notification_counts[user_id] = remaining
+        else:
+            self._unread_notification_counts.pop(user_id, None)
+    
+    def _index_transaction(self, transaction: TransactionRecord):
+        """Insert a transaction into the ID and per-user time-ordered indexes"""
+        self._transactions_by_id[transaction.id] = transaction
+        
+        for series in (
+            self._transactions_by_user.setdefault(transaction.userId, []),
+            self._transactions_by_user_type.setdefault((transaction.userId, transaction.type), [])
+        ):
+            # New transactions are almost always the newest, so append when possible
+            if not series or _transaction_sort_key(series[-1]) <= _transaction_sort_key(transaction):
+                series.append(transaction)
+            else:
+                bisect.insort(series, transaction, key=_transaction_sort_key)
+    
+    def _aggregate_transaction(self, transaction: TransactionRecord):
+        """Fold a transaction into the user's running and per-day summaries"""
+        totals = self._transaction_totals.get(transaction.userId)
+        if totals is None:
+            totals = self._transaction_totals[transaction.userId] = self._new_transaction_summary()
+        self._add_to_summary(totals, transaction)
+        
+        day = transaction.createdAt.date()
+        days = self._transaction_days.setdefault(transaction.userId, {})
+        bucket = days.get(day)
+        if bucket is None:
+            bucket = days[day] = self._new_transaction_summary()
+            bisect.insort(self._transaction_day_keys.setdefault(transaction.userId, []), day)
+        self._add_to_summary(bucket, transaction)
+    
+    @staticmethod
+    def _new_transaction_summary() -> Dict[str, Any]:
+        """Create an empty transaction summary"""
+        return {
+            "totalTransactions": 0,
+            "buyCount": 0,
+            "sellCount": 0,
+            "totalBuyAmount": 0.0,
+            "totalSellAmount": 0.0,
+            "byStock": {}
+        }
+    
+    @staticmethod
+    def _add_to_summary(summary: Dict[str, Any], transaction: TransactionRecord):
+        """Add a single transaction to a summary; only completed ones count"""
+        if transaction.status != "COMPLETED":
+            return
+        
+        stock_summary = summary["byStock"].get(transaction.stockId)
+        if stock_summary is None:
+            stock_summary = summary["byStock"][transaction.stockId] = {
+                "buyCount": 0,
+                "sellCount": 0,
+                "totalBuyAmount": 0.0,
+                "totalSellAmount": 0.0
+            }
+        
+        summary["totalTransactions"] += 1
+        
+        if transaction.type == "BUY":
+            summary["buyCount"] += 1
+            summary["totalBuyAmount"] += transaction.totalAmount
+            stock_summary["buyCount"] += 1
+            stock_summary["totalBuyAmount"] += transaction.totalAmount
+        elif transaction.type == "SELL":
+            summary["sellCount"] += 1
+            summary["totalSellAmount"] += transaction.totalAmount
+            stock_summary["sellCount"] += 1
+            stock_summary["totalSellAmount"] += transaction.totalAmount
+    
+    @staticmethod
+    def _merge_summary(summary: Dict[str, Any], other: Dict[str, Any]):
+        """Add another summary's totals into a summary"""
+        for key in ("totalTransactions", "buyCount", "sellCount", "totalBuyAmount", "totalSellAmount"):
+            summary[key] += other[key]
+        
+        for stock_id, other_stock in other["byStock"].items():
+            stock_summary = summary["byStock"].get(stock_id)
+            if stock_summary is None:
+                summary["byStock"][stock_id] = dict(other_stock)
+            else:
+                for key, value in other_stock.items():
+                    stock_summary[key] += value
+    
+    def _unindex_user(self, user: UserRecord):
+        """Remove a user from the lookup indexes"""
+        self._users_by_id.pop(user.id, None)
+        self._users_by_username.pop(user.username.lower(), None)
+        self._users_by_email.pop(user.email.lower(), None)
     
     def _initialize_sample_data(self):
         """Initialize with sample data for development"""
         # Sample users
         self.users = [
-            User(
+            UserRecord(
                 id="user1",
                 username="johnsmith",
                 email="john@example.com",
@@ -49,7 +589,7 @@ class MemStorage:
                 fullName="John Smith",
                 accountBalance=10000.0
             ),
-            User(
+            UserRecord(
                 id="user2",
                 username="janesmith",
                 email="jane@example.com",
@@ -61,7 +601,7 @@ class MemStorage:
         
         # Sample stocks
         self.stocks = [
-            Stock(
+            StockRecord(
                 id="stock1",
                 symbol="AAPL",
                 name="Apple Inc.",
@@ -73,14 +613,14 @@ class MemStorage:
                 low=168.50,
                 previousClose=168.75,
                 volume=75000000,
-                marketCap=2800000000000,
+                marketCap=2800000000000.0,
                 peRatio=27.5,
                 dividendYield=0.56,
                 sector="Technology",
                 exchange="NASDAQ",
                 description="Apple Inc. designs, manufactures, and markets smartphones, personal computers, tablets, wearables, and accessories worldwide."
             ),
-            Stock(
+            StockRecord(
                 id="stock2",
                 symbol="MSFT",
                 name="Microsoft Corporation",
@@ -92,14 +632,14 @@ class MemStorage:
                 low=319.80,
                 previousClose=322.40,
                 volume=25000000,
-                marketCap=2400000000000,
+                marketCap=2400000000000.0,
                 peRatio=34.2,
                 dividendYield=0.75,
                 sector="Technology",
                 exchange="NASDAQ",
                 description="Microsoft Corporation develops, licenses, and supports software, services, devices, and solutions worldwide."
             ),
-            Stock(
+            StockRecord(
                 id="stock3",
                 symbol="GOOGL",
                 name="Alphabet Inc.",
@@ -111,14 +651,14 @@ class MemStorage:
                 low=141.50,
                 previousClose=141.75,
                 volume=18000000,
-                marketCap=1900000000000,
+                marketCap=1900000000000.0,
                 peRatio=25.6,
                 dividendYield=None,
                 sector="Technology",
                 exchange="NASDAQ",
                 description="Alphabet Inc. offers various products and platforms in the United States, Europe, the Middle East, Africa, the Asia-Pacific, Canada, and Latin America."
             ),
-            Stock(
+            StockRecord(
                 id="stock4",
                 symbol="AMZN",
                 name="Amazon.com, Inc.",
@@ -130,14 +670,14 @@ class MemStorage:
                 low=171.50,
                 previousClose=171.80,
                 volume=30000000,
-                marketCap=1800000000000,
+                marketCap=1800000000000.0,
                 peRatio=62.8,
                 dividendYield=None,
                 sector="Consumer Cyclical",
                 exchange="NASDAQ",
                 description="Amazon.com, Inc. engages in the retail sale of consumer products and subscriptions in North America and internationally."
             ),
-            Stock(
+            StockRecord(
                 id="stock5",
                 symbol="TSLA",
                 name="Tesla, Inc.",
@@ -149,7 +689,7 @@ class MemStorage:
                 low=240.00,
                 previousClose=245.00,
                 volume=80000000,
-                marketCap=780000000000,
+                marketCap=780000000000.0,
                 peRatio=69.7,
                 dividendYield=None,
                 sector="Automotive",
@@ -160,7 +700,7 @@ class MemStorage:
         
         # Sample AI recommendations
         self.ai_recommendations = [
-            AIRecommendation(
+            AIRecommendationRecord(
                 id="rec1",
                 stockId="stock1",
                 type="BUY",
@@ -170,7 +710,7 @@ class MemStorage:
                 timeFrame="MEDIUM_TERM",
                 analysis="Apple's strong product lineup and services growth suggest continued momentum."
             ),
-            AIRecommendation(
+            AIRecommendationRecord(
                 id="rec2",
                 stockId="stock2",
                 type="HOLD",
@@ -180,7 +720,7 @@ class MemStorage:
                 timeFrame="SHORT_TERM",
                 analysis="Microsoft is fairly valued at current levels, but cloud business remains strong."
             ),
-            AIRecommendation(
+            AIRecommendationRecord(
                 id="rec3",
                 stockId="stock3",
                 type="BUY",
@@ -190,7 +730,7 @@ class MemStorage:
                 timeFrame="LONG_TERM",
                 analysis="Google's ad business is resilient and AI investments will drive future growth."
             ),
-            AIRecommendation(
+            AIRecommendationRecord(
                 id="rec4",
                 stockId="stock4",
                 type="BUY",
@@ -200,7 +740,7 @@ class MemStorage:
                 timeFrame="MEDIUM_TERM",
                 analysis="Amazon's e-commerce and AWS growth continue to exceed expectations."
             ),
-            AIRecommendation(
+            AIRecommendationRecord(
                 id="rec5",
                 stockId="stock5",
                 type="SELL",
@@ -213,96 +753,45 @@ class MemStorage:
         ]
         
         # Sample historical data (abbreviated)
-        self.historical_data = [
+        sample_bars = [
             # Apple historical data (just 3 days as examples)
-            HistoricalData(
-                id=f"hist1-{uuid.uuid4()}",
-                stockId="stock1",
-                date=datetime(2025, 4, 1),
-                open=168.00,
-                high=170.50,
-                low=167.80,
-                close=170.50,
-                volume=75000000
-            ),
-            HistoricalData(
-                id=f"hist1-{uuid.uuid4()}",
-                stockId="stock1",
-                date=datetime(2025, 3, 31),
-                open=167.50,
-                high=169.20,
-                low=167.30,
-                close=168.75,
-                volume=68000000
-            ),
-            HistoricalData(
-                id=f"hist1-{uuid.uuid4()}",
-                stockId="stock1",
-                date=datetime(2025, 3, 30),
-                open=166.80,
-                high=168.10,
-                low=166.50,
-                close=167.50,
-                volume=62000000
-            ),
+            ("stock1", datetime(2025, 3, 30), 166.80, 168.10, 166.50, 167.50, 62000000),
+            ("stock1", datetime(2025, 3, 31), 167.50, 169.20, 167.30, 168.75, 68000000),
+            ("stock1", datetime(2025, 4, 1), 168.00, 170.50, 167.80, 170.50, 75000000),
             
             # Microsoft historical data (just 3 days as examples)
-            HistoricalData(
-                id=f"hist2-{uuid.uuid4()}",
-                stockId="stock2",
-                date=datetime(2025, 4, 1),
-                open=322.40,
-                high=323.15,
-                low=319.80,
-                close=320.10,
-                volume=25000000
-            ),
-            HistoricalData(
-                id=f"hist2-{uuid.uuid4()}",
-                stockId="stock2",
-                date=datetime(2025, 3, 31),
-                open=321.75,
-                high=324.20,
-                low=321.50,
-                close=322.40,
-                volume=22000000
-            ),
-            HistoricalData(
-                id=f"hist2-{uuid.uuid4()}",
-                stockId="stock2",
-                date=datetime(2025, 3, 30),
-                open=320.80,
-                high=322.50,
-                low=320.60,
-                close=321.75,
-                volume=20000000
-            )
+            ("stock2", datetime(2025, 3, 30), 320.80, 322.50, 320.60, 321.75, 20000000),
+            ("stock2", datetime(2025, 3, 31), 321.75, 324.20, 321.50, 322.40, 22000000),
+            ("stock2", datetime(2025, 4, 1), 322.40, 323.15, 319.80, 320.10, 25000000)
         ]
+        self.historical_data = HistoricalStore()
+        for bar in sample_bars:
+            self.historical_data.append(*bar)
         
         # Sample watchlists
-        self.watchlists = [
-            Watchlist(
+        sample_watchlists = [
+            WatchlistRecord(
                 id="watch1",
                 userId="user1",
                 stockId="stock1",
                 alertPrice=180.00,
                 alertCondition="ABOVE"
             ),
-            Watchlist(
+            WatchlistRecord(
                 id="watch2",
                 userId="user1",
                 stockId="stock3",
                 alertPrice=135.00,
                 alertCondition="BELOW"
             ),
-            Watchlist(
+            WatchlistRecord(
                 id="watch3",
                 userId="user2",
                 stockId="stock4",
                 alertPrice=200.00,
                 alertCondition="ABOVE"
             ),
-            Watchlist(
+            WatchlistRecord(
                 id="watch4",
                 userId="user2",
                 stockId="stock5",
@@ -310,42 +799,44 @@ class MemStorage:
                 alertCondition="BELOW"
             )
         ]
+        self.watchlists = {(w.userId, w.stockId): w for w in sample_watchlists}
         
         # Sample portfolios
-        self.portfolios = [
-            Portfolio(
+        sample_portfolios = [
+            PortfolioRecord(
                 id="port1",
                 userId="user1",
                 stockId="stock1",
-                quantity=10,
+                quantity=10.0,
                 averageBuyPrice=165.75
             ),
-            Portfolio(
+            PortfolioRecord(
                 id="port2",
                 userId="user1",
                 stockId="stock4",
-                quantity=5,
+                quantity=5.0,
                 averageBuyPrice=170.50
             ),
-            Portfolio(
+            PortfolioRecord(
                 id="port3",
                 userId="user2",
                 stockId="stock2",
-                quantity=8,
+                quantity=8.0,
                 averageBuyPrice=315.25
             ),
-            Portfolio(
+            PortfolioRecord(
                 id="port4",
                 userId="user2",
                 stockId="stock3",
-                quantity=15,
+                quantity=15.0,
                 averageBuyPrice=140.80
             )
         ]
+        self.portfolios = {(p.userId, p.stockId): p for p in sample_portfolios}
         
         # Sample strategies
         self.strategies = [
-            Strategy(
+            StrategyRecord(
                 id="strat1",
                 userId="user1",
                 name="Tech Growth Strategy",
@@ -369,7 +860,7 @@ class MemStorage:
                 status="ACTIVE",
                 targetStocks=["stock1", "stock2", "stock3", "stock4"]
             ),
-            Strategy(
+            StrategyRecord(
                 id="strat2",
                 userId="user2",
                 name="Value Investing",
@@ -380,7 +871,7 @@ class MemStorage:
                 ],
                 entryConditions=[
                     {"indicator": "PE_RATIO", "condition": "BELOW", "value": 15},
-                    {"indicator": "PRICE_TO_BOOK", "condition": "BELOW", "value": 2.5}
+                    {"indicator": "DIVIDEND_YIELD", "condition": "ABOVE", "value": 1.5}
                 ],
                 exitConditions=[
                     {"indicator": "PRICE_TARGET", "condition": "REACHED", "value": 20},
@@ -397,48 +888,48 @@ class MemStorage:
         
         # Sample transactions
         self.transactions = [
-            Transaction(
+            TransactionRecord(
                 id="trans1",
                 userId="user1",
                 stockId="stock1",
                 type="BUY",
-                quantity=10,
+                quantity=10.0,
                 price=165.75,
                 totalAmount=1657.50,
                 status="COMPLETED",
                 createdAt=datetime(2025, 3, 20),
                 completedAt=datetime(2025, 3, 20)
             ),
-            Transaction(
+            TransactionRecord(
                 id="trans2",
                 userId="user1",
                 stockId="stock4",
                 type="BUY",
-                quantity=5,
+                quantity=5.0,
                 price=170.50,
                 totalAmount=852.50,
                 status="COMPLETED",
                 createdAt=datetime(2025, 3, 22),
                 completedAt=datetime(2025, 3, 22)
             ),
-            Transaction(
+            TransactionRecord(
                 id="trans3",
                 userId="user2",
                 stockId="stock2",
                 type="BUY",
-                quantity=8,
+                quantity=8.0,
                 price=315.25,
                 totalAmount=2522.00,
                 status="COMPLETED",
                 createdAt=datetime(2025, 3, 18),
                 completedAt=datetime(2025, 3, 18)
             ),
-            Transaction(
+            TransactionRecord(
                 id="trans4",
                 userId="user2",
                 stockId="stock3",
                 type="BUY",
-                quantity=15,
+                quantity=15.0,
                 price=140.80,
                 totalAmount=2112.00,
                 status="COMPLETED",
@@ -449,7 +940,7 @@ class MemStorage:
         
         # Sample notifications
         self.notifications = [
-            Notification(
+            NotificationRecord(
                 id="notif1",
                 userId="user1",
                 title="Price Alert",
@@ -458,7 +949,7 @@ class MemStorage:
                 relatedEntityId="stock1",
                 createdAt=datetime(2025, 4, 1)
             ),
-            Notification(
+            NotificationRecord(
                 id="notif2",
                 userId="user1",
                 title="Strategy Alert",
@@ -467,7 +958,7 @@ class MemStorage:
                 relatedEntityId="strat1",
                 createdAt=datetime(2025, 4, 1)
             ),
-            Notification(
+            NotificationRecord(
                 id="notif3",
                 userId="user2",
                 title="Price Alert",
@@ -480,7 +971,7 @@ class MemStorage:
         
         # Sample chat messages
         self.chat_messages = [
-            ChatMessage(
+            ChatMessageRecord(
                 id="chat1",
                 userId="user1",
                 message="What are the best tech stocks to invest in right now?",
@@ -492,7 +983,7 @@ class MemStorage:
                 createdAt=datetime(2025, 3, 30),
                 respondedAt=datetime(2025, 3, 30)
             ),
-            ChatMessage(
+            ChatMessageRecord(
                 id="chat2",
                 userId="user2",
                 message="Should I sell my Tesla shares?",
@@ -507,59 +998,61 @@ class MemStorage:
         ]
     
     # User methods
-    def get_user_by_username(self, username: str) -> Optional[User]:
-        """Get a user by username"""
-        for user in self.users:
-            if user.username == username:
-                return user
-        return None
+    def get_user_by_username(self, username: str) -> Optional[UserRecord]:
+        """Get a user by username (case-insensitive)"""
+        return self._users_by_username.get(username.lower())
     
-    def get_user_by_email(self, email: str) -> Optional[User]:
-        """Get a user by email"""
-        for user in self.users:
-            if user.email == email:
-                return user
-        return None
+    def get_user_by_email(self, email: str) -> Optional[UserRecord]:
+        """Get a user by email (case-insensitive)"""
+        return self._users_by_email.get(email.lower())
     
-    def get_user(self, user_id: str) -> Optional[User]:
+    def get_user(self, user_id: str) -> Optional[UserRecord]:
         """Get a user by ID"""
-        for user in self.users:
-            if user.id == user_id:
-                return user
-        return None
+        return self._users_by_id.get(user_id)
     
-    def create_user(self, user_data: Dict[str, Any]) -> User:
+    @logged_mutation
+    def create_user(self, user_data: Dict[str, Any]) -> UserRecord:
         """Create a new user"""
         # Generate ID if not provided
         if "id" not in user_data:
             user_data["id"] = str(uuid.uuid4())
+        user_data.setdefault("createdAt", self._now())
         
-        # Create User instance
-        user = User(**user_data)
+        # Create User record
+        user = UserRecord.from_dict(user_data)
         
         # Add to storage
         self.users.append(user)
+        self._index_user(user)
         
         return user
     
-    def update_user(self, user_id: str, user_data: Dict[str, Any]) -> Optional[User]:
+    @logged_mutation
+    def update_user(self, user_id: str, user_data: Dict[str, Any]) -> Optional[UserRecord]:
         """Update a user"""
         user = self.get_user(user_id)
         
         if not user:
             return None
         
+        # Drop the old index keys in case username or email change
+        self._unindex_user(user)
+        
         # Update fields
         for key, value in user_data.items():
-            if hasattr(user, key):
+            if key in user.field_set:
                 setattr(user, key, value)
         
         # Update timestamp
-        user.updatedAt = datetime.now()
+        user.updatedAt = self._now()
+        
+        # Re-index under the current keys
+        self._index_user(user)
         
         return user
     
-    def update_account_balance(self, user_id: str, balance: float) -> Optional[User]:
+    @logged_mutation
+    def update_account_balance(self, user_id: str, balance: float) -> Optional[UserRecord]:
         """Update a user's account balance"""
         user = self.get_user(user_id)
         
@@ -567,18 +1060,19 @@ class MemStorage:
             return None
         
         user.accountBalance = balance
-        user.updatedAt = datetime.now()
+        user.updatedAt = self._now()
         
         return user
     
-    def update_last_login(self, user_id: str) -> Optional[User]:
+    @logged_mutation
+    def update_last_login(self, user_id: str) -> Optional[UserRecord]:
         """Update a user's last login time"""
         user = self.get_user(user_id)
         
         if not user:
             return None
         
-        user.lastLogin = datetime.now()
+        user.lastLogin = self._now()
         
         return user
     
@@ -587,301 +1081,474 @@ class MemStorage:
                        sector: Optional[str] = None,
                        exchange: Optional[str] = None,
                        min_price: Optional[float] = None,
-                       max_price: Optional[float] = None) -> List[Stock]:
-        """Get all stocks with optional filtering"""
-        filtered_stocks = self.stocks
+                       max_price: Optional[float] = None) -> List[StockRecord]:
+        """Get all stocks with optional filtering, in listing order
+        
+        The most selective filter picks the index to read from; the other
+        filters are checked on each candidate. Sector, exchange and full
+        scans read in listing order and stop once offset + limit matches
+        are found; a price range is read whole and its first offset + limit
+        matches by listing are kept.
+        """
+        def matches(stock: StockRecord) -> bool:
+            if sector and stock.sector != sector:
+                return False
+            if exchange and stock.exchange != exchange:
+                return False
+            if min_price is not None and stock.currentPrice < min_price:
+                return False
+            if max_price is not None and stock.currentPrice > max_price:
+                return False
+            return True
+        
+        # Candidate sources with their exact sizes
+        candidates = []
         
-        # Apply filters
         if sector:
-            filtered_stocks = [s for s in filtered_stocks if s.sector == sector]
+            sector_stocks = self._stocks_by_sector.get(sector, {})
+            candidates.append((len(sector_stocks), lambda: iter(sector_stocks.values())))
         
         if exchange:
-            filtered_stocks = [s for s in filtered_stocks if s.exchange == exchange]
+            exchange_stocks = self._stocks_by_exchange.get(exchange, {})
+            candidates.append((len(exchange_stocks), lambda: iter(exchange_stocks.values())))
+        
+        if min_price is not None or max_price is not None:
+            def price_source():
+                # The price index is in price order; take the page by listing sequence
+                in_range = (self._stocks_by_id[stock_id]
+                            for stock_id in self._stock_price_index.range(min_price, max_price))
+                page = heapq.nsmallest(offset + limit, filter(matches, in_range),
+                                       key=lambda stock: self._stock_listing[stock.id])
+                return iter(page)
+            
+            candidates.append((self._stock_price_index.count_range(min_price, max_price), price_source))
         
-        if min_price is not None:
-            filtered_stocks = [s for s in filtered_stocks if s.currentPrice >= min_price]
+        # Start from the most selective predicate
+        if candidates:
+            source = min(candidates, key=lambda candidate: candidate[0])[1]()
+        else:
+            source = iter(self.stocks)
         
-        if max_price is not None:
-            filtered_stocks = [s for s in filtered_stocks if s.currentPrice <= max_price]
+        # Check the remaining predicates and stream until the page is full
+        results = []
+        skipped = 0
         
-        # Apply pagination
-        start_idx = offset
-        end_idx = offset + limit
+        for stock in source:
+            if not matches(stock):
+                continue
+            
+            if skipped < offset:
+                skipped += 1
+                continue
+            
+            results.append(stock)
+            if len(results) >= limit:
+                break
         
-        return filtered_stocks[start_idx:end_idx]
+        return results
     
-    def get_stock(self, stock_id: str) -> Optional[Stock]:
+    def get_stock(self, stock_id: str) -> Optional[StockRecord]:
         """Get a stock by ID"""
-        for stock in self.stocks:
-            if stock.id == stock_id:
-                return stock
-        return None
+        return self._stocks_by_id.get(stock_id)
     
-    def get_stock_by_symbol(self, symbol: str) -> Optional[Stock]:
+    def get_stocks_by_ids(self, stock_ids: Iterable[str]) -> Dict[str, StockRecord]:
+        """Get the stocks with the given IDs, keyed by ID (missing IDs are omitted)"""
+        stocks = {}
+        for stock_id in stock_ids:
+            stock = self._stocks_by_id.get(stock_id)
+            if stock is not None:
+                stocks[stock_id] = stock
+        return stocks
+    
+    def get_stock_by_symbol(self, symbol: str) -> Optional[StockRecord]:
         """Get a stock by symbol"""
-        for stock in self.stocks:
-            if stock.symbol.upper() == symbol.upper():
-                return stock
-        return None
+        return self._stocks_by_symbol.get(symbol.upper())
+    
+    @logged_mutation
+    def create_stock(self, stock_data: Dict[str, Any]) -> StockRecord:
+        """Create a stock listing"""
+        # Generate ID if not provided
+        if "id" not in stock_data:
+            stock_data["id"] = str(uuid.uuid4())
+        stock_data.setdefault("updatedAt", self._now())
+        
+        # Create Stock record
+        stock = StockRecord.from_dict(stock_data)
+        
+        # Add to storage
+        self.stocks.append(stock)
+        self._index_stock(stock)
+        
+        return stock
+    
+    @logged_mutation
+    def update_stock(self, stock_id: str, stock_data: Dict[str, Any]) -> Optional[StockRecord]:
+        """Update a stock listing"""
+        stock = self.get_stock(stock_id)
+        
+        if not stock:
+            return None
+        
+        # Drop the old index keys in case indexed fields change; the
+        # sector and exchange buckets only when those do, to keep their order
+        moved = any(key in stock_data and stock_data[key] != getattr(stock, key) for key in ("sector", "exchange"))
+        self._unindex_stock(stock, buckets=moved)
+        
+        # Update fields
+        for key, value in stock_data.items():
+            if key in stock.field_set:
+                setattr(stock, key, value)
+        
+        # Update timestamp
+        stock.updatedAt = self._now()
+        
+        # Re-index under the current keys
+        self._index_stock(stock, buckets=moved)
+        
+        if "currentPrice" in stock_data:
+            self._publish_prices([stock_id])
+        
+        return stock
+    
+    @logged_mutation
+    def apply_quotes(self, quotes: List[Dict[str, Any]]) -> QuoteResult:
+        """Apply a batch of quotes to the stocks they name (see data/quotes.py)
+        
+        Raises ValueError for a malformed quote, before any stock changes.
+        The price listeners are told about the whole batch at once.
+        """
+        batch = parse_quotes(quotes)
+        stocks, fields, unknown = derive_quote_fields(batch, self._stocks_by_id, self._stocks_by_symbol)
+        
+        now = self._now()
+        for stock, price, change, change_percent, high, low, volume in zip(
+            stocks, *(fields[name] for name in QUOTE_FIELDS)
+        ):
+            stock.currentPrice = price
+            stock.dailyChange = change
+            stock.dailyChangePercent = change_percent
+            stock.high = high
+            stock.low = low
+            stock.volume = volume
+            stock.updatedAt = now
+        
+        # Move the changed stocks within the price and ranking indexes
+        stock_ids = [stock.id for stock in stocks]
+        self._stock_price_index.add_many(zip(stock_ids, fields["currentPrice"]))
+        for name, key_fn in self._stock_rankings.items():
+            index = self._stock_ranking_indexes[name]
+            ranked = []
+            for stock in stocks:
+                value = key_fn(stock)
+                if value is None:
+                    index.discard(stock.id)
+                else:
+                    ranked.append((stock.id, value))
+            index.add_many(ranked)
+        
+        if stock_ids:
+            self._publish_prices(stock_ids)
+        
+        return QuoteResult(len(batch.prices), stock_ids, unknown)
     
     def get_top_stocks(self, limit: int = 5, 
-                       filter_by: str = "performance") -> List[Stock]:
-        """Get top performing stocks"""
-        if filter_by == "performance":
-            # Sort by daily performance
-            sorted_stocks = sorted(
-                self.stocks, 
-                key=lambda s: s.dailyChangePercent, 
-                reverse=True
-            )
-        elif filter_by == "volume":
-            # Sort by volume
-            sorted_stocks = sorted(
-                self.stocks, 
-                key=lambda s: s.volume, 
-                reverse=True
-            )
-        elif filter_by == "market_cap":
-            # Sort by market cap
-            sorted_stocks = sorted(
-                [s for s in self.stocks if s.marketCap is not None], 
-                key=lambda s: s.marketCap, 
-                reverse=True
-            )
-        else:
-            sorted_stocks = self.stocks
+                       filter_by: str = "performance") -> List[StockRecord]:
+        """Get top stocks by a registered ranking (highest first)
+        
+        Stocks without a value for the ranking are left out. An unknown
+        filter_by returns stocks in listing order.
+        """
+        index = self._stock_ranking_indexes.get(filter_by)
         
-        return sorted_stocks[:limit]
+        if index is None:
+            return self.stocks[:limit]
+        
+        return [self._stocks_by_id[stock_id] for stock_id in index.last(limit)]
     
-    def search_stocks(self, query: str, limit: int = 10) -> List[Stock]:
-        """Search stocks by name or symbol"""
-        # Case-insensitive search in name and symbol
-        query = query.lower()
-        results = []
+    def register_stock_ranking(self, name: str, key_fn: Callable[[StockRecord], Optional[float]]) -> None:
+        """Register a live ranking for get_top_stocks under filter_by=name"""
+        index = SortedIndex()
         
         for stock in self.stocks:
-            if (query in stock.name.lower() or 
-                query in stock.symbol.lower() or
-                (stock.description and query in stock.description.lower())):
-                results.append(stock)
-                
-                if len(results) >= limit:
-                    break
+            value = key_fn(stock)
+            if value is not None:
+                index.add(stock.id, value)
         
-        return results
+        self._stock_rankings[name] = key_fn
+        self._stock_ranking_indexes[name] = index
+    
+    def search_stocks(self, query: str, limit: int = 10) -> List[StockRecord]:
+        """Search stocks by symbol, name or description
+        
+        Results are ranked: exact symbol, symbol prefix, name prefix,
+        substring, then typo-tolerant trigram matches.
+        """
+        return [self._stocks_by_id[stock_id]
+                for stock_id in self._stock_search_index.search(query, limit)]
     
     def get_unique_sectors(self) -> List[str]:
         """Get all unique sectors"""
-        sectors = set()
-        
-        for stock in self.stocks:
-            if stock.sector:
-                sectors.add(stock.sector)
-        
-        return sorted(list(sectors))
+        return sorted(self._stocks_by_sector)
     
     def get_unique_exchanges(self) -> List[str]:
         """Get all unique exchanges"""
-        exchanges = set()
-        
-        for stock in self.stocks:
-            exchanges.add(stock.exchange)
-        
-        return sorted(list(exchanges))
+        return sorted(self._stocks_by_exchange)
     
     # AI recommendation methods
     def get_all_ai_suggestions(self, limit: int = 100, offset: int = 0,
                               suggestion_type: Optional[str] = None,
-                              sentiment: Optional[str] = None) -> List[AIRecommendation]:
+                              sentiment: Optional[str] = None) -> List[AIRecommendationRecord]:
         """Get all AI suggestions with optional filtering"""
-        filtered_suggestions = self.ai_recommendations
+        key = (suggestion_type.upper() if suggestion_type else None,
+               sentiment.upper() if sentiment else None)
         
-        # Apply filters
-        if suggestion_type:
-            filtered_suggestions = [s for s in filtered_suggestions if s.type == suggestion_type.upper()]
-        
-        if sentiment:
-            filtered_suggestions = [s for s in filtered_suggestions if s.sentiment == sentiment.upper()]
-        
-        # Apply pagination
-        start_idx = offset
-        end_idx = offset + limit
-        
-        return filtered_suggestions[start_idx:end_idx]
+        # Apply pagination to the pre-filtered list
+        return self._recommendations_by_filter.get(key, [])[offset:offset + limit]
+    
+    def _ranked_suggestions(self, key: Tuple[Optional[str], Optional[str]],
+                            limit: int) -> List[AIRecommendationRecord]:
+        """Highest-confidence current suggestions under a filter key"""
+        ranking = self._recommendation_rankings.get(key)
+        if ranking is None:
+            return []
+        return [self._recommendations_by_id[rec_id] for rec_id in ranking.last(limit)]
     
     def get_top_ai_suggestions(self, limit: int = 5,
-                              suggestion_type: Optional[str] = None) -> List[AIRecommendation]:
-        """Get top AI suggestions based on confidence score"""
-        filtered_suggestions = self.ai_recommendations
-        
-        # Apply type filter if provided
-        if suggestion_type:
-            filtered_suggestions = [s for s in filtered_suggestions if s.type == suggestion_type.upper()]
-        
-        # Sort by confidence score
-        sorted_suggestions = sorted(
-            filtered_suggestions,
-            key=lambda s: s.confidence,
-            reverse=True
-        )
+                              suggestion_type: Optional[str] = None) -> List[AIRecommendationRecord]:
+        """Get top AI suggestions based on confidence score
         
-        return sorted_suggestions[:limit]
+        Only each stock's latest suggestion is ranked.
+        """
+        key = (suggestion_type.upper() if suggestion_type else None, None)
+        return self._ranked_suggestions(key, limit)
     
-    def get_stock_ai_suggestion(self, stock_id: str) -> Optional[AIRecommendation]:
-        """Get AI suggestion for a specific stock"""
-        for suggestion in self.ai_recommendations:
-            if suggestion.stockId == stock_id:
-                return suggestion
-        return None
+    def get_stock_ai_suggestion(self, stock_id: str) -> Optional[AIRecommendationRecord]:
+        """Get the latest AI suggestion for a specific stock"""
+        history = self._recommendations_by_stock.get(stock_id)
+        return history[-1] if history else None
     
-    def get_suggestions_by_type(self, suggestion_type: str, limit: int = 10) -> List[AIRecommendation]:
-        """Get AI suggestions by type"""
-        suggestions = [s for s in self.ai_recommendations if s.type == suggestion_type]
+    def get_stock_ai_suggestion_history(self, stock_id: str, limit: int = 100,
+                                        offset: int = 0) -> List[AIRecommendationRecord]:
+        """Get a stock's AI suggestions, newest first"""
+        history = self._recommendations_by_stock.get(stock_id, [])
+        end = max(0, len(history) - offset)
+        start = max(0, end - limit)
+        return history[start:end][::-1]
+    
+    def get_suggestions_by_type(self, suggestion_type: str, limit: int = 10) -> List[AIRecommendationRecord]:
+        """Get AI suggestions by type, highest confidence first
         
-        # Sort by confidence
-        sorted_suggestions = sorted(
-            suggestions,
-            key=lambda s: s.confidence,
-            reverse=True
-        )
+        Only each stock's latest suggestion is ranked.
+        """
+        return self._ranked_suggestions((suggestion_type, None), limit)
+    
+    @logged_mutation
+    def create_ai_suggestion(self, suggestion_data: Dict[str, Any]) -> AIRecommendationRecord:
+        """Record a new AI suggestion for a stock"""
+        # Generate ID if not provided
+        if "id" not in suggestion_data:
+            suggestion_data["id"] = str(uuid.uuid4())
+        suggestion_data.setdefault("createdAt", self._now())
+        
+        # Create AIRecommendation record
+        suggestion = AIRecommendationRecord.from_dict(suggestion_data)
         
-        return sorted_suggestions[:limit]
+        # Add to storage
+        self.ai_recommendations.append(suggestion)
+        self._index_recommendation(suggestion)
+        
+        return suggestion
     
     # Historical data methods
-    def get_stock_historical_data(self, stock_id: str, days: int = 30) -> List[HistoricalData]:
-        """Get historical data for a stock"""
-        # Filter by stock ID
-        data = [h for h in self.historical_data if h.stockId == stock_id]
-        
-        # Sort by date (newest first)
-        sorted_data = sorted(
-            data,
-            key=lambda h: h.date,
-            reverse=True
+    def get_stock_historical_data(self, stock_id: str, days: int = 30,
+                                  start_date: Optional[datetime] = None,
+                                  end_date: Optional[datetime] = None) -> HistoricalWindow:
+        """Get historical data for a stock
+        
+        Returns the bars dated within [start_date, end_date] when either
+        bound is given, otherwise the most recent days bars. The result is
+        a zero-copy, oldest-first columnar view; it is empty when the stock
+        has no history.
+        """
+        if start_date is not None or end_date is not None:
+            return self.historical_data.window(stock_id, start_date, end_date)
+        
+        return self.historical_data.tail(stock_id, days)
+    
+    @logged_mutation
+    def add_historical_data(self, historical_data: Dict[str, Any]) -> HistoricalWindow:
+        """Append an end-of-day bar to a stock's history"""
+        series = self.historical_data.append(
+            historical_data["stockId"],
+            historical_data["date"],
+            historical_data["open"],
+            historical_data["high"],
+            historical_data["low"],
+            historical_data["close"],
+            historical_data["volume"]
         )
         
-        # Limit by days
-        return sorted_data[:days]
+        self._publish_prices([historical_data["stockId"]])
+        
+        return series.tail(1)
     
     # Watchlist methods
-    def get_user_watchlist(self, user_id: str) -> List[Watchlist]:
+    def get_user_watchlist(self, user_id: str) -> List[WatchlistRecord]:
         """Get a user's watchlist"""
-        return [w for w in self.watchlists if w.userId == user_id]
+        return list(self._watchlist_by_user.get(user_id, {}).values())
     
     def is_stock_in_watchlist(self, user_id: str, stock_id: str) -> bool:
         """Check if a stock is in a user's watchlist"""
-        for item in self.watchlists:
-            if item.userId == user_id and item.stockId == stock_id:
-                return True
-        return False
+        return (user_id, stock_id) in self.watchlists
     
-    def add_to_watchlist(self, watchlist_data: Dict[str, Any]) -> Watchlist:
+    @logged_mutation
+    def add_to_watchlist(self, watchlist_data: Dict[str, Any]) -> WatchlistRecord:
         """Add a stock to a user's watchlist"""
         # Generate ID if not provided
         if "id" not in watchlist_data:
             watchlist_data["id"] = str(uuid.uuid4())
+        watchlist_data.setdefault("createdAt", self._now())
         
-        # Create Watchlist instance
-        watchlist_item = Watchlist(**watchlist_data)
+        # Create Watchlist record
+        watchlist_item = WatchlistRecord.from_dict(watchlist_data)
         
         # Add to storage
-        self.watchlists.append(watchlist_item)
+        self.watchlists[(watchlist_item.userId, watchlist_item.stockId)] = watchlist_item
+        self._watchlist_by_user.setdefault(watchlist_item.userId, {})[watchlist_item.stockId] = watchlist_item
+        self._watchers_by_stock.setdefault(watchlist_item.stockId, set()).add(watchlist_item.userId)
+        self._price_alerts.add(watchlist_item.userId, watchlist_item.stockId,
+                               watchlist_item.alertCondition, watchlist_item.alertPrice)
         
         return watchlist_item
     
+    @logged_mutation
     def update_watchlist_item(self, user_id: str, stock_id: str, 
                              alert_price: Optional[float], 
-                             alert_condition: Optional[str]) -> Optional[Watchlist]:
+                             alert_condition: Optional[str]) -> Optional[WatchlistRecord]:
         """Update a watchlist item"""
-        # Find the watchlist item
-        for item in self.watchlists:
-            if item.userId == user_id and item.stockId == stock_id:
-                # Update alert settings
-                item.alertPrice = alert_price
-                item.alertCondition = alert_condition
-                
-                # Update timestamp
-                item.updatedAt = datetime.now()
-                
-                return item
+        item = self.watchlists.get((user_id, stock_id))
         
-        return None
+        if not item:
+            return None
+        
+        # Update alert settings
+        item.alertPrice = alert_price
+        item.alertCondition = alert_condition
+        self._price_alerts.add(user_id, stock_id, alert_condition, alert_price)
+        
+        # Update timestamp
+        item.updatedAt = self._now()
+        
+        return item
     
+    @logged_mutation
     def remove_from_watchlist(self, user_id: str, stock_id: str) -> bool:
         """Remove a stock from a user's watchlist"""
-        # Find the watchlist item
-        for i, item in enumerate(self.watchlists):
-            if item.userId == user_id and item.stockId == stock_id:
-                # Remove from list
-                self.watchlists.pop(i)
-                return True
-        
-        return False
+        if self.watchlists.pop((user_id, stock_id), None) is None:
+            return False
+        self._price_alerts.discard(user_id, stock_id)
+        self._discard_member(self._watchers_by_stock, stock_id, user_id)
+        
+        # Drop from the user's membership map
+        user_items = self._watchlist_by_user.get(user_id)
+        if user_items is not None:
+            user_items.pop(stock_id, None)
+            if not user_items:
+                del self._watchlist_by_user[user_id]
+        
+        return True
+    
+    def get_crossed_alerts(self, stock_id: str, previous_price: float, price: float) -> List[WatchlistRecord]:
+        """Watchlist items whose price alert a move from previous_price to price crosses
+        
+        A rise crosses ABOVE alerts in (previous_price, price], a fall BELOW
+        alerts in [price, previous_price). Called without the write lock,
+        so an item removed meanwhile is skipped.
+        """
+        items = (self.watchlists.get((user_id, stock_id))
+                 for user_id in self._price_alerts.crossed(stock_id, previous_price, price))
+        return [item for item in items if item is not None]
     
     # Portfolio methods
-    def get_user_portfolio(self, user_id: str) -> List[Portfolio]:
+    def get_user_portfolio(self, user_id: str) -> List[PortfolioRecord]:
         """Get a user's portfolio"""
-        return [p for p in self.portfolios if p.userId == user_id]
+        return list(self._portfolio_by_user.get(user_id, {}).values())
     
-    def get_portfolio_item(self, user_id: str, stock_id: str) -> Optional[Portfolio]:
+    def get_portfolio_item(self, user_id: str, stock_id: str) -> Optional[PortfolioRecord]:
         """Get a specific portfolio item"""
-        for item in self.portfolios:
-            if item.userId == user_id and item.stockId == stock_id:
-                return item
-        return None
+        return self.portfolios.get((user_id, stock_id))
     
-    def create_portfolio_item(self, portfolio_data: Dict[str, Any]) -> Portfolio:
+    @logged_mutation
+    def create_portfolio_item(self, portfolio_data: Dict[str, Any]) -> PortfolioRecord:
         """Create a portfolio item"""
         # Generate ID if not provided
         if "id" not in portfolio_data:
             portfolio_data["id"] = str(uuid.uuid4())
+        portfolio_data.setdefault("createdAt", self._now())
         
-        # Create Portfolio instance
-        portfolio_item = Portfolio(**portfolio_data)
+        # Create Portfolio record
+        portfolio_item = PortfolioRecord.from_dict(portfolio_data)
         
         # Add to storage
-        self.portfolios.append(portfolio_item)
+        self.portfolios[(portfolio_item.userId, portfolio_item.stockId)] = portfolio_item
+        self._portfolio_by_user.setdefault(portfolio_item.userId, {})[portfolio_item.stockId] = portfolio_item
+        self._holders_by_stock.setdefault(portfolio_item.stockId, set()).add(portfolio_item.userId)
         
         return portfolio_item
     
+    @logged_mutation
     def update_portfolio_item(self, user_id: str, stock_id: str, 
-                             quantity: float, average_buy_price: float) -> Optional[Portfolio]:
+                             quantity: float, average_buy_price: float) -> Optional[PortfolioRecord]:
         """Update a portfolio item"""
-        # Find the portfolio item
-        for item in self.portfolios:
-            if item.userId == user_id and item.stockId == stock_id:
-                # Update fields
-                item.quantity = quantity
-                item.averageBuyPrice = average_buy_price
-                
-                # Update timestamp
-                item.updatedAt = datetime.now()
-                
-                return item
+        item = self.portfolios.get((user_id, stock_id))
         
-        return None
+        if not item:
+            return None
+        
+        # Update fields
+        item.quantity = quantity
+        item.averageBuyPrice = average_buy_price
+        
+        # Update timestamp
+        item.updatedAt = self._now()
+        
+        return item
     
+    @logged_mutation
     def delete_portfolio_item(self, user_id: str, stock_id: str) -> bool:
         """Delete a portfolio item"""
-        # Find the portfolio item
-        for i, item in enumerate(self.portfolios):
-            if item.userId == user_id and item.stockId == stock_id:
-                # Remove from list
-                self.portfolios.pop(i)
-                return True
-        
-        return False
+        if self.portfolios.pop((user_id, stock_id), None) is None:
+            return False
+        self._discard_member(self._holders_by_stock, stock_id, user_id)
+        
+        # Drop from the user's membership map
+        user_items = self._portfolio_by_user.get(user_id)
+        if user_items is not None:
+            user_items.pop(stock_id, None)
+            if not user_items:
+                del self._portfolio_by_user[user_id]
+        
+        return True
+    
+    def get_stock_holders(self, stock_id: str) -> Set[str]:
+        """IDs of the users holding a stock in their portfolio"""
+        return set(self._holders_by_stock.get(stock_id, ()))
+    
+    def get_stock_watchers(self, stock_id: str) -> Set[str]:
+        """IDs of the users with a stock on their watchlist"""
+        return set(self._watchers_by_stock.get(stock_id, ()))
     
     def get_portfolio_value(self, user_id: str) -> Dict[str, Any]:
         """Get the total value of a user's portfolio"""
         portfolio_items = self.get_user_portfolio(user_id)
+        stocks = self.get_stocks_by_ids(item.stockId for item in portfolio_items)
         
         total_value = 0.0
         total_investment = 0.0
         
         for item in portfolio_items:
             # Get current stock price
-            stock = self.get_stock(item.stockId)
+            stock = stocks.get(item.stockId)
             
             if stock:
                 current_value = stock.currentPrice * item.quantity
@@ -902,32 +1569,50 @@ class MemStorage:
         }
     
     # Strategy methods
-    def get_user_strategies(self, user_id: str) -> List[Strategy]:
+    def get_user_strategies(self, user_id: str) -> List[StrategyRecord]:
         """Get a user's trading strategies"""
-        return [s for s in self.strategies if s.userId == user_id]
+        return list(self._strategies_by_user.get(user_id, {}).values())
     
-    def get_strategy(self, strategy_id: str) -> Optional[Strategy]:
+    def get_strategy(self, strategy_id: str) -> Optional[StrategyRecord]:
         """Get a strategy by ID"""
-        for strategy in self.strategies:
-            if strategy.id == strategy_id:
-                return strategy
-        return None
+        return self._strategies_by_id.get(strategy_id)
+    
+    def get_active_strategies(self) -> List[StrategyRecord]:
+        """Get every strategy with ACTIVE status"""
+        return [strategy for strategy in self.strategies if strategy.status == "ACTIVE"]
+    
+    def get_compiled_strategy(self, strategy_id: str) -> Optional[CompiledStrategy]:
+        """Get a strategy's compiled conditions, compiling them on first use
+        
+        Raises ValueError if the stored conditions don't compile.
+        """
+        compiled = self._compiled_strategies.get(strategy_id)
+        if compiled is None:
+            strategy = self._strategies_by_id.get(strategy_id)
+            if strategy is None:
+                return None
+            compiled = self._compiled_strategies[strategy_id] = compile_strategy(strategy)
+        return compiled
     
-    def create_strategy(self, strategy_data: Dict[str, Any]) -> Strategy:
+    @logged_mutation
+    def create_strategy(self, strategy_data: Dict[str, Any]) -> StrategyRecord:
         """Create a trading strategy"""
         # Generate ID if not provided
         if "id" not in strategy_data:
             strategy_data["id"] = str(uuid.uuid4())
+        strategy_data.setdefault("createdAt", self._now())
         
-        # Create Strategy instance
-        strategy = Strategy(**strategy_data)
+        # Create Strategy record
+        strategy = StrategyRecord.from_dict(strategy_data)
         
         # Add to storage
         self.strategies.append(strategy)
+        self._index_strategy(strategy)
         
         return strategy
     
-    def update_strategy(self, strategy_id: str, strategy_data: Dict[str, Any]) -> Optional[Strategy]:
+    @logged_mutation
+    def update_strategy(self, strategy_id: str, strategy_data: Dict[str, Any]) -> Optional[StrategyRecord]:
         """Update a trading strategy"""
         strategy = self.get_strategy(strategy_id)
         
@@ -936,23 +1621,50 @@ class MemStorage:
         
         # Update fields
         for key, value in strategy_data.items():
-            if hasattr(strategy, key):
+            if key in strategy.field_set:
                 setattr(strategy, key, value)
         
         # Update timestamp
-        strategy.updatedAt = datetime.now()
+        strategy.updatedAt = self._now()
+        
+        # Conditions or risk management may have changed
+        self._compiled_strategies.pop(strategy_id, None)
+        
+        return strategy
+    
+    @logged_mutation
+    def update_strategy_metrics(self, strategy_id: str, name: str,
+                                metrics: Dict[str, Any]) -> Optional[StrategyRecord]:
+        """Set one entry of a strategy's performanceMetrics, such as "backtest"
+        
+        Metrics aren't part of the definition, so updatedAt and the
+        compiled strategy are left alone.
+        """
+        strategy = self._strategies_by_id.get(strategy_id)
+        
+        if not strategy:
+            return None
+        
+        strategy.performanceMetrics[name] = metrics
         
         return strategy
     
+    @logged_mutation
     def delete_strategy(self, strategy_id: str) -> bool:
         """Delete a trading strategy"""
-        for i, strategy in enumerate(self.strategies):
-            if strategy.id == strategy_id:
-                self.strategies.pop(i)
-                return True
-        return False
+        strategy = self._strategies_by_id.get(strategy_id)
+        
+        if not strategy:
+            return False
+        
+        self.strategies.remove(strategy)
+        self._unindex_strategy(strategy)
+        self._compiled_strategies.pop(strategy_id, None)
+        
+        return True
     
-    def toggle_strategy_status(self, strategy_id: str) -> Optional[Strategy]:
+    @logged_mutation
+    def toggle_strategy_status(self, strategy_id: str) -> Optional[StrategyRecord]:
         """Toggle a strategy's active status"""
         strategy = self.get_strategy(strategy_id)
         
@@ -966,58 +1678,246 @@ class MemStorage:
             strategy.status = "ACTIVE"
         
         # Update timestamp
-        strategy.updatedAt = datetime.now()
+        strategy.updatedAt = self._now()
         
         return strategy
     
     # Transaction methods
+    def get_transaction(self, transaction_id: str) -> Optional[TransactionRecord]:
+        """Get a transaction by ID"""
+        return self._transactions_by_id.get(transaction_id)
+    
     def get_user_transactions(self, user_id: str, limit: int = 100, offset: int = 0,
-                              transaction_type: Optional[str] = None) -> List[Transaction]:
-        """Get a user's transactions"""
-        # Filter by user ID
-        transactions = [t for t in self.transactions if t.userId == user_id]
-        
-        # Apply type filter if provided
+                              transaction_type: Optional[str] = None,
+                              start_date: Optional[datetime] = None,
+                              end_date: Optional[datetime] = None,
+                              after: Optional[str] = None) -> List[TransactionRecord]:
+        """Get a user's transactions (newest first)
+        
+        start_date and end_date bound createdAt inclusively. after is a
+        cursor from encode_transaction_cursor; only transactions older
+        than the one it points at are returned.
+        """
+        # Pick the pre-sorted series for this user (and type)
         if transaction_type:
-            transactions = [t for t in transactions if t.type == transaction_type.upper()]
+            series = self._transactions_by_user_type.get((user_id, transaction_type.upper()), [])
+        else:
+            series = self._transactions_by_user.get(user_id, [])
         
-        # Sort by creation date (newest first)
-        sorted_transactions = sorted(
-            transactions,
-            key=lambda t: t.createdAt,
-            reverse=True
-        )
+        # Narrow to the requested window with binary search
+        lo = 0
+        hi = len(series)
         
-        # Apply pagination
-        start_idx = offset
-        end_idx = offset + limit
+        if start_date is not None:
+            lo = bisect.bisect_left(series, start_date, key=lambda t: t.createdAt)
+        
+        if end_date is not None:
+            hi = bisect.bisect_right(series, end_date, key=lambda t: t.createdAt)
         
-        return sorted_transactions[start_idx:end_idx]
+        if after:
+            hi = min(hi, bisect.bisect_left(series, decode_transaction_cursor(after),
+                                            key=_transaction_sort_key))
+        
+        # Apply pagination from the newest end of the window; a negative
+        # offset or limit must not reach past it
+        offset = max(offset, 0)
+        limit = max(limit, 0)
+        start_idx = max(lo, hi - offset - limit)
+        end_idx = max(lo, hi - offset)
+        
+        return series[start_idx:end_idx][::-1]
+    
+    def get_transaction_summary(self, user_id: str,
+                                start_date: Optional[datetime] = None,
+                                end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get buy/sell totals for a user's completed transactions, overall and by stock
+        
+        Without a date range this reads the running totals. With one, whole
+        days come from the per-day buckets and only the partial days at
+        either edge are replayed from the transaction index.
+        """
+        if start_date is None and end_date is None:
+            totals = self._transaction_totals.get(user_id)
+            summary = self._new_transaction_summary()
+            if totals:
+                self._merge_summary(summary, totals)
+        else:
+            summary = self._summarize_transaction_range(user_id, start_date, end_date)
+        
+        # Derive profit/loss figures
+        summary["netProfitLoss"] = summary["totalSellAmount"] - summary["totalBuyAmount"]
+        for stock_summary in summary["byStock"].values():
+            stock_summary["profitLoss"] = stock_summary["totalSellAmount"] - stock_summary["totalBuyAmount"]
+        
+        return summary
     
-    def create_transaction(self, transaction_data: Dict[str, Any]) -> Transaction:
+    def _summarize_transaction_range(self, user_id: str,
+                                     start_date: Optional[datetime],
+                                     end_date: Optional[datetime]) -> Dict[str, Any]:
+        """Summarize a user's transactions with createdAt in [start_date, end_date]"""
+        summary = self._new_transaction_summary()
+        series = self._transactions_by_user.get(user_id, [])
+        day_keys = self._transaction_day_keys.get(user_id, [])
+        days = self._transaction_days.get(user_id, {})
+        created_at = lambda t: t.createdAt
+        
+        # First and last days that the range covers completely
+        first_day = None
+        if start_date is not None:
+            first_day = start_date.date() if start_date.time() == time.min else start_date.date() + timedelta(days=1)
+        
+        last_day = None
+        if end_date is not None:
+            last_day = end_date.date() if end_date.time() == time.max else end_date.date() - timedelta(days=1)
+        
+        # A range inside one or two partial days is replayed directly
+        if first_day is not None and last_day is not None and first_day > last_day:
+            lo = bisect.bisect_left(series, start_date, key=created_at)
+            hi = bisect.bisect_right(series, end_date, key=created_at)
+            for transaction in series[lo:hi]:
+                self._add_to_summary(summary, transaction)
+            return summary
+        
+        # Whole days from the buckets
+        lo = 0 if first_day is None else bisect.bisect_left(day_keys, first_day)
+        hi = len(day_keys) if last_day is None else bisect.bisect_right(day_keys, last_day)
+        for day in day_keys[lo:hi]:
+            self._merge_summary(summary, days[day])
+        
+        # Partial day before the first whole day
+        if first_day is not None:
+            lo = bisect.bisect_left(series, start_date, key=created_at)
+            hi = bisect.bisect_left(series, datetime.combine(first_day, time.min), key=created_at)
+            for transaction in series[lo:hi]:
+                self._add_to_summary(summary, transaction)
+        
+        # Partial day after the last whole day
+        if last_day is not None:
+            lo = bisect.bisect_left(series, datetime.combine(last_day + timedelta(days=1), time.min),
+                                    key=created_at)
+            hi = bisect.bisect_right(series, end_date, key=created_at)
+            for transaction in series[lo:hi]:
+                self._add_to_summary(summary, transaction)
+        
+        return summary
+    
+    @logged_mutation
+    def create_transaction(self, transaction_data: Dict[str, Any]) -> TransactionRecord:
         """Create a transaction record"""
         # Generate ID if not provided
         if "id" not in transaction_data:
             transaction_data["id"] = str(uuid.uuid4())
+        transaction_data.setdefault("createdAt", self._now())
         
         # If completed time not provided and status is COMPLETED, set to current time
         if "completedAt" not in transaction_data and transaction_data.get("status") == "COMPLETED":
-            transaction_data["completedAt"] = datetime.now()
+            transaction_data["completedAt"] = self._now()
         
-        # Create Transaction instance
-        transaction = Transaction(**transaction_data)
+        # Create Transaction record
+        transaction = TransactionRecord.from_dict(transaction_data)
         
         # Add to storage
         self.transactions.append(transaction)
+        self._index_transaction(transaction)
+        self._aggregate_transaction(transaction)
         
         return transaction
     
+    @logged_mutation
+    def apply_trades(self, trades: List[Dict[str, Any]]) -> List[TransactionRecord]:
+        """Execute a batch of trades in one write
+        
+        Each trade has userId, stockId, type (BUY or SELL), quantity and
+        price, and optionally notes and strategyId. A trade moves the
+        user's balance and portfolio the way the portfolio routes do; one
+        the balance or holding can't cover is recorded as a FAILED
+        transaction and changes nothing else. Completed trades with a
+        strategyId also update that strategy's performanceMetrics["live"];
+        a failed SELL drops the live position if the portfolio no longer
+        holds its shares.
+        """
+        transactions = []
+        
+        for trade in trades:
+            status = self._execute_trade(trade)
+            transaction = self.create_transaction({
+                "id": trade.setdefault("id", str(uuid.uuid4())),
+                "userId": trade["userId"],
+                "stockId": trade["stockId"],
+                "type": trade["type"],
+                "quantity": trade["quantity"],
+                "price": trade["price"],
+                "totalAmount": trade["quantity"] * trade["price"],
+                "status": status,
+                "notes": trade.get("notes")
+            })
+            transactions.append(transaction)
+            
+            # Metrics change in place; updatedAt is for edits to the definition
+            strategy = self._strategies_by_id.get(trade.get("strategyId"))
+            if strategy is None:
+                continue
+            if status == "COMPLETED":
+                apply_fill(strategy.performanceMetrics.setdefault("live", {}), trade["type"],
+                           trade["stockId"], trade["quantity"], trade["price"], self._now())
+            elif trade["type"] == "SELL" and not self._holds(trade):
+                drop_position(strategy.performanceMetrics.get("live", {}), trade["stockId"])
+        
+        return transactions
+    
+    def _holds(self, trade: Dict[str, Any]) -> bool:
+        """Whether the user's portfolio covers a trade's quantity"""
+        item = self.get_portfolio_item(trade["userId"], trade["stockId"])
+        return item is not None and item.quantity >= trade["quantity"]
+    
+    def _execute_trade(self, trade: Dict[str, Any]) -> str:
+        """Apply one trade to the balance and portfolio; returns its status"""
+        user_id, stock_id = trade["userId"], trade["stockId"]
+        quantity, price = trade["quantity"], trade["price"]
+        amount = quantity * price
+        
+        user = self.get_user(user_id)
+        item = self.portfolios.get((user_id, stock_id))
+        if user is None or not quantity > 0 or not price > 0:
+            return "FAILED"
+        
+        if trade["type"] == "BUY":
+            if user.accountBalance < amount:
+                return "FAILED"
+            
+            if item is None:
+                self.create_portfolio_item({
+                    "id": trade.setdefault("portfolioId", str(uuid.uuid4())),
+                    "userId": user_id,
+                    "stockId": stock_id,
+                    "quantity": quantity,
+                    "averageBuyPrice": price
+                })
+            else:
+                total_shares = item.quantity + quantity
+                average_price = (item.quantity * item.averageBuyPrice + amount) / total_shares
+                self.update_portfolio_item(user_id, stock_id, total_shares, average_price)
+            
+            self.update_account_balance(user_id, user.accountBalance - amount)
+        else:
+            if item is None or item.quantity < quantity:
+                return "FAILED"
+            
+            remaining_shares = item.quantity - quantity
+            if remaining_shares > 0:
+                self.update_portfolio_item(user_id, stock_id, remaining_shares, item.averageBuyPrice)
+            else:
+                self.delete_portfolio_item(user_id, stock_id)
+            
+            self.update_account_balance(user_id, user.accountBalance + amount)
+        
+        return "COMPLETED"
+    
     # Notification methods
     def get_user_notifications(self, user_id: str, limit: int = 100, offset: int = 0,
-                              include_read: bool = False) -> List[Notification]:
+                              include_read: bool = False) -> List[NotificationRecord]:
         """Get a user's notifications"""
-        # Filter by user ID
-        notifications = [n for n in self.notifications if n.userId == user_id]
+        notifications = self._notifications_by_user.get(user_id, {}).values()
         
         # Filter out read notifications if specified
         if not include_read:
@@ -1036,43 +1936,123 @@ class MemStorage:
         
         return sorted_notifications[start_idx:end_idx]
     
-    def create_notification(self, notification_data: Dict[str, Any]) -> Notification:
+    def get_notification(self, notification_id: str) -> Optional[NotificationRecord]:
+        """Get a notification by ID"""
+        return self._notifications_by_id.get(notification_id)
+    
+    def count_unread_notifications(self, user_id: str) -> int:
+        """Count a user's unread notifications"""
+        return self._unread_notification_counts.get(user_id, 0)
+    
+    @logged_mutation
+    def create_notification(self, notification_data: Dict[str, Any]) -> NotificationRecord:
         """Create a notification"""
         # Generate ID if not provided
         if "id" not in notification_data:
             notification_data["id"] = str(uuid.uuid4())
+        notification_data.setdefault("createdAt", self._now())
         
-        # Create Notification instance
-        notification = Notification(**notification_data)
+        # Create Notification record
+        notification = NotificationRecord.from_dict(notification_data)
         
         # Add to storage
         self.notifications.append(notification)
+        self._index_notification(notification)
         
         return notification
     
-    def mark_notification_as_read(self, notification_id: str) -> Optional[Notification]:
+    @logged_mutation
+    def create_notifications(self, notifications_data: List[Dict[str, Any]]) -> List[NotificationRecord]:
+        """Create a batch of notifications in one write"""
+        return [self.create_notification(notification_data) for notification_data in notifications_data]
+    
+    @logged_mutation
+    def mark_notification_as_read(self, notification_id: str) -> Optional[NotificationRecord]:
         """Mark a notification as read"""
-        for notification in self.notifications:
-            if notification.id == notification_id:
-                notification.isRead = True
-                notification.readAt = datetime.now()
-                return notification
-        return None
+        notification = self._notifications_by_id.get(notification_id)
+        
+        if not notification:
+            return None
+        
+        if not notification.isRead:
+            self._mark_read_count(notification.userId, 1)
+        
+        notification.isRead = True
+        notification.readAt = self._now()
+        
+        return notification
     
+    @logged_mutation
     def mark_all_notifications_as_read(self, user_id: str) -> int:
         """Mark all notifications for a user as read"""
         count = 0
         
-        for notification in self.notifications:
-            if notification.userId == user_id and not notification.isRead:
+        for notification in self._notifications_by_user.get(user_id, {}).values():
+            if not notification.isRead:
                 notification.isRead = True
-                notification.readAt = datetime.now()
+                notification.readAt = self._now()
                 count += 1
         
+        self._mark_read_count(user_id, count)
+        
         return count
     
+    @logged_mutation
+    def delete_notification(self, notification_id: str) -> bool:
+        """Delete a notification"""
+        notification = self._notifications_by_id.get(notification_id)
+        
+        if not notification:
+            return False
+        
+        self.notifications.remove(notification)
+        self._unindex_notification(notification)
+        
+        return True
+    
+    @logged_mutation
+    def clear_user_notifications(self, user_id: str) -> int:
+        """Delete all of a user's notifications"""
+        user_notifications = self._notifications_by_user.pop(user_id, None)
+        
+        if not user_notifications:
+            return 0
+        
+        self.notifications = [n for n in self.notifications if n.userId != user_id]
+        for notification_id in user_notifications:
+            self._notifications_by_id.pop(notification_id, None)
+        self._unread_notification_counts.pop(user_id, None)
+        
+        return len(user_notifications)
+    
+    def get_notification_settings(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's notification settings (None if never set)"""
+        user = self.get_user(user_id)
+        
+        if not user or "notificationSettings" not in user.preferences:
+            return None
+        
+        return dict(user.preferences["notificationSettings"])
+    
+    @logged_mutation
+    def update_notification_settings(self, user_id: str, settings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Merge settings into a user's notification settings
+        
+        Settings are kept under the "notificationSettings" key of the
+        user's preferences.
+        """
+        user = self.get_user(user_id)
+        
+        if not user:
+            return None
+        
+        user.preferences.setdefault("notificationSettings", {}).update(settings)
+        user.updatedAt = self._now()
+        
+        return dict(user.preferences["notificationSettings"])
+    
     # Chat methods
-    def get_user_chat_history(self, user_id: str, limit: int = 100, offset: int = 0) -> List[ChatMessage]:
+    def get_user_chat_history(self, user_id: str, limit: int = 100, offset: int = 0) -> List[ChatMessageRecord]:
         """Get a user's chat history"""
         # Filter by user ID
         messages = [m for m in self.chat_messages if m.userId == user_id]
@@ -1090,29 +2070,33 @@ class MemStorage:
         
         return sorted_messages[start_idx:end_idx]
     
-    def create_chat_message(self, message_data: Dict[str, Any]) -> ChatMessage:
+    @logged_mutation
+    def create_chat_message(self, message_data: Dict[str, Any]) -> ChatMessageRecord:
         """Create a chat message"""
         # Generate ID if not provided
         if "id" not in message_data:
             message_data["id"] = str(uuid.uuid4())
+        message_data.setdefault("createdAt", self._now())
         
-        # Create ChatMessage instance
-        message = ChatMessage(**message_data)
+        # Create ChatMessage record
+        message = ChatMessageRecord.from_dict(message_data)
         
         # Add to storage
         self.chat_messages.append(message)
         
         return message
     
-    def update_chat_response(self, message_id: str, response: str) -> Optional[ChatMessage]:
+    @logged_mutation
+    def update_chat_response(self, message_id: str, response: str) -> Optional[ChatMessageRecord]:
         """Update a chat message with an AI response"""
         for message in self.chat_messages:
             if message.id == message_id:
                 message.response = response
-                message.respondedAt = datetime.now()
+                message.respondedAt = self._now()
                 return message
         return None
     
+    @logged_mutation
     def clear_chat_history(self, user_id: str) -> int:
         """Clear a user's chat history"""
         count = 0
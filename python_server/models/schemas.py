@@ -186,4 +186,16 @@ class PortfolioRequest(BaseModel):
     stockId: str
     quantity: float
     averageBuyPrice: float
-    notes: Optional[str] = None
\ No newline at end of file
+    notes: Optional[str] = None
+
+class StrategyRequest(BaseModel):
+    """Trading strategy request model"""
+    userId: str
+    name: str
+    description: Optional[str] = None
+    indicators: List[Dict[str, Any]] = []
+    entryConditions: List[Dict[str, Any]] = []
+    exitConditions: List[Dict[str, Any]] = []
+    riskManagement: Dict[str, Any] = {}
+    status: str = "INACTIVE"
+    targetStocks: List[str] = []
@@ -12,6 +12,10 @@ from python_server.routes.stock_routes import register_stock_routes
 from python_server.routes.ai_routes import register_ai_routes
 from python_server.routes.watchlist_routes import register_watchlist_routes
 from python_server.routes.portfolio_routes import register_portfolio_routes
+from python_server.routes.strategy_routes import register_strategy_routes
+from python_server.routes.transaction_routes import register_transaction_routes
+from python_server.routes.notification_routes import register_notification_routes
+from python_server.routes.chat_routes import register_chat_routes
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -23,6 +27,10 @@ def register_all_routes(app: Flask, storage: MemStorage) -> None:
     register_ai_routes(app, storage)
     register_watchlist_routes(app, storage)
     register_portfolio_routes(app, storage)
+    register_strategy_routes(app, storage)
+    register_transaction_routes(app, storage)
+    register_notification_routes(app, storage)
+    register_chat_routes(app, storage)
     
     # Core API routes
     @app.route("/api/health", methods=["GET"])
@@ -8,6 +8,7 @@ from typing import Any, Dict, List
 
 from python_server.data.storage import MemStorage
 from python_server.utils.auth_helper import extract_pagination_params, jwt_required_with_storage
+from python_server.utils.enrichment import attach_stocks
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -51,15 +52,7 @@ def register_ai_routes(app: Flask, storage: MemStorage) -> None:
             ]
             
             # Add stock information
-            for suggestion in suggestion_list:
-                stock = storage.get_stock(suggestion["stockId"])
-                if stock:
-                    suggestion["stock"] = {
-                        "symbol": stock.symbol,
-                        "name": stock.name,
-                        "currentPrice": stock.currentPrice,
-                        "dailyChangePercent": stock.dailyChangePercent
-                    }
+            attach_stocks(storage, suggestion_list)
             
             return jsonify({
                 "suggestions": suggestion_list,
@@ -104,15 +97,7 @@ def register_ai_routes(app: Flask, storage: MemStorage) -> None:
             ]
             
             # Add stock information
-            for suggestion in suggestion_list:
-                stock = storage.get_stock(suggestion["stockId"])
-                if stock:
-                    suggestion["stock"] = {
-                        "symbol": stock.symbol,
-                        "name": stock.name,
-                        "currentPrice": stock.currentPrice,
-                        "dailyChangePercent": stock.dailyChangePercent
-                    }
+            attach_stocks(storage, suggestion_list)
             
             return jsonify({
                 "suggestions": suggestion_list,
@@ -200,15 +185,7 @@ def register_ai_routes(app: Flask, storage: MemStorage) -> None:
             ]
             
             # Add stock information
-            for suggestion in suggestion_list:
-                stock = storage.get_stock(suggestion["stockId"])
-                if stock:
-                    suggestion["stock"] = {
-                        "symbol": stock.symbol,
-                        "name": stock.name,
-                        "currentPrice": stock.currentPrice,
-                        "dailyChangePercent": stock.dailyChangePercent
-                    }
+            attach_stocks(storage, suggestion_list)
             
             return jsonify({
                 "type": type.upper(),
@@ -36,6 +36,9 @@ def register_auth_routes(app: Flask, storage: MemStorage) -> None:
                 if field not in data:
                     return jsonify({"error": f"Missing required field: {field}"}), 400
             
+            # Validate field types (storage records are not validated)
+            RegisterRequest.model_validate(data)
+            
             # Check if username already exists
             existing_user = storage.get_user_by_username(data["username"])
             if existing_user:
@@ -211,7 +214,7 @@ def register_auth_routes(app: Flask, storage: MemStorage) -> None:
             # If email is being updated, check if it's already in use
             if "email" in data and data["email"] != user.email:
                 existing_email = storage.get_user_by_email(data["email"])
-                if existing_email:
+                if existing_email and existing_email.id != user_id:
                     return jsonify({"error": "Email already in use"}), 409
             
             # Add update timestamp
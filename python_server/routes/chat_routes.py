@@ -2,119 +2,102 @@
 Chat routes for SuhuAI assistant in StockVisionPro
 """
 
-from flask import request, jsonify
 import logging
-from datetime import datetime
+from flask import Flask, request, jsonify
+from flask_jwt_extended import get_jwt_identity
+from typing import Any, Dict, List, Optional
 
-from . import chat_bp
-from data.storage import MemStorage
-from utils.auth_helper import auth_required
+from python_server.data.storage import MemStorage
+from python_server.utils.auth_helper import extract_pagination_params, jwt_required_with_storage
 
-# Initialize logger and storage
+# Configure logger
 logger = logging.getLogger(__name__)
-storage = MemStorage()
 
-@chat_bp.route("/<int:user_id>", methods=["GET"])
-@auth_required()
-def get_chat_messages(current_user_id, user_id):
-    """Get chat history for a user"""
-    try:
-        # Verify authorization
-        if current_user_id != user_id:
-            return jsonify({"message": "Unauthorized to view this chat history"}), 403
-        
-        # Parse query parameters
-        limit = request.args.get("limit", 50, type=int)
-        offset = request.args.get("offset", 0, type=int)
-        
-        # Get chat messages
-        messages = storage.get_chat_messages(
-            user_id,
-            limit=limit,
-            offset=offset
-        )
-        
-        # Format response
-        formatted_messages = [message.model_dump() for message in messages]
-        
-        return jsonify(formatted_messages), 200
-    
-    except Exception as e:
-        logger.error(f"Error retrieving chat messages for user {user_id}: {str(e)}")
-        return jsonify({"message": f"Failed to retrieve chat messages: {str(e)}"}), 500
 
-@chat_bp.route("", methods=["POST"])
-@auth_required()
-def create_chat_message(current_user_id):
-    """Create a new chat message and get AI response"""
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        if not data.get("userId") or not data.get("content"):
-            return jsonify({"message": "User ID and message content are required"}), 400
-        
-        # Verify authorization
-        if data.get("userId") != current_user_id:
-            return jsonify({"message": "Unauthorized to send messages for this user"}), 403
-        
-        # Get user's portfolio stocks for context
-        user_stocks = []
-        portfolio = storage.get_user_portfolio(current_user_id)
-        
-        for item in portfolio:
-            stock = storage.get_stock(item.stockId)
-            if stock:
-                user_stocks.append(stock.symbol)
-        
-        # Create user message
-        user_message = storage.create_chat_message({
-            "userId": data.get("userId"),
-            "content": data.get("content"),
-            "sender": "USER",
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Generate AI response
-        ai_response_content = generate_ai_response(data.get("content"), user_stocks)
-        
-        # Create AI message
-        ai_message = storage.create_chat_message({
-            "userId": data.get("userId"),
-            "content": ai_response_content,
-            "sender": "AI",
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        return jsonify({
-            "userMessage": user_message.model_dump(),
-            "aiResponse": ai_message.model_dump()
-        }), 201
+def register_chat_routes(app: Flask, storage: MemStorage) -> None:
+    """Register all SuhuAI chat routes"""
     
-    except Exception as e:
-        logger.error(f"Error creating chat message: {str(e)}")
-        return jsonify({"message": f"Failed to create chat message: {str(e)}"}), 500
-
-@chat_bp.route("/<int:user_id>", methods=["DELETE"])
-@auth_required()
-def clear_chat_history(current_user_id, user_id):
-    """Clear chat history for a user"""
-    try:
-        # Verify authorization
-        if current_user_id != user_id:
-            return jsonify({"message": "Unauthorized to clear this chat history"}), 403
+    @app.route("/api/chat/<user_id>", methods=["GET"])
+    @jwt_required_with_storage(storage)
+    def get_chat_messages(user_id):
+        """Get a user's chat history (newest first)"""
+        try:
+            # Extract pagination params
+            pagination = extract_pagination_params(request.args)
+            
+            messages = storage.get_user_chat_history(
+                user_id,
+                limit=pagination["limit"],
+                offset=pagination["offset"]
+            )
+            
+            return jsonify({
+                "messages": [message.model_dump() for message in messages],
+                "count": len(messages)
+            }), 200
         
-        # Clear chat history
-        count = storage.clear_chat_history(user_id)
+        except Exception as e:
+            logger.error(f"Error in get_chat_messages: {str(e)}")
+            return jsonify({"error": "Failed to get chat history", "details": str(e)}), 500
+    
+    @app.route("/api/chat", methods=["POST"])
+    @jwt_required_with_storage(storage)
+    def create_chat_message():
+        """Send a message to SuhuAI and store it with the AI response"""
+        try:
+            data = request.get_json()
+            
+            # Validate required fields
+            required_fields = ["userId", "message"]
+            for field in required_fields:
+                if not data.get(field):
+                    return jsonify({"error": f"Missing required field: {field}"}), 400
+            
+            if not isinstance(data["message"], str):
+                return jsonify({"error": "Message must be a string"}), 400
+            
+            # Verify authorization
+            if data["userId"] != get_jwt_identity():
+                return jsonify({"error": "Unauthorized to send messages for this user"}), 403
+            
+            # Get the symbols in the user's portfolio for context
+            portfolio = storage.get_user_portfolio(data["userId"])
+            stocks = storage.get_stocks_by_ids(item.stockId for item in portfolio)
+            user_stocks = [stocks[item.stockId].symbol for item in portfolio if item.stockId in stocks]
+            
+            # Store the message, then attach the AI response
+            message = storage.create_chat_message({
+                "userId": data["userId"],
+                "message": data["message"],
+                "context": {"portfolio": user_stocks}
+            })
+            message = storage.update_chat_response(
+                message.id,
+                generate_ai_response(data["message"], user_stocks)
+            )
+            
+            return jsonify(message.model_dump()), 201
         
-        return jsonify({
-            "message": f"Cleared {count} chat messages",
-            "count": count
-        }), 200
+        except Exception as e:
+            logger.error(f"Error in create_chat_message: {str(e)}")
+            return jsonify({"error": "Failed to send chat message", "details": str(e)}), 500
     
-    except Exception as e:
-        logger.error(f"Error clearing chat history for user {user_id}: {str(e)}")
-        return jsonify({"message": f"Failed to clear chat history: {str(e)}"}), 500
+    @app.route("/api/chat/<user_id>", methods=["DELETE"])
+    @jwt_required_with_storage(storage)
+    def clear_chat_history(user_id):
+        """Clear a user's chat history"""
+        try:
+            count = storage.clear_chat_history(user_id)
+            
+            return jsonify({
+                "message": f"Cleared {count} chat messages",
+                "count": count
+            }), 200
+        
+        except Exception as e:
+            logger.error(f"Error in clear_chat_history: {str(e)}")
+            return jsonify({"error": "Failed to clear chat history", "details": str(e)}), 500
+
 
 # Helper function to generate AI responses
 def generate_ai_response(user_message, user_stocks):
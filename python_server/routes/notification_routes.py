@@ -2,204 +2,183 @@
 Notification routes for StockVisionPro API
 """
 
-from flask import request, jsonify
 import logging
+from flask import Flask, request, jsonify
+from flask_jwt_extended import get_jwt_identity
+from typing import Any, Dict, List, Optional
 
-from . import notification_bp
-from data.storage import MemStorage
-from utils.auth_helper import auth_required
+from python_server.data.storage import MemStorage
+from python_server.utils.auth_helper import extract_pagination_params, jwt_required_with_storage
 
-# Initialize logger and storage
+# Configure logger
 logger = logging.getLogger(__name__)
-storage = MemStorage()
 
-@notification_bp.route("/<int:user_id>", methods=["GET"])
-@auth_required()
-def get_user_notifications(current_user_id, user_id):
-    """Get a user's notifications"""
-    try:
-        # Verify authorization
-        if current_user_id != user_id:
-            return jsonify({"message": "Unauthorized to view these notifications"}), 403
+# Settings returned for users who have never changed them
+DEFAULT_NOTIFICATION_SETTINGS = {
+    "emailEnabled": True,
+    "pushEnabled": True,
+    "priceAlerts": True,
+    "tradingSignals": True,
+    "newsAlerts": True,
+    "portfolioUpdates": True
+}
+
+
+def register_notification_routes(app: Flask, storage: MemStorage) -> None:
+    """Register all notification related routes"""
+    
+    def get_owned_notification(notification_id: str):
+        """Look up a notification owned by the current user, or an error response"""
+        notification = storage.get_notification(notification_id)
         
-        # Parse query parameters
-        limit = request.args.get("limit", 50, type=int)
-        offset = request.args.get("offset", 0, type=int)
-        unread_only = request.args.get("unread", "false").lower() == "true"
+        if not notification:
+            return None, (jsonify({"error": "Notification not found"}), 404)
         
-        # Get notifications
-        notifications = storage.get_user_notifications(
-            user_id,
-            limit=limit,
-            offset=offset,
-            unread_only=unread_only
-        )
+        if notification.userId != get_jwt_identity():
+            return None, (jsonify({"error": "Unauthorized access to this notification"}), 403)
         
-        # Enrich with related data where needed
-        enriched_notifications = []
-        for notification in notifications:
-            notification_dict = notification.model_dump()
+        return notification, None
+    
+    @app.route("/api/notifications/<user_id>", methods=["GET"])
+    @jwt_required_with_storage(storage)
+    def get_user_notifications(user_id):
+        """Get a user's notifications"""
+        try:
+            # Extract pagination params
+            pagination = extract_pagination_params(request.args)
+            unread_only = request.args.get("unread", "false").lower() == "true"
             
-            # Add stock data if notification is related to a stock
-            if notification.stockId:
-                stock = storage.get_stock(notification.stockId)
+            notifications = storage.get_user_notifications(
+                user_id,
+                limit=pagination["limit"],
+                offset=pagination["offset"],
+                include_read=not unread_only
+            )
+            
+            # Attach stock data to notifications about a stock
+            notification_list = [notification.model_dump() for notification in notifications]
+            stocks = storage.get_stocks_by_ids(
+                notification["relatedEntityId"] for notification in notification_list
+                if notification["relatedEntityId"]
+            )
+            
+            for notification in notification_list:
+                stock = stocks.get(notification["relatedEntityId"])
                 if stock:
-                    notification_dict["stock"] = stock.model_dump()
+                    notification["stock"] = stock.model_dump()
             
-            enriched_notifications.append(notification_dict)
-        
-        # Count unread notifications
-        unread_count = storage.count_unread_notifications(user_id)
-        
-        return jsonify({
-            "notifications": enriched_notifications,
-            "unreadCount": unread_count,
-            "totalCount": len(enriched_notifications)
-        }), 200
+            return jsonify({
+                "notifications": notification_list,
+                "unreadCount": storage.count_unread_notifications(user_id),
+                "count": len(notification_list)
+            }), 200
+        
+        except Exception as e:
+            logger.error(f"Error in get_user_notifications: {str(e)}")
+            return jsonify({"error": "Failed to get notifications", "details": str(e)}), 500
     
-    except Exception as e:
-        logger.error(f"Error retrieving notifications for user {user_id}: {str(e)}")
-        return jsonify({"message": f"Failed to retrieve notifications: {str(e)}"}), 500
-
-@notification_bp.route("/<int:notification_id>/read", methods=["POST"])
-@auth_required()
-def mark_notification_as_read(current_user_id, notification_id):
-    """Mark a notification as read"""
-    try:
-        # Get notification
-        notification = storage.get_notification(notification_id)
-        
-        if not notification:
-            return jsonify({"message": "Notification not found"}), 404
-        
-        # Verify authorization
-        if notification.userId != current_user_id:
-            return jsonify({"message": "Unauthorized to modify this notification"}), 403
-        
-        # Mark notification as read
-        updated_notification = storage.mark_notification_as_read(notification_id)
+    @app.route("/api/notifications/<notification_id>/read", methods=["POST"])
+    @jwt_required_with_storage(storage)
+    def mark_notification_as_read(notification_id):
+        """Mark a notification as read"""
+        try:
+            notification, error = get_owned_notification(notification_id)
+            if error:
+                return error
+            
+            updated_notification = storage.mark_notification_as_read(notification_id)
+            
+            return jsonify(updated_notification.model_dump()), 200
         
-        return jsonify(updated_notification.model_dump()), 200
+        except Exception as e:
+            logger.error(f"Error in mark_notification_as_read: {str(e)}")
+            return jsonify({"error": "Failed to mark notification as read", "details": str(e)}), 500
     
-    except Exception as e:
-        logger.error(f"Error marking notification {notification_id} as read: {str(e)}")
-        return jsonify({"message": f"Failed to mark notification as read: {str(e)}"}), 500
-
-@notification_bp.route("/<int:user_id>/read-all", methods=["POST"])
-@auth_required()
-def mark_all_notifications_as_read(current_user_id, user_id):
-    """Mark all notifications as read for a user"""
-    try:
-        # Verify authorization
-        if current_user_id != user_id:
-            return jsonify({"message": "Unauthorized to modify these notifications"}), 403
-        
-        # Mark all notifications as read
-        count = storage.mark_all_notifications_as_read(user_id)
-        
-        return jsonify({
-            "message": f"Marked {count} notifications as read",
-            "count": count
-        }), 200
+    @app.route("/api/notifications/<user_id>/read-all", methods=["POST"])
+    @jwt_required_with_storage(storage)
+    def mark_all_notifications_as_read(user_id):
+        """Mark all of a user's notifications as read"""
+        try:
+            count = storage.mark_all_notifications_as_read(user_id)
+            
+            return jsonify({
+                "message": f"Marked {count} notifications as read",
+                "count": count
+            }), 200
+        
+        except Exception as e:
+            logger.error(f"Error in mark_all_notifications_as_read: {str(e)}")
+            return jsonify({"error": "Failed to mark notifications as read", "details": str(e)}), 500
     
-    except Exception as e:
-        logger.error(f"Error marking all notifications as read for user {user_id}: {str(e)}")
-        return jsonify({"message": f"Failed to mark notifications as read: {str(e)}"}), 500
-
-@notification_bp.route("/<int:notification_id>", methods=["DELETE"])
-@auth_required()
-def delete_notification(current_user_id, notification_id):
-    """Delete a notification"""
-    try:
-        # Get notification
-        notification = storage.get_notification(notification_id)
-        
-        if not notification:
-            return jsonify({"message": "Notification not found"}), 404
-        
-        # Verify authorization
-        if notification.userId != current_user_id:
-            return jsonify({"message": "Unauthorized to delete this notification"}), 403
-        
-        # Delete notification
-        success = storage.delete_notification(notification_id)
-        
-        if not success:
-            return jsonify({"message": "Failed to delete notification"}), 500
+    @app.route("/api/notifications/<notification_id>", methods=["DELETE"])
+    @jwt_required_with_storage(storage)
+    def delete_notification(notification_id):
+        """Delete a notification"""
+        try:
+            notification, error = get_owned_notification(notification_id)
+            if error:
+                return error
+            
+            success = storage.delete_notification(notification_id)
+            
+            if not success:
+                return jsonify({"error": "Failed to delete notification"}), 500
+            
+            return jsonify({"message": "Notification deleted"}), 200
         
-        return jsonify({"message": "Notification deleted successfully"}), 200
+        except Exception as e:
+            logger.error(f"Error in delete_notification: {str(e)}")
+            return jsonify({"error": "Failed to delete notification", "details": str(e)}), 500
     
-    except Exception as e:
-        logger.error(f"Error deleting notification {notification_id}: {str(e)}")
-        return jsonify({"message": f"Failed to delete notification: {str(e)}"}), 500
-
-@notification_bp.route("/<int:user_id>/clear", methods=["DELETE"])
-@auth_required()
-def clear_all_notifications(current_user_id, user_id):
-    """Clear all notifications for a user"""
-    try:
-        # Verify authorization
-        if current_user_id != user_id:
-            return jsonify({"message": "Unauthorized to delete these notifications"}), 403
-        
-        # Delete all notifications
-        count = storage.clear_user_notifications(user_id)
-        
-        return jsonify({
-            "message": f"Cleared {count} notifications",
-            "count": count
-        }), 200
+    @app.route("/api/notifications/<user_id>/clear", methods=["DELETE"])
+    @jwt_required_with_storage(storage)
+    def clear_all_notifications(user_id):
+        """Delete all of a user's notifications"""
+        try:
+            count = storage.clear_user_notifications(user_id)
+            
+            return jsonify({
+                "message": f"Cleared {count} notifications",
+                "count": count
+            }), 200
+        
+        except Exception as e:
+            logger.error(f"Error in clear_all_notifications: {str(e)}")
+            return jsonify({"error": "Failed to clear notifications", "details": str(e)}), 500
     
-    except Exception as e:
-        logger.error(f"Error clearing notifications for user {user_id}: {str(e)}")
-        return jsonify({"message": f"Failed to clear notifications: {str(e)}"}), 500
-
-@notification_bp.route("/settings/<int:user_id>", methods=["GET"])
-@auth_required()
-def get_notification_settings(current_user_id, user_id):
-    """Get a user's notification settings"""
-    try:
-        # Verify authorization
-        if current_user_id != user_id:
-            return jsonify({"message": "Unauthorized to view these settings"}), 403
-        
-        # Get notification settings
-        settings = storage.get_notification_settings(user_id)
-        
-        if not settings:
-            # Return default settings if none exist
-            settings = {
-                "userId": user_id,
-                "emailEnabled": True,
-                "pushEnabled": True,
-                "priceAlerts": True,
-                "tradingSignals": True,
-                "newsAlerts": True,
-                "portfolioUpdates": True
-            }
+    @app.route("/api/notifications/settings/<user_id>", methods=["GET"])
+    @jwt_required_with_storage(storage)
+    def get_notification_settings(user_id):
+        """Get a user's notification settings"""
+        try:
+            settings = storage.get_notification_settings(user_id) or {}
+            
+            return jsonify({"userId": user_id, **DEFAULT_NOTIFICATION_SETTINGS, **settings}), 200
         
-        return jsonify(settings), 200
+        except Exception as e:
+            logger.error(f"Error in get_notification_settings: {str(e)}")
+            return jsonify({"error": "Failed to get notification settings", "details": str(e)}), 500
     
-    except Exception as e:
-        logger.error(f"Error retrieving notification settings for user {user_id}: {str(e)}")
-        return jsonify({"message": f"Failed to retrieve notification settings: {str(e)}"}), 500
-
-@notification_bp.route("/settings/<int:user_id>", methods=["PUT"])
-@auth_required()
-def update_notification_settings(current_user_id, user_id):
-    """Update a user's notification settings"""
-    try:
-        # Verify authorization
-        if current_user_id != user_id:
-            return jsonify({"message": "Unauthorized to modify these settings"}), 403
-        
-        data = request.get_json()
-        
-        # Update notification settings
-        settings = storage.update_notification_settings(user_id, data)
+    @app.route("/api/notifications/settings/<user_id>", methods=["PUT"])
+    @jwt_required_with_storage(storage)
+    def update_notification_settings(user_id):
+        """Update a user's notification settings"""
+        try:
+            data = request.get_json()
+            
+            # Only known boolean settings are stored
+            settings = {}
+            for key, value in data.items():
+                if key not in DEFAULT_NOTIFICATION_SETTINGS:
+                    continue
+                if not isinstance(value, bool):
+                    return jsonify({"error": f"Setting {key} must be true or false"}), 400
+                settings[key] = value
+            
+            updated = storage.update_notification_settings(user_id, settings)
+            
+            return jsonify({"userId": user_id, **DEFAULT_NOTIFICATION_SETTINGS, **updated}), 200
         
-        return jsonify(settings), 200
-    
-    except Exception as e:
-        logger.error(f"Error updating notification settings for user {user_id}: {str(e)}")
-        return jsonify({"message": f"Failed to update notification settings: {str(e)}"}), 500
\ No newline at end of file
+        except Exception as e:
+            logger.error(f"Error in update_notification_settings: {str(e)}")
+            return jsonify({"error": "Failed to update notification settings", "details": str(e)}), 500
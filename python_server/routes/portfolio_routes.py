@@ -5,9 +5,12 @@ Portfolio routes for StockVisionPro API
 import logging
 from flask import Flask, request, jsonify
 from typing import Any, Dict, List, Optional
+from pydantic import ValidationError
 
+from python_server.models.schemas import PortfolioRequest
 from python_server.data.storage import MemStorage
 from python_server.utils.auth_helper import jwt_required_with_storage, extract_pagination_params
+from python_server.utils.enrichment import STOCK_DETAIL_FIELDS, stock_summary
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -28,8 +31,10 @@ def register_portfolio_routes(app: Flask, storage: MemStorage) -> None:
             total_value = 0.0
             total_profit_loss = 0.0
             
+            stocks = storage.get_stocks_by_ids(item.stockId for item in portfolio_items)
+            
             for item in portfolio_items:
-                stock = storage.get_stock(item.stockId)
+                stock = stocks.get(item.stockId)
                 
                 # Skip if stock doesn't exist (shouldn't happen but just in case)
                 if not stock:
@@ -58,15 +63,7 @@ def register_portfolio_routes(app: Flask, storage: MemStorage) -> None:
                     "investmentValue": investment_value,
                     "profitLoss": profit_loss,
                     "profitLossPercent": profit_loss_percent,
-                    "stock": {
-                        "symbol": stock.symbol,
-                        "name": stock.name,
-                        "currentPrice": stock.currentPrice,
-                        "dailyChange": stock.dailyChange,
-                        "dailyChangePercent": stock.dailyChangePercent,
-                        "exchange": stock.exchange,
-                        "sector": stock.sector
-                    }
+                    "stock": stock_summary(stock, STOCK_DETAIL_FIELDS)
                 })
             
             # Calculate total profit loss percent
@@ -154,6 +151,12 @@ def register_portfolio_routes(app: Flask, storage: MemStorage) -> None:
             if data["averageBuyPrice"] <= 0:
                 return jsonify({"error": "Average buy price must be greater than zero"}), 400
             
+            # Validate the item before it reaches storage
+            try:
+                data = PortfolioRequest.model_validate(data).model_dump()
+            except ValidationError as e:
+                return jsonify({"error": "Invalid portfolio item", "details": str(e)}), 400
+            
             # Check if user has enough balance
             user = storage.get_user(data["userId"])
             if not user:
@@ -8,7 +8,9 @@ from flask import Flask, request, jsonify
 from typing import Any, Dict, List, Optional
 
 from python_server.data.storage import MemStorage
-from python_server.utils.auth_helper import extract_pagination_params
+from python_server.utils.auth_helper import extract_pagination_params, jwt_required_with_storage, service_token_required
+from python_server.utils.timeseries import INTERVALS, resample_window, downsample_window
+from python_server.trading.indicators import INDICATORS, PARAM_NAMES, indicator_cache, indicator_params
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -100,6 +102,39 @@ def register_stock_routes(app: Flask, storage: MemStorage) -> None:
             logger.error(f"Error in get_top_stocks: {str(e)}")
             return jsonify({"error": "Failed to get top stocks", "details": str(e)}), 500
     
+    @app.route("/api/stocks/quotes", methods=["PUT"])
+    @service_token_required("QUOTE_INGEST_TOKEN")
+    def put_stock_quotes():
+        """Apply a batch of price quotes from a market data feed
+        
+        Quotes move prices for every user, so this takes the feed's service
+        token (X-Service-Token, matching QUOTE_INGEST_TOKEN) rather than a
+        user login, and is disabled while no token is configured.
+        
+        Body: {"quotes": [{"stockId" or "symbol", "price", "volume" (optional)}, ...]}.
+        Each quoted stock's price, daily change, high, low and volume are
+        updated; quotes for unknown stocks are reported, not applied.
+        """
+        try:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict) or "quotes" not in data:
+                return jsonify({"error": "Missing required field: quotes"}), 400
+            
+            result = storage.apply_quotes(data["quotes"])
+            
+            return jsonify({
+                "received": result.quotes,
+                "updated": len(result.updated),
+                "unknown": result.unknown
+            }), 200
+            
+        except ValueError as e:
+            return jsonify({"error": "Invalid quotes", "details": str(e)}), 400
+            
+        except Exception as e:
+            logger.error(f"Error in put_stock_quotes: {str(e)}")
+            return jsonify({"error": "Failed to apply quotes", "details": str(e)}), 500
+    
     @app.route("/api/stocks/<symbol>", methods=["GET"])
     def get_stock_by_symbol(symbol):
         """Get a stock by symbol"""
@@ -200,7 +235,14 @@ def register_stock_routes(app: Flask, storage: MemStorage) -> None:
     
     @app.route("/api/stocks/<stock_id>/historical", methods=["GET"])
     def get_stock_historical(stock_id):
-        """Get historical data for a stock"""
+        """Get historical data for a stock
+        
+        Query parameters:
+            days: most recent bars to return when no date range is given
+            start, end: ISO date range (inclusive), not capped
+            interval: 1d (default), 1w or 1M aggregation
+            max_points: thin the result to this many bars with LTTB
+        """
         try:
             # Validate stock exists
             stock = storage.get_stock(stock_id)
@@ -212,26 +254,44 @@ def register_stock_routes(app: Flask, storage: MemStorage) -> None:
             days = min(days, 365)  # Cap at 365 days
             days = max(days, 1)    # Ensure at least 1 day
             
+            # Extract date range
+            start_date = datetime.fromisoformat(request.args['start']) if 'start' in request.args else None
+            end_date = datetime.fromisoformat(request.args['end']) if 'end' in request.args else None
+            
+            # Extract aggregation interval
+            interval = request.args.get('interval', '1d')
+            if interval not in INTERVALS:
+                return jsonify({"error": f"Invalid interval. Must be one of: {', '.join(INTERVALS)}"}), 400
+            
+            # Extract point budget
+            max_points = None
+            if 'max_points' in request.args:
+                max_points = int(request.args.get('max_points'))
+                max_points = min(max_points, 5000)  # Cap at 5000 points
+                max_points = max(max_points, 3)     # LTTB keeps both endpoints plus one
+            
             # Get historical data
-            historical_data = storage.get_stock_historical_data(stock_id, days)
+            historical_data = storage.get_stock_historical_data(
+                stock_id,
+                days,
+                start_date=start_date,
+                end_date=end_date
+            )
             
-            # Convert to dict for response
-            data_list = [
-                {
-                    "date": item.date.isoformat(),
-                    "open": item.open,
-                    "high": item.high,
-                    "low": item.low,
-                    "close": item.close,
-                    "volume": item.volume
-                }
-                for item in historical_data
-            ]
+            # Aggregate and thin over the columnar window
+            historical_data = resample_window(historical_data, interval)
+            
+            if max_points is not None:
+                historical_data = downsample_window(historical_data, max_points)
+            
+            # Convert the columnar window to dicts (newest first)
+            data_list = historical_data.to_records(newest_first=True)
             
             return jsonify({
                 "symbol": stock.symbol,
                 "name": stock.name,
                 "stockId": stock_id,
+                "interval": interval,
                 "data": data_list,
                 "count": len(data_list)
             }), 200
@@ -241,4 +301,70 @@ def register_stock_routes(app: Flask, storage: MemStorage) -> None:
             
         except Exception as e:
             logger.error(f"Error in get_stock_historical: {str(e)}")
-            return jsonify({"error": "Failed to get historical data", "details": str(e)}), 500
\ No newline at end of file
+            return jsonify({"error": "Failed to get historical data", "details": str(e)}), 500
+    
+    @app.route("/api/stocks/<stock_id>/indicators/<indicator>", methods=["GET"])
+    def get_stock_indicator(stock_id, indicator):
+        """Get a technical indicator for a stock
+        
+        Query parameters:
+            days: most recent bars to return (default 30, at most 365)
+            period, fastPeriod, slowPeriod, signalPeriod, stdDev: indicator
+                parameters; omitted ones take the indicator's defaults
+        """
+        try:
+            # Validate stock exists
+            stock = storage.get_stock(stock_id)
+            if not stock:
+                return jsonify({"error": "Stock not found"}), 404
+            
+            indicator = indicator.upper()
+            if indicator not in INDICATORS:
+                return jsonify({"error": f"Invalid indicator. Must be one of: {', '.join(INDICATORS)}"}), 400
+            
+            # Extract days parameter
+            days = int(request.args.get('days', 30))
+            days = min(days, 365)  # Cap at 365 days
+            days = max(days, 1)    # Ensure at least 1 day
+            
+            # Extract indicator parameters
+            params = {name: float(request.args[name]) for name in PARAM_NAMES if name in request.args}
+            normalized = dict(indicator_params(indicator, params))
+            
+            # Compute over the whole history so the indicator is warmed up,
+            # sharing the result with backtests and strategy evaluation
+            history = storage.get_stock_historical_data(stock_id, start_date=datetime.min)
+            outputs = indicator_cache.get(stock_id, indicator, normalized, history)
+            
+            # Return the most recent bars (newest first)
+            first = max(0, len(history) - days)
+            dates = history.dates[first:][::-1].astype("datetime64[s]").astype(str).tolist()
+            columns = [output[first:][::-1].tolist() for output in outputs]
+            names = INDICATORS[indicator].outputs
+            
+            data_list = [
+                {"date": day, **{
+                    name: (value if value == value else None)  # NaN before warm-up
+                    for name, value in zip(names, values)
+                }}
+                for day, *values in zip(dates, *columns)
+            ]
+            
+            return jsonify({
+                "symbol": stock.symbol,
+                "stockId": stock_id,
+                "indicator": indicator,
+                "params": {
+                    client_name: normalized[name]
+                    for client_name, name in PARAM_NAMES.items() if name in normalized
+                },
+                "data": data_list,
+                "count": len(data_list)
+            }), 200
+            
+        except ValueError as e:
+            return jsonify({"error": "Invalid parameter", "details": str(e)}), 400
+            
+        except Exception as e:
+            logger.error(f"Error in get_stock_indicator: {str(e)}")
+            return jsonify({"error": "Failed to get indicator", "details": str(e)}), 500
@@ -2,273 +2,302 @@
 Trading Strategy routes for StockVisionPro API
 """
 
-from flask import request, jsonify
-import logging
 import json
+import logging
+from datetime import datetime
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import get_jwt_identity
+from pydantic import ValidationError
+from typing import Any, Dict, List, Optional
 
-from . import strategy_bp
-from data.storage import MemStorage
-from utils.auth_helper import auth_required
+from python_server.models.schemas import StrategyRequest
+from python_server.data.storage import MemStorage
+from python_server.trading.backtest import run_strategy_backtest
+from python_server.trading.conditions import compile_strategy
+from python_server.trading.sweep import run_sweep
+from python_server.utils.auth_helper import jwt_required_with_storage
 
-# Initialize logger and storage
+# Configure logger
 logger = logging.getLogger(__name__)
-storage = MemStorage()
 
-@strategy_bp.route("/<int:user_id>", methods=["GET"])
-@auth_required()
-def get_user_strategies(current_user_id, user_id):
-    """Get a user's trading strategies"""
-    try:
-        # Verify authorization
-        if current_user_id != user_id:
-            return jsonify({"message": "Unauthorized to view these strategies"}), 403
-        
-        # Get strategies
-        strategies = storage.get_user_strategies(user_id)
-        
-        # Process strategies
-        strategy_list = [strategy.model_dump() for strategy in strategies]
-        
-        return jsonify(strategy_list), 200
-    
-    except Exception as e:
-        logger.error(f"Error retrieving strategies for user {user_id}: {str(e)}")
-        return jsonify({"message": f"Failed to retrieve strategies: {str(e)}"}), 500
+# Strategy fields a client may change after creation
+UPDATABLE_FIELDS = (
+    "name", "description", "indicators", "entryConditions",
+    "exitConditions", "riskManagement", "status", "targetStocks"
+)
 
-@strategy_bp.route("", methods=["POST"])
-@auth_required()
-def create_strategy(current_user_id):
-    """Create a new trading strategy"""
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ["userId", "name", "conditions"]
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({"message": f"Missing required field: {field}"}), 400
-        
-        # Verify authorization
-        if data.get("userId") != current_user_id:
-            return jsonify({"message": "Unauthorized to create strategy for this user"}), 403
-        
-        # Validate conditions format
-        try:
-            if isinstance(data.get("conditions"), str):
-                json.loads(data.get("conditions"))
-            elif not isinstance(data.get("conditions"), (dict, list)):
-                return jsonify({"message": "Conditions must be a valid JSON object or string"}), 400
-        except json.JSONDecodeError:
-            return jsonify({"message": "Conditions must be a valid JSON object or string"}), 400
-        
-        # Create strategy
-        strategy = storage.create_strategy({
-            "userId": data.get("userId"),
-            "name": data.get("name"),
-            "description": data.get("description", ""),
-            "conditions": data.get("conditions"),
-            "actions": data.get("actions", []),
-            "isActive": data.get("isActive", False),
-            "backtestResults": data.get("backtestResults", {})
-        })
-        
-        logger.info(f"Trading strategy created: {strategy.name}")
-        
-        return jsonify(strategy.model_dump()), 201
-    
-    except Exception as e:
-        logger.error(f"Error creating strategy: {str(e)}")
-        return jsonify({"message": f"Failed to create strategy: {str(e)}"}), 500
 
-@strategy_bp.route("/<int:strategy_id>", methods=["GET"])
-@auth_required()
-def get_strategy(current_user_id, strategy_id):
-    """Get a specific trading strategy"""
-    try:
-        # Get strategy
-        strategy = storage.get_strategy(strategy_id)
-        
-        if not strategy:
-            return jsonify({"message": "Trading strategy not found"}), 404
-        
-        # Verify authorization
-        if strategy.userId != current_user_id:
-            return jsonify({"message": "Unauthorized to view this strategy"}), 403
-        
-        return jsonify(strategy.model_dump()), 200
+def register_strategy_routes(app: Flask, storage: MemStorage) -> None:
+    """Register all trading strategy related routes"""
     
-    except Exception as e:
-        logger.error(f"Error retrieving strategy {strategy_id}: {str(e)}")
-        return jsonify({"message": f"Failed to retrieve strategy: {str(e)}"}), 500
-
-@strategy_bp.route("/<int:strategy_id>", methods=["PUT"])
-@auth_required()
-def update_strategy(current_user_id, strategy_id):
-    """Update a trading strategy"""
-    try:
-        data = request.get_json()
-        
-        # Get existing strategy
+    def get_owned_strategy(strategy_id: str):
+        """Look up a strategy owned by the current user, or an error response"""
         strategy = storage.get_strategy(strategy_id)
         
         if not strategy:
-            return jsonify({"message": "Trading strategy not found"}), 404
+            return None, (jsonify({"error": "Trading strategy not found"}), 404)
         
-        # Verify authorization
-        if strategy.userId != current_user_id:
-            return jsonify({"message": "Unauthorized to update this strategy"}), 403
+        if strategy.userId != get_jwt_identity():
+            return None, (jsonify({"error": "Unauthorized access to this strategy"}), 403)
         
-        # Validate conditions format if provided
-        if "conditions" in data:
+        return strategy, None
+    
+    @app.route("/api/strategies/<user_id>", methods=["GET"])
+    @jwt_required_with_storage(storage)
+    def get_user_strategies(user_id):
+        """Get a user's trading strategies"""
+        try:
+            strategies = storage.get_user_strategies(user_id)
+            
+            return jsonify({
+                "strategies": [strategy.model_dump() for strategy in strategies],
+                "count": len(strategies)
+            }), 200
+        
+        except Exception as e:
+            logger.error(f"Error in get_user_strategies: {str(e)}")
+            return jsonify({"error": "Failed to get strategies", "details": str(e)}), 500
+    
+    @app.route("/api/strategies/<user_id>/<strategy_id>", methods=["GET"])
+    @jwt_required_with_storage(storage)
+    def get_strategy(user_id, strategy_id):
+        """Get a specific trading strategy"""
+        try:
+            strategy, error = get_owned_strategy(strategy_id)
+            if error:
+                return error
+            
+            return jsonify(strategy.model_dump()), 200
+        
+        except Exception as e:
+            logger.error(f"Error in get_strategy: {str(e)}")
+            return jsonify({"error": "Failed to get strategy", "details": str(e)}), 500
+    
+    @app.route("/api/strategies", methods=["POST"])
+    @jwt_required_with_storage(storage)
+    def create_strategy():
+        """Create a trading strategy"""
+        try:
+            data = request.get_json()
+            
+            # Validate required fields
+            required_fields = ["userId", "name"]
+            for field in required_fields:
+                if field not in data:
+                    return jsonify({"error": f"Missing required field: {field}"}), 400
+            
+            # Verify authorization
+            if data["userId"] != get_jwt_identity():
+                return jsonify({"error": "Unauthorized to create strategy for this user"}), 403
+            
+            # Validate the strategy before it reaches storage
             try:
-                if isinstance(data.get("conditions"), str):
-                    json.loads(data.get("conditions"))
-                elif not isinstance(data.get("conditions"), (dict, list)):
-                    return jsonify({"message": "Conditions must be a valid JSON object or string"}), 400
-            except json.JSONDecodeError:
-                return jsonify({"message": "Conditions must be a valid JSON object or string"}), 400
-        
-        # Update strategy
-        updated_strategy = storage.update_strategy(strategy_id, {
-            "name": data.get("name", strategy.name),
-            "description": data.get("description", strategy.description),
-            "conditions": data.get("conditions", strategy.conditions),
-            "actions": data.get("actions", strategy.actions),
-            "isActive": data.get("isActive", strategy.isActive),
-            "backtestResults": data.get("backtestResults", strategy.backtestResults)
-        })
-        
-        logger.info(f"Trading strategy updated: {updated_strategy.name}")
-        
-        return jsonify(updated_strategy.model_dump()), 200
+                strategy_request = StrategyRequest.model_validate(data)
+                compile_strategy(strategy_request)
+            except (ValidationError, ValueError) as e:
+                return jsonify({"error": "Invalid strategy", "details": str(e)}), 400
+            
+            strategy = storage.create_strategy(strategy_request.model_dump())
+            
+            logger.info(f"Trading strategy created: {strategy.name}")
+            
+            return jsonify({
+                "message": "Strategy created",
+                "strategy": strategy.model_dump()
+            }), 201
+        
+        except Exception as e:
+            logger.error(f"Error in create_strategy: {str(e)}")
+            return jsonify({"error": "Failed to create strategy", "details": str(e)}), 500
     
-    except Exception as e:
-        logger.error(f"Error updating strategy {strategy_id}: {str(e)}")
-        return jsonify({"message": f"Failed to update strategy: {str(e)}"}), 500
-
-@strategy_bp.route("/<int:strategy_id>", methods=["DELETE"])
-@auth_required()
-def delete_strategy(current_user_id, strategy_id):
-    """Delete a trading strategy"""
-    try:
-        # Get existing strategy
-        strategy = storage.get_strategy(strategy_id)
-        
-        if not strategy:
-            return jsonify({"message": "Trading strategy not found"}), 404
-        
-        # Verify authorization
-        if strategy.userId != current_user_id:
-            return jsonify({"message": "Unauthorized to delete this strategy"}), 403
-        
-        # Delete strategy
-        success = storage.delete_strategy(strategy_id)
-        
-        if not success:
-            return jsonify({"message": "Failed to delete strategy"}), 500
-        
-        logger.info(f"Trading strategy deleted: {strategy.name}")
-        
-        return jsonify({"message": "Strategy deleted successfully"}), 200
+    @app.route("/api/strategies/<strategy_id>", methods=["PUT"])
+    @jwt_required_with_storage(storage)
+    def update_strategy(strategy_id):
+        """Update a trading strategy"""
+        try:
+            data = request.get_json()
+            
+            strategy, error = get_owned_strategy(strategy_id)
+            if error:
+                return error
+            
+            # Validate the merged strategy before it reaches storage
+            updates = {field: data[field] for field in UPDATABLE_FIELDS if field in data}
+            current = {field: getattr(strategy, field) for field in UPDATABLE_FIELDS}
+            try:
+                compile_strategy(StrategyRequest.model_validate({"userId": strategy.userId, **current, **updates}))
+            except (ValidationError, ValueError) as e:
+                return jsonify({"error": "Invalid strategy", "details": str(e)}), 400
+            
+            updated_strategy = storage.update_strategy(strategy_id, updates)
+            
+            logger.info(f"Trading strategy updated: {updated_strategy.name}")
+            
+            return jsonify({
+                "message": "Strategy updated",
+                "strategy": updated_strategy.model_dump()
+            }), 200
+        
+        except Exception as e:
+            logger.error(f"Error in update_strategy: {str(e)}")
+            return jsonify({"error": "Failed to update strategy", "details": str(e)}), 500
     
-    except Exception as e:
-        logger.error(f"Error deleting strategy {strategy_id}: {str(e)}")
-        return jsonify({"message": f"Failed to delete strategy: {str(e)}"}), 500
-
-@strategy_bp.route("/<int:strategy_id>/toggle", methods=["PUT"])
-@auth_required()
-def toggle_strategy(current_user_id, strategy_id):
-    """Enable or disable a trading strategy"""
-    try:
-        # Get existing strategy
-        strategy = storage.get_strategy(strategy_id)
-        
-        if not strategy:
-            return jsonify({"message": "Trading strategy not found"}), 404
-        
-        # Verify authorization
-        if strategy.userId != current_user_id:
-            return jsonify({"message": "Unauthorized to modify this strategy"}), 403
-        
-        # Toggle active status
-        new_status = not strategy.isActive
-        
-        # Update strategy
-        updated_strategy = storage.update_strategy(strategy_id, {
-            "isActive": new_status
-        })
-        
-        status_text = "enabled" if new_status else "disabled"
-        logger.info(f"Trading strategy {updated_strategy.name} {status_text}")
-        
-        return jsonify({
-            "strategy": updated_strategy.model_dump(),
-            "message": f"Strategy {status_text} successfully"
-        }), 200
+    @app.route("/api/strategies/<strategy_id>", methods=["DELETE"])
+    @jwt_required_with_storage(storage)
+    def delete_strategy(strategy_id):
+        """Delete a trading strategy"""
+        try:
+            strategy, error = get_owned_strategy(strategy_id)
+            if error:
+                return error
+            
+            success = storage.delete_strategy(strategy_id)
+            
+            if not success:
+                return jsonify({"error": "Failed to delete strategy"}), 500
+            
+            logger.info(f"Trading strategy deleted: {strategy.name}")
+            
+            return jsonify({"message": "Strategy deleted"}), 200
+        
+        except Exception as e:
+            logger.error(f"Error in delete_strategy: {str(e)}")
+            return jsonify({"error": "Failed to delete strategy", "details": str(e)}), 500
     
-    except Exception as e:
-        logger.error(f"Error toggling strategy {strategy_id}: {str(e)}")
-        return jsonify({"message": f"Failed to toggle strategy: {str(e)}"}), 500
-
-@strategy_bp.route("/<int:strategy_id>/backtest", methods=["POST"])
-@auth_required()
-def backtest_strategy(current_user_id, strategy_id):
-    """Run a backtest on a trading strategy"""
-    try:
-        data = request.get_json()
-        
-        # Get existing strategy
-        strategy = storage.get_strategy(strategy_id)
-        
-        if not strategy:
-            return jsonify({"message": "Trading strategy not found"}), 404
-        
-        # Verify authorization
-        if strategy.userId != current_user_id:
-            return jsonify({"message": "Unauthorized to backtest this strategy"}), 403
-        
-        # Get backtest parameters
-        start_date = data.get("startDate")
-        end_date = data.get("endDate")
-        initial_capital = data.get("initialCapital", 10000)
-        
-        if not start_date or not end_date:
-            return jsonify({"message": "Start date and end date are required"}), 400
-        
-        # In a real implementation, this would run an actual backtest
-        # Here we simulate a backtest result
-        backtest_results = {
-            "startDate": start_date,
-            "endDate": end_date,
-            "initialCapital": initial_capital,
-            "finalCapital": initial_capital * 1.25,
-            "totalReturn": 25,
-            "annualizedReturn": 12.5,
-            "maxDrawdown": 8.2,
-            "sharpeRatio": 1.35,
-            "trades": 15,
-            "winRate": 60,
-            "returnHistory": [
-                {"date": "2023-01-01", "equity": initial_capital},
-                {"date": "2023-04-01", "equity": initial_capital * 1.08},
-                {"date": "2023-07-01", "equity": initial_capital * 1.15},
-                {"date": "2023-10-01", "equity": initial_capital * 1.20},
-                {"date": "2024-01-01", "equity": initial_capital * 1.25}
-            ]
-        }
-        
-        # Update strategy with backtest results
-        updated_strategy = storage.update_strategy(strategy_id, {
-            "backtestResults": backtest_results
-        })
-        
-        logger.info(f"Backtest completed for strategy: {strategy.name}")
-        
-        return jsonify({
-            "strategy": updated_strategy.model_dump(),
-            "backtestResults": backtest_results
-        }), 200
+    @app.route("/api/strategies/<strategy_id>/toggle", methods=["PUT"])
+    @jwt_required_with_storage(storage)
+    def toggle_strategy(strategy_id):
+        """Switch a trading strategy between ACTIVE and INACTIVE"""
+        try:
+            strategy, error = get_owned_strategy(strategy_id)
+            if error:
+                return error
+            
+            updated_strategy = storage.toggle_strategy_status(strategy_id)
+            
+            logger.info(f"Trading strategy {updated_strategy.name} is now {updated_strategy.status}")
+            
+            return jsonify({
+                "message": f"Strategy is now {updated_strategy.status}",
+                "strategy": updated_strategy.model_dump()
+            }), 200
+        
+        except Exception as e:
+            logger.error(f"Error in toggle_strategy: {str(e)}")
+            return jsonify({"error": "Failed to toggle strategy", "details": str(e)}), 500
+    
+    @app.route("/api/strategies/<strategy_id>/backtest", methods=["POST"])
+    @jwt_required_with_storage(storage)
+    def backtest_strategy(strategy_id):
+        """Run a backtest on a trading strategy"""
+        try:
+            data = request.get_json()
+            
+            strategy, error = get_owned_strategy(strategy_id)
+            if error:
+                return error
+            
+            # Get backtest parameters
+            start_date_str = data.get("startDate")
+            end_date_str = data.get("endDate")
+            initial_capital = data.get("initialCapital", 10000)
+            
+            if not start_date_str or not end_date_str:
+                return jsonify({"error": "Start date and end date are required"}), 400
+            
+            if not strategy.targetStocks:
+                return jsonify({"error": "Strategy has no target stocks to backtest"}), 400
+            
+            # Run the backtest over the stored history of the target stocks
+            try:
+                start_date = datetime.fromisoformat(start_date_str)
+                end_date = datetime.fromisoformat(end_date_str)
+                result = run_strategy_backtest(storage, strategy, start_date, end_date, float(initial_capital),
+                                               storage.get_compiled_strategy(strategy_id))
+            except (TypeError, ValueError) as e:
+                return jsonify({"error": "Invalid backtest", "details": str(e)}), 400
+            
+            backtest_results = {
+                "startDate": start_date_str,
+                "endDate": end_date_str,
+                **result.to_dict()
+            }
+            
+            # Keep the latest backtest's metrics with the strategy; the
+            # equity curve and trade list are only returned
+            updated_strategy = storage.update_strategy_metrics(strategy_id, "backtest", {
+                "startDate": start_date_str,
+                "endDate": end_date_str,
+                **result.summary()
+            })
+            if updated_strategy is None:
+                return jsonify({"error": "Trading strategy not found"}), 404
+            
+            logger.info(f"Backtest completed for strategy: {strategy.name}")
+            
+            return jsonify({
+                "strategy": updated_strategy.model_dump(),
+                "backtestResults": backtest_results
+            }), 200
+        
+        except Exception as e:
+            logger.error(f"Error in backtest_strategy: {str(e)}")
+            return jsonify({"error": "Failed to backtest strategy", "details": str(e)}), 500
     
-    except Exception as e:
-        logger.error(f"Error backtesting strategy {strategy_id}: {str(e)}")
-        return jsonify({"message": f"Failed to backtest strategy: {str(e)}"}), 500
\ No newline at end of file
+    @app.route("/api/strategies/<strategy_id>/sweep", methods=["POST"])
+    @jwt_required_with_storage(storage)
+    def sweep_strategy(strategy_id):
+        """Backtest a grid of strategy parameters, streaming results as they finish
+        
+        The response is newline-delimited JSON, one sweep event per line.
+        """
+        try:
+            data = request.get_json()
+            
+            strategy, error = get_owned_strategy(strategy_id)
+            if error:
+                return error
+            
+            # Get sweep parameters
+            start_date_str = data.get("startDate")
+            end_date_str = data.get("endDate")
+            initial_capital = data.get("initialCapital", 10000)
+            grid = data.get("parameters")
+            
+            if not start_date_str or not end_date_str:
+                return jsonify({"error": "Start date and end date are required"}), 400
+            
+            if not isinstance(grid, dict) or not grid:
+                return jsonify({"error": "Parameters must map parameter paths to lists of values"}), 400
+            
+            if not strategy.targetStocks:
+                return jsonify({"error": "Strategy has no target stocks to backtest"}), 400
+            
+            # The first event is produced only after the sweep is validated
+            try:
+                events = run_sweep(
+                    storage,
+                    strategy,
+                    grid,
+                    datetime.fromisoformat(start_date_str),
+                    datetime.fromisoformat(end_date_str),
+                    float(initial_capital),
+                    objective=data.get("objective", "sharpeRatio"),
+                    walk_forward=data.get("walkForward")
+                )
+                first_event = next(events)
+            except (TypeError, ValueError) as e:
+                return jsonify({"error": "Invalid sweep", "details": str(e)}), 400
+            
+            logger.info(f"Sweep started for strategy: {strategy.name}")
+            
+            def generate():
+                yield json.dumps(first_event) + "\n"
+                for event in events:
+                    yield json.dumps(event) + "\n"
+            
+            return Response(stream_with_context(generate()), mimetype="application/x-ndjson"), 200
+        
+        except Exception as e:
+            logger.error(f"Error in sweep_strategy: {str(e)}")
+            return jsonify({"error": "Failed to sweep strategy", "details": str(e)}), 500
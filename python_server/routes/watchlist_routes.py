@@ -5,9 +5,13 @@ Watchlist routes for StockVisionPro API
 import logging
 from flask import Flask, request, jsonify
 from typing import Any, Dict, List, Optional
+from pydantic import ValidationError
 
+from python_server.models.schemas import WatchlistRequest
+from python_server.data.indexes import ALERT_CONDITIONS
 from python_server.data.storage import MemStorage
 from python_server.utils.auth_helper import jwt_required_with_storage
+from python_server.utils.enrichment import STOCK_DETAIL_FIELDS, stock_summary
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -29,8 +33,10 @@ def register_watchlist_routes(app: Flask, storage: MemStorage) -> None:
             # Convert to dict for response and include stock information
             watchlist_data = []
             
+            stocks = storage.get_stocks_by_ids(item.stockId for item in watchlist_items)
+            
             for item in watchlist_items:
-                stock = storage.get_stock(item.stockId)
+                stock = stocks.get(item.stockId)
                 
                 # Skip if stock doesn't exist (shouldn't happen but just in case)
                 if not stock:
@@ -44,15 +50,7 @@ def register_watchlist_routes(app: Flask, storage: MemStorage) -> None:
                     "alertCondition": item.alertCondition,
                     "notes": item.notes,
                     "createdAt": item.createdAt.isoformat(),
-                    "stock": {
-                        "symbol": stock.symbol,
-                        "name": stock.name,
-                        "currentPrice": stock.currentPrice,
-                        "dailyChange": stock.dailyChange,
-                        "dailyChangePercent": stock.dailyChangePercent,
-                        "exchange": stock.exchange,
-                        "sector": stock.sector
-                    }
+                    "stock": stock_summary(stock, STOCK_DETAIL_FIELDS)
                 })
             
             return jsonify({
@@ -93,6 +91,18 @@ def register_watchlist_routes(app: Flask, storage: MemStorage) -> None:
                 except ValueError:
                     return jsonify({"error": "Invalid alert price"}), 400
             
+            # Process alert condition if provided
+            if data.get("alertCondition") is not None:
+                data["alertCondition"] = str(data["alertCondition"]).upper()
+                if data["alertCondition"] not in ALERT_CONDITIONS:
+                    return jsonify({"error": "Invalid alert condition. Must be ABOVE or BELOW"}), 400
+            
+            # Validate the item before it reaches storage
+            try:
+                data = WatchlistRequest.model_validate(data).model_dump()
+            except ValidationError as e:
+                return jsonify({"error": "Invalid watchlist item", "details": str(e)}), 400
+            
             # Add to watchlist
             watchlist_item = storage.add_to_watchlist(data)
             
@@ -140,6 +150,10 @@ def register_watchlist_routes(app: Flask, storage: MemStorage) -> None:
             
             # Process alert condition
             alert_condition = data.get("alertCondition")
+            if alert_condition is not None:
+                alert_condition = str(alert_condition).upper()
+                if alert_condition not in ALERT_CONDITIONS:
+                    return jsonify({"error": "Invalid alert condition. Must be ABOVE or BELOW"}), 400
             
             # Update watchlist item
             updated_item = storage.update_watchlist_item(
@@ -0,0 +1,3 @@
+"""
+Trading engine package for StockVisionPro API
+"""
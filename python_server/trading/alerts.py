@@ -0,0 +1,224 @@
+"""
+Watchlist price alerts for StockVisionPro API
+
+PriceAlertMonitor checks watchlist alerts (an alertPrice with an
+alertCondition of ABOVE or BELOW) as stock prices change. Its background
+thread is woken by storage price changes (see add_price_listener).
+
+For each changed stock it takes the move from the price it last saw to
+the current one and asks storage.get_crossed_alerts() for the alerts that
+move crosses. The storage answers from alerts ordered by price per stock,
+so a tick never looks at alerts the move doesn't cross.
+
+Each crossing creates an ALERT notification, for users who haven't turned
+price alerts off. The alert is then held back until the price moves back
+past its alert price by the hysteresis fraction (1% by default), so a
+price hovering around the alert price notifies once rather than on every
+wiggle.
+
+Price changes between two ticks count as one move. Last prices and held
+alerts are kept in memory.
+"""
+
+import bisect
+import logging
+import threading
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Share of the alert price the price must move back before an alert can fire again
+DEFAULT_HYSTERESIS = 0.01
+
+_level = itemgetter(0)
+
+
+class _HeldAlerts:
+    """One stock's alerts held back after firing, by re-arm price"""
+
+    __slots__ = ("above", "below", "alerts")
+
+    def __init__(self):
+        # Sorted (re-arm price, watchlist ID): ABOVE alerts re-arm at or
+        # below their price, BELOW alerts at or above it
+        self.above: List[Tuple[float, str]] = []
+        self.below: List[Tuple[float, str]] = []
+        # Watchlist ID -> (alertCondition, alertPrice, re-arm price)
+        self.alerts: Dict[str, Tuple[str, float, float]] = {}
+
+    def is_held(self, item: Any) -> bool:
+        held = self.alerts.get(item.id)
+        return held is not None and held[:2] == (item.alertCondition, item.alertPrice)
+
+    def hold(self, item: Any, hysteresis: float):
+        if item.alertCondition == "ABOVE":
+            level = item.alertPrice * (1 - hysteresis)
+            bisect.insort(self.above, (level, item.id))
+        else:
+            level = item.alertPrice * (1 + hysteresis)
+            bisect.insort(self.below, (level, item.id))
+        self.alerts[item.id] = (item.alertCondition, item.alertPrice, level)
+
+    def rearm(self, price: float):
+        """Release the alerts price has moved back far enough for"""
+        start = bisect.bisect_left(self.above, price, key=_level)
+        released = self.above[start:]
+        del self.above[start:]
+
+        end = bisect.bisect_right(self.below, price, key=_level)
+        released += self.below[:end]
+        del self.below[:end]
+
+        for level, item_id in released:
+            # Skip entries left behind by an alert that fired again at a new price
+            held = self.alerts.get(item_id)
+            if held is not None and held[2] == level:
+                del self.alerts[item_id]
+
+
+class PriceAlertMonitor:
+    """Fires watchlist price alerts on price changes, in a background thread"""
+
+    def __init__(self, storage: Any, hysteresis: float = DEFAULT_HYSTERESIS):
+        self.storage = storage
+        self.hysteresis = hysteresis
+
+        # Last price seen per stock, and the alerts held back per stock
+        self._prices: Dict[str, float] = {}
+        self._held: Dict[str, _HeldAlerts] = {}
+        self._load_prices()
+
+        # Stocks changed since the last tick, guarded by _lock
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Serializes ticks from the thread and direct check() calls
+        self._checking = threading.Lock()
+        self.ticks = 0
+        self.alerts_fired = 0
+
+    def _load_prices(self, page: int = 1000):
+        """Start from the current price of every stock"""
+        offset = 0
+        while True:
+            stocks = self.storage.get_all_stocks(limit=page, offset=offset)
+            for stock in stocks:
+                self._prices[stock.id] = stock.currentPrice
+            if len(stocks) < page:
+                break
+            offset += page
+
+    def notify(self, stock_ids: Iterable[str]):
+        """Queue stocks for the next tick; usable as a storage price listener"""
+        with self._lock:
+            self._pending.update(stock_ids)
+        self._wake.set()
+
+    def start(self):
+        """Start the background thread"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="price-alerts", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the background thread after its current tick"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait()
+            if self._stopped.is_set():
+                break
+
+            with self._lock:
+                self._wake.clear()
+                stock_ids, self._pending = self._pending, set()
+
+            if not stock_ids:
+                continue
+
+            try:
+                self.check(stock_ids)
+            except Exception as e:
+                logger.error(f"Error in price alert check: {str(e)}")
+
+    def check(self, stock_ids: Iterable[str]) -> List[Any]:
+        """Fire the alerts crossed since the last tick on the given stocks; returns their watchlist items"""
+        with self._checking:
+            fired = []
+            for stock_id, stock in self.storage.get_stocks_by_ids(set(stock_ids)).items():
+                price = stock.currentPrice
+                previous = self._prices.get(stock_id)
+                if previous is None or price == previous:
+                    self._prices[stock_id] = price
+                    continue
+
+                # Keep the last price until the lookup succeeds, so a failed
+                # one is retried with the whole move on the next change
+                try:
+                    crossed = self.storage.get_crossed_alerts(stock_id, previous, price)
+                except Exception as e:
+                    logger.error(f"Error checking price alerts on {stock_id}: {str(e)}")
+                    continue
+                self._prices[stock_id] = price
+
+                held = self._held.get(stock_id)
+                if held is not None:
+                    held.rearm(price)
+
+                for item in crossed:
+                    if held is not None and held.is_held(item):
+                        continue
+                    if held is None:
+                        held = self._held[stock_id] = _HeldAlerts()
+                    held.hold(item, self.hysteresis)
+                    fired.append((item, stock))
+
+                if held is not None and not held.alerts:
+                    del self._held[stock_id]
+
+            self._send_notifications(fired)
+            self.ticks += 1
+            self.alerts_fired += len(fired)
+
+        if fired:
+            logger.info(f"Fired {len(fired)} price alerts")
+        return [item for item, _ in fired]
+
+    def _send_notifications(self, fired: List[Tuple[Any, Any]]):
+        """Create an ALERT notification for each fired alert, per the user's settings, in one write"""
+        enabled: Dict[str, bool] = {}
+        notifications = []
+        for item, stock in fired:
+            if item.userId not in enabled:
+                settings = self.storage.get_notification_settings(item.userId) or {}
+                enabled[item.userId] = settings.get("priceAlerts", True)
+            if not enabled[item.userId]:
+                continue
+
+            if item.alertCondition == "ABOVE":
+                message = f"{stock.name} ({stock.symbol}) has reached your alert price of ${item.alertPrice:.2f}"
+            else:
+                message = f"{stock.name} ({stock.symbol}) has dropped below your alert price of ${item.alertPrice:.2f}"
+
+            notifications.append({
+                "userId": item.userId,
+                "title": "Price Alert",
+                "message": message,
+                "type": "ALERT",
+                "relatedEntityId": stock.id
+            })
+
+        if notifications:
+            self.storage.create_notifications(notifications)
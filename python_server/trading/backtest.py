@@ -0,0 +1,360 @@
+"""
+Strategy backtesting for StockVisionPro API
+
+Runs a trading strategy's indicators, entry/exit conditions and risk
+management over stored daily OHLCV bars.
+
+Execution model:
+
+- Conditions are evaluated on each bar's close. Entries and exits fill at
+  the next bar's open, so a signal never trades on the price that
+  produced it.
+- Entry conditions must all hold; any exit condition closes the trade.
+- Stop-loss, trailing stop and price target exits are percentages,
+  checked against the close: the stop loss against the entry price, the
+  trailing stop against the highest close since entry.
+- Each target stock trades its own slot of capital,
+  riskManagement.maxPositionSize percent of the initial capital
+  (an equal share when unset). Slot profits are reinvested in the
+  slot; capital outside the slots stays in cash.
+- A trade still open on the last bar is closed at that bar's close.
+
+Conditions are compiled once per backtest (see conditions.py), and
+conditions, indicators and price comparisons are whole-array NumPy
+operations. The only Python loop is over trades, and finding each
+trade's exit is a vectorized scan from its entry.
+"""
+
+import logging
+import math
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from python_server.data.historical import HistoricalWindow, to_day
+from python_server.trading.conditions import CompiledStrategy, compile_strategy
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Bars scanned for a trade's exit before the scan window grows
+_EXIT_SCAN_BARS = 32
+
+
+def _find_exit(close: np.ndarray, exit_signal: np.ndarray, fill: int, entry_price: float,
+               levels: Dict[str, float]) -> Tuple[int, str]:
+    """The bar whose close triggers a trade's exit, and the exit reason
+
+    Exit rules are evaluated over a window of closes from the entry bar,
+    and the window grows geometrically until one triggers, so a trade
+    costs time in proportion to how long it is held.
+    """
+    count = len(close)
+    stop_price = entry_price * (1 - levels["STOP_LOSS"] / 100) if "STOP_LOSS" in levels else None
+    target_price = entry_price * (1 + levels["PRICE_TARGET"] / 100) if "PRICE_TARGET" in levels else None
+    trailing = 1 - levels["TRAILING_STOP"] / 100 if "TRAILING_STOP" in levels else None
+
+    span = _EXIT_SCAN_BARS
+    while True:
+        hi = min(count, fill + span)
+        held = close[fill:hi]
+
+        triggered = exit_signal[fill:hi].copy()
+        if stop_price is not None:
+            triggered |= held <= stop_price
+        if trailing is not None:
+            peak = np.maximum.accumulate(held)
+            triggered |= held <= peak * trailing
+        if target_price is not None:
+            triggered |= held >= target_price
+
+        if triggered.any():
+            offset = int(triggered.argmax())
+            price = held[offset]
+
+            # The highest-priority rule that holds on that bar
+            if stop_price is not None and price <= stop_price:
+                return fill + offset, "STOP_LOSS"
+            if trailing is not None and price <= peak[offset] * trailing:
+                return fill + offset, "TRAILING_STOP"
+            if target_price is not None and price >= target_price:
+                return fill + offset, "PRICE_TARGET"
+            return fill + offset, "SIGNAL"
+
+        if hi == count:
+            return count - 1, "END"
+        span *= 4
+
+
+class Trade(NamedTuple):
+    """One round trip of a backtest"""
+    stock_id: str
+    symbol: Optional[str]
+    entry_date: np.datetime64
+    entry_price: float
+    exit_date: np.datetime64
+    exit_price: float
+    quantity: float
+    exit_reason: str
+
+    @property
+    def profit_loss(self) -> float:
+        return self.quantity * (self.exit_price - self.entry_price)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready trade"""
+        return {
+            "stockId": self.stock_id,
+            "symbol": self.symbol,
+            "entryDate": str(self.entry_date),
+            "entryPrice": round(self.entry_price, 4),
+            "exitDate": str(self.exit_date),
+            "exitPrice": round(self.exit_price, 4),
+            "quantity": round(self.quantity, 6),
+            "profitLoss": round(self.profit_loss, 2),
+            "returnPercent": round((self.exit_price / self.entry_price - 1) * 100, 2),
+            "exitReason": self.exit_reason
+        }
+
+
+class StockSimulation:
+    """The trades and per-bar equity of one stock's capital slot"""
+
+    __slots__ = ("stock_id", "dates", "equity", "trades")
+
+    def __init__(self, stock_id: str, dates: np.ndarray, equity: np.ndarray,
+                 trades: List[Trade]):
+        self.stock_id = stock_id
+        self.dates = dates
+        self.equity = equity
+        self.trades = trades
+
+
+def simulate_stock(compiled: CompiledStrategy, bars: HistoricalWindow, stock: Any,
+                   start: np.datetime64, capital: float) -> StockSimulation:
+    """Trade one stock from start to the end of bars with capital
+
+    bars may begin before start; the earlier bars only warm up indicators.
+    """
+    close = bars.close
+
+    series = compiled.series(bars, stock)
+    entry = compiled.entry_mask(series, len(close))
+    exit_signal = compiled.exit_mask(series, len(close))
+    levels = compiled.price_exits
+
+    # Only the bars from start onwards are traded
+    first = int(np.searchsorted(bars.dates, start, side="left"))
+    dates = bars.dates[first:]
+    opens = bars.open[first:]
+    close = close[first:]
+    entry = entry[first:]
+    exit_signal = exit_signal[first:]
+    count = len(close)
+
+    trades = []
+    symbol = getattr(stock, "symbol", None)
+    cash_delta = np.zeros(count)
+    share_delta = np.zeros(count)
+
+    # An entry signal on the last bar has no next open to fill at
+    entry_bars = np.flatnonzero(entry[:-1])
+    slot_cash = capital
+    position = 0
+
+    while True:
+        k = int(np.searchsorted(entry_bars, position, side="left"))
+        if k == len(entry_bars):
+            break
+
+        fill = int(entry_bars[k]) + 1
+        entry_price = float(opens[fill])
+        if not entry_price > 0 or not slot_cash > 0:
+            position = fill
+            continue
+
+        quantity = slot_cash / entry_price
+
+        signal_bar, reason = _find_exit(close, exit_signal, fill, entry_price, levels)
+
+        if reason != "END" and signal_bar + 1 < count:
+            exit_bar = signal_bar + 1
+            exit_price = float(opens[exit_bar])
+        else:
+            exit_bar = count - 1
+            exit_price = float(close[exit_bar])
+
+        proceeds = quantity * exit_price
+        cash_delta[fill] -= slot_cash
+        share_delta[fill] += quantity
+        cash_delta[exit_bar] += proceeds
+        share_delta[exit_bar] -= quantity
+
+        trades.append(Trade(bars.stock_id, symbol, dates[fill], entry_price,
+                            dates[exit_bar], exit_price, quantity, reason))
+
+        slot_cash = proceeds
+        position = exit_bar
+
+    # Slot value at each close: cash plus shares held at the close
+    equity = capital + np.cumsum(cash_delta) + np.cumsum(share_delta) * close
+
+    return StockSimulation(bars.stock_id, dates, equity, trades)
+
+
+class BacktestResult:
+    """Equity curve, drawdown and trades of a backtest"""
+
+    __slots__ = ("initial_capital", "dates", "equity", "drawdown", "trades")
+
+    def __init__(self, initial_capital: float, dates: np.ndarray, equity: np.ndarray,
+                 trades: List[Trade]):
+        self.initial_capital = initial_capital
+        self.dates = dates
+        self.equity = equity
+        self.trades = trades
+
+        if len(equity):
+            self.drawdown = equity / np.maximum.accumulate(equity) - 1
+        else:
+            self.drawdown = np.empty(0)
+
+    @property
+    def final_capital(self) -> float:
+        return float(self.equity[-1]) if len(self.equity) else self.initial_capital
+
+    @property
+    def total_return(self) -> float:
+        """Total return in percent"""
+        return (self.final_capital / self.initial_capital - 1) * 100
+
+    @property
+    def annualized_return(self) -> float:
+        """Compound annual return in percent"""
+        if len(self.dates) < 2:
+            return 0.0
+        years = float((self.dates[-1] - self.dates[0]) / np.timedelta64(1, "D")) / 365.25
+        growth = self.final_capital / self.initial_capital
+        if years <= 0 or growth <= 0:
+            return self.total_return
+        return (growth ** (1 / years) - 1) * 100
+
+    @property
+    def max_drawdown(self) -> float:
+        """Largest peak-to-trough loss in percent"""
+        return float(-self.drawdown.min()) * 100 if len(self.drawdown) else 0.0
+
+    @property
+    def sharpe_ratio(self) -> float:
+        """Annualized Sharpe ratio of daily returns, with a zero risk-free rate"""
+        if len(self.equity) < 3:
+            return 0.0
+        returns = np.diff(self.equity) / self.equity[:-1]
+        deviation = returns.std(ddof=1)
+        if not deviation > 0:
+            return 0.0
+        return float(returns.mean() / deviation * math.sqrt(TRADING_DAYS_PER_YEAR))
+
+    @property
+    def win_rate(self) -> float:
+        """Percent of trades closed at a profit"""
+        if not self.trades:
+            return 0.0
+        wins = sum(1 for trade in self.trades if trade.exit_price > trade.entry_price)
+        return wins / len(self.trades) * 100
+
+    def summary(self) -> Dict[str, Any]:
+        """Headline metrics, without the equity curve and trade list"""
+        return {
+            "initialCapital": self.initial_capital,
+            "finalCapital": round(self.final_capital, 2),
+            "totalReturn": round(self.total_return, 2),
+            "annualizedReturn": round(self.annualized_return, 2),
+            "maxDrawdown": round(self.max_drawdown, 2),
+            "sharpeRatio": round(self.sharpe_ratio, 2),
+            "trades": len(self.trades),
+            "winRate": round(self.win_rate, 2)
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Metrics plus the daily equity curve and every trade"""
+        dates = np.datetime_as_string(self.dates).tolist()
+        return {
+            **self.summary(),
+            "returnHistory": [
+                {"date": day, "equity": round(value, 2), "drawdown": round(loss * 100, 2)}
+                for day, value, loss in zip(dates, self.equity.tolist(), self.drawdown.tolist())
+            ],
+            "tradeList": [
+                trade.to_dict()
+                for trade in sorted(self.trades, key=lambda trade: (trade.entry_date, trade.stock_id))
+            ]
+        }
+
+
+def run_backtest(strategy: Any, bars: Iterable[HistoricalWindow], stocks: Dict[str, Any],
+                 start: np.datetime64, initial_capital: float,
+                 compiled: Optional[CompiledStrategy] = None) -> BacktestResult:
+    """Backtest a strategy over one window of bars per target stock
+
+    strategy needs the Strategy fields indicators, entryConditions,
+    exitConditions and riskManagement; compiled, when given, is its
+    already compiled form. Windows should end at the last day to test and
+    may start earlier to warm up indicators; stocks maps stock IDs to
+    their stock rows, for fundamentals and symbols.
+    """
+    if compiled is None:
+        compiled = compile_strategy(strategy)
+    if not initial_capital > 0:
+        raise ValueError("Initial capital must be positive")
+
+    bars = [window for window in bars if len(window)]
+    if not bars:
+        return BacktestResult(initial_capital, np.empty(0, dtype="datetime64[D]"), np.empty(0), [])
+
+    # Each stock trades a fixed slot of the capital
+    share = 1 / len(bars)
+    if compiled.max_position:
+        share = min(share, compiled.max_position / 100)
+    slot = initial_capital * share
+
+    simulations = [
+        simulate_stock(compiled, window, stocks.get(window.stock_id), start, slot)
+        for window in bars
+    ]
+
+    # Combine the slots on the union of their trading days; a slot holds
+    # its capital before its first bar and its last value after its last
+    dates = np.unique(np.concatenate([simulation.dates for simulation in simulations]))
+    equity = np.full(len(dates), initial_capital - slot * len(simulations))
+
+    for simulation in simulations:
+        if not len(simulation.dates):
+            equity += slot
+            continue
+        positions = np.searchsorted(simulation.dates, dates, side="right") - 1
+        equity += np.where(positions >= 0, simulation.equity[np.maximum(positions, 0)], slot)
+
+    trades = [trade for simulation in simulations for trade in simulation.trades]
+
+    return BacktestResult(initial_capital, dates, equity, trades)
+
+
+def run_strategy_backtest(storage: Any, strategy: Any, start_date: datetime, end_date: datetime,
+                          initial_capital: float,
+                          compiled: Optional[CompiledStrategy] = None) -> BacktestResult:
+    """Backtest a strategy over the stored history of its target stocks"""
+    if end_date < start_date:
+        raise ValueError("End date must not be before start date")
+
+    # History from the beginning warms up the indicators before start_date
+    bars = [
+        storage.get_stock_historical_data(stock_id, end_date=end_date)
+        for stock_id in strategy.targetStocks
+    ]
+    stocks = storage.get_stocks_by_ids(strategy.targetStocks)
+
+    return run_backtest(strategy, bars, stocks, to_day(start_date), initial_capital, compiled)
@@ -0,0 +1,293 @@
+"""
+Strategy condition compiler for StockVisionPro API
+
+A strategy's entryConditions and exitConditions are free-form dicts such
+as {"indicator": "RSI", "condition": "RSI_ABOVE", "value": 50}.
+compile_strategy() validates them once and turns each into a comparison
+between two operands, with two evaluators:
+
+- mask(series): a boolean array over every bar, for backtests
+- check(values): a bool for a single bar, for live evaluation
+
+Operands are keys into the series/values dicts:
+
+- ("PRICE",): the close
+- ("FUNDAMENTAL", field): a current Stock field such as peRatio
+- ("INDICATOR", name, params, output): one output of an indicator
+
+Supported conditions, where X is an indicator name:
+
+- {"indicator": X, "condition": "ABOVE" | "BELOW" | "X_ABOVE" | "X_BELOW", "value": v}
+  for SMA, EMA, RSI, ATR, MACD, ROLLING_HIGH, ROLLING_LOW, PRICE,
+  PE_RATIO and DIVIDEND_YIELD
+- {"indicator": X, "condition": "PRICE_ABOVE_X" | "PRICE_BELOW_X"} for SMA,
+  EMA, ROLLING_HIGH, ROLLING_LOW and BOLLINGER (the upper band above,
+  the lower band below)
+- {"indicator": "MACD", "condition": "MACD_ABOVE_SIGNAL" | "MACD_BELOW_SIGNAL"}
+- {"indicator": "STOP_LOSS" | "TRAILING_STOP" | "PRICE_TARGET", "value": percent},
+  exit conditions only; stops must be below 100%
+
+An indicator's parameters come from the condition itself, else from the
+strategy's indicators entry of the same type, else the library defaults.
+"""
+
+import logging
+import operator
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from python_server.data.historical import HistoricalWindow
+from python_server.trading.indicators import INDICATORS, IndicatorCache, indicator_cache, indicator_params
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+Operand = Tuple[Any, ...]
+
+PRICE = ("PRICE",)
+
+# Condition indicators read from the stock's current fundamentals
+FUNDAMENTALS = {"PE_RATIO": "peRatio", "DIVIDEND_YIELD": "dividendYield"}
+
+# Exits that depend on the trade's entry price rather than on the bar alone
+PRICE_EXITS = ("STOP_LOSS", "TRAILING_STOP", "PRICE_TARGET")
+
+# Indicators on the price scale, which PRICE_ABOVE_X / PRICE_BELOW_X compare with
+PRICE_LEVEL_INDICATORS = ("SMA", "EMA", "ROLLING_HIGH", "ROLLING_LOW", "BOLLINGER")
+
+# Indicators whose first output can be compared with a threshold
+THRESHOLD_INDICATORS = ("SMA", "EMA", "RSI", "ATR", "MACD", "ROLLING_HIGH", "ROLLING_LOW")
+
+COMPARISONS = {"ABOVE": operator.gt, "BELOW": operator.lt}
+
+# Fields a condition may carry besides indicator parameters
+_CONDITION_FIELDS = ("indicator", "condition", "value")
+
+
+def _number(condition: Dict[str, Any]) -> float:
+    """A condition's numeric value"""
+    value = condition.get("value")
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("value must be a number")
+    return float(value)
+
+
+class CompiledCondition:
+    """One condition as a comparison of two operands"""
+
+    __slots__ = ("source", "left", "comparison", "right", "mask", "check")
+
+    def __init__(self, source: Dict[str, Any], left: Operand, comparison: str,
+                 right: Any):
+        self.source = source
+        self.left = left
+        self.comparison = comparison
+        self.right = right
+
+        compare = COMPARISONS[comparison]
+        if isinstance(right, tuple):
+            def mask(series):
+                with np.errstate(invalid="ignore"):
+                    return compare(series[left], series[right])
+
+            def check(values):
+                return compare(values[left], values[right])
+        else:
+            def mask(series):
+                with np.errstate(invalid="ignore"):
+                    return compare(series[left], right)
+
+            def check(values):
+                return compare(values[left], right)
+
+        # NaN (an indicator still warming up) compares False either way
+        self.mask: Callable[[Dict[Operand, np.ndarray]], np.ndarray] = mask
+        self.check: Callable[[Dict[Operand, float]], bool] = check
+
+
+class CompiledStrategy:
+    """A strategy's conditions, validated and compiled
+
+    operands lists every series the conditions read, so that callers can
+    fetch (and deduplicate) them before evaluating; indicators lists the
+    (name, params) indicator computations behind them.
+    """
+
+    def __init__(self, entry: List[CompiledCondition], exit: List[CompiledCondition],
+                 price_exits: Dict[str, float], max_position: Optional[float]):
+        self.entry = tuple(entry)
+        self.exit = tuple(exit)
+        self.price_exits = price_exits
+        self.max_position = max_position
+
+        operands = []
+        for condition in self.entry + self.exit:
+            for operand in (condition.left, condition.right):
+                if isinstance(operand, tuple) and operand not in operands:
+                    operands.append(operand)
+        self.operands: Tuple[Operand, ...] = tuple(operands)
+        self.indicators: Tuple[Tuple[str, Tuple], ...] = tuple(dict.fromkeys(
+            (operand[1], operand[2]) for operand in operands if operand[0] == "INDICATOR"
+        ))
+
+        entry_checks = tuple(condition.check for condition in self.entry)
+        exit_checks = tuple(condition.check for condition in self.exit)
+
+        def check_entry(values: Dict[Operand, float]) -> bool:
+            for check in entry_checks:
+                if not check(values):
+                    return False
+            return True
+
+        def check_exit(values: Dict[Operand, float]) -> bool:
+            for check in exit_checks:
+                if check(values):
+                    return True
+            return False
+
+        self.check_entry = check_entry
+        self.check_exit = check_exit
+
+    def series(self, bars: HistoricalWindow, stock: Any,
+               cache: IndicatorCache = indicator_cache) -> Dict[Operand, np.ndarray]:
+        """Every operand's values over bars, with indicators from the cache"""
+        series = {}
+        outputs = {}
+        for operand in self.operands:
+            kind = operand[0]
+            if kind == "PRICE":
+                series[operand] = bars.close
+            elif kind == "FUNDAMENTAL":
+                value = getattr(stock, operand[1], None)
+                series[operand] = np.full(len(bars), np.nan if value is None else float(value))
+            else:
+                _, name, params, output = operand
+                if (name, params) not in outputs:
+                    outputs[name, params] = cache.get(bars.stock_id, name, dict(params), bars)
+                series[operand] = outputs[name, params][output]
+        return series
+
+    def entry_mask(self, series: Dict[Operand, np.ndarray], count: int) -> np.ndarray:
+        """Bars on which every entry condition holds"""
+        mask = np.ones(count, dtype=bool)
+        for condition in self.entry:
+            mask &= condition.mask(series)
+        return mask
+
+    def exit_mask(self, series: Dict[Operand, np.ndarray], count: int) -> np.ndarray:
+        """Bars on which any bar-level exit condition holds"""
+        mask = np.zeros(count, dtype=bool)
+        for condition in self.exit:
+            mask |= condition.mask(series)
+        return mask
+
+
+def _indicator_operand(strategy: Any, condition: Dict[str, Any], name: str, output: str) -> Operand:
+    """Operand for one output of the indicator a condition refers to"""
+    # Parameters from the strategy's indicator definition, then the condition's own
+    params = {}
+    for definition in strategy.indicators:
+        if str(definition.get("type", "")).upper() == name:
+            params.update({key: value for key, value in definition.items() if key != "type"})
+            break
+    params.update({key: value for key, value in condition.items() if key not in _CONDITION_FIELDS})
+
+    try:
+        params = indicator_params(name, params)
+    except TypeError:
+        raise ValueError(f"{name} parameters must be numbers") from None
+    return ("INDICATOR", name, params, INDICATORS[name].outputs.index(output))
+
+
+def _compile_condition(strategy: Any, condition: Dict[str, Any]) -> CompiledCondition:
+    """Compile one bar-level condition"""
+    if not isinstance(condition, dict):
+        raise ValueError("condition must be an object")
+
+    name = str(condition.get("indicator", "")).upper()
+    comparison = str(condition.get("condition", "")).upper()
+    if comparison.startswith(f"{name}_"):
+        comparison = comparison[len(name) + 1:]
+
+    if comparison in COMPARISONS:
+        if name == "PRICE":
+            left = PRICE
+        elif name in FUNDAMENTALS:
+            left = ("FUNDAMENTAL", FUNDAMENTALS[name])
+        elif name in THRESHOLD_INDICATORS:
+            left = _indicator_operand(strategy, condition, name, INDICATORS[name].outputs[0])
+        else:
+            raise ValueError(f"Unsupported indicator: {name or 'missing'}")
+        return CompiledCondition(condition, left, comparison, _number(condition))
+
+    if name in PRICE_LEVEL_INDICATORS and comparison in (f"PRICE_ABOVE_{name}", f"PRICE_BELOW_{name}"):
+        direction = comparison.split("_")[1]
+        output = INDICATORS[name].outputs[0]
+        if name == "BOLLINGER":
+            output = "upper" if direction == "ABOVE" else "lower"
+        return CompiledCondition(condition, PRICE, direction,
+                                 _indicator_operand(strategy, condition, name, output))
+
+    if name == "MACD" and comparison in ("ABOVE_SIGNAL", "BELOW_SIGNAL"):
+        direction = comparison.split("_")[0]
+        return CompiledCondition(condition, _indicator_operand(strategy, condition, name, "macd"),
+                                 direction, _indicator_operand(strategy, condition, name, "signal"))
+
+    if name not in INDICATORS and name not in FUNDAMENTALS and name != "PRICE":
+        raise ValueError(f"Unsupported indicator: {name or 'missing'}")
+    raise ValueError(f"Unsupported condition for {name}: {condition.get('condition')}")
+
+
+def compile_strategy(strategy: Any) -> CompiledStrategy:
+    """Validate and compile a strategy's conditions and risk management
+
+    strategy needs the Strategy fields indicators, entryConditions,
+    exitConditions and riskManagement. Raises ValueError naming the first
+    invalid condition.
+    """
+    entry = []
+    for position, condition in enumerate(strategy.entryConditions):
+        try:
+            name = str(condition.get("indicator", "")).upper() if isinstance(condition, dict) else ""
+            if name in PRICE_EXITS:
+                raise ValueError(f"{name} can only be an exit condition")
+            entry.append(_compile_condition(strategy, condition))
+        except ValueError as e:
+            raise ValueError(f"Invalid entry condition {position + 1}: {e}") from None
+
+    exit = []
+    price_exits = {}
+    for position, condition in enumerate(strategy.exitConditions):
+        try:
+            name = str(condition.get("indicator", "")).upper() if isinstance(condition, dict) else ""
+            if name in PRICE_EXITS:
+                value = _number(condition)
+                if not value > 0:
+                    raise ValueError(f"{name} must be a positive percentage")
+                # A stop 100% or more below the price could never trigger
+                if name != "PRICE_TARGET" and not value < 100:
+                    raise ValueError(f"{name} must be below 100%")
+                # The tightest level wins when a strategy sets one twice
+                price_exits[name] = min(value, price_exits.get(name, value))
+            else:
+                exit.append(_compile_condition(strategy, condition))
+        except ValueError as e:
+            raise ValueError(f"Invalid exit condition {position + 1}: {e}") from None
+
+    risk = strategy.riskManagement
+    stop_loss = risk.get("stopLossPercent")
+    if stop_loss is not None:
+        if isinstance(stop_loss, bool) or not isinstance(stop_loss, (int, float)) or not 0 <= stop_loss < 100:
+            raise ValueError("Invalid risk management: stopLossPercent must be a number from 0 to below 100")
+        if stop_loss:
+            price_exits["STOP_LOSS"] = min(float(stop_loss), price_exits.get("STOP_LOSS", float(stop_loss)))
+
+    max_position = risk.get("maxPositionSize")
+    if max_position is not None:
+        if isinstance(max_position, bool) or not isinstance(max_position, (int, float)) \
+                or not 0 < max_position <= 100:
+            raise ValueError("Invalid risk management: maxPositionSize must be a percentage above 0")
+        max_position = float(max_position)
+
+    return CompiledStrategy(entry, exit, price_exits, max_position)
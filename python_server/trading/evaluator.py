@@ -0,0 +1,363 @@
+"""
+Live strategy evaluation for StockVisionPro API
+
+StrategyEvaluator runs every ACTIVE strategy against the latest prices of
+its target stocks. Its background thread is woken by storage price and
+bar changes (see add_price_listener), and evaluates every stock each
+interval seconds when nothing changes.
+
+Each tick:
+
+- Collects the operands (price, fundamentals, indicator outputs) that the
+  compiled conditions of the active strategies need, per stock, so an
+  indicator used by any number of strategies is computed once per stock.
+- Computes those indicators through the shared indicator cache, which
+  only advances them over the bars added since the last tick.
+- Checks each strategy on each target stock with its compiled closures.
+  A strategy with an open entry signal on a stock waits for an exit
+  signal (or a stop-loss, trailing stop or price target exit) before it
+  can signal an entry there again.
+- Creates a STRATEGY notification for every entry and exit signal, for
+  users who haven't turned trading signals off.
+- With a PaperTrader, executes the tick's signals as one batch of
+  simulated trades (see paper.py).
+
+The price is the stock's currentPrice when set, else the last close;
+indicators are as of the last stored bar. Open signals are kept in memory.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from python_server.trading.conditions import PRICE, CompiledStrategy, Operand
+from python_server.trading.indicators import IndicatorCache, indicator_cache
+from python_server.trading.paper import PaperTrader
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Ticks kept for the latency statistics
+LATENCY_HISTORY = 1000
+
+
+class Signal(NamedTuple):
+    """An entry (BUY) or exit (SELL) signal of one strategy on one stock"""
+    strategy_id: str
+    user_id: str
+    stock_id: str
+    side: str
+    price: float
+    reason: str
+
+
+class TickReport(NamedTuple):
+    """What one evaluation tick did and how long it took
+
+    requests counts indicator requests over every (strategy, stock) pair;
+    computations counts the indicators actually computed once identical
+    requests are merged.
+    """
+    stocks: int
+    strategies: int
+    requests: int
+    computations: int
+    signals: List[Signal]
+    latency_ms: float
+
+
+class _OpenSignal:
+    """Entry price and highest price since an entry signal"""
+
+    __slots__ = ("entry_price", "peak")
+
+    def __init__(self, entry_price: float):
+        self.entry_price = entry_price
+        self.peak = entry_price
+
+
+def _exit_reason(levels: Dict[str, float], position: _OpenSignal, price: float) -> Optional[str]:
+    """The price exit triggered at price, in the backtest's priority order"""
+    if "STOP_LOSS" in levels and price <= position.entry_price * (1 - levels["STOP_LOSS"] / 100):
+        return "STOP_LOSS"
+    if "TRAILING_STOP" in levels and price <= position.peak * (1 - levels["TRAILING_STOP"] / 100):
+        return "TRAILING_STOP"
+    if "PRICE_TARGET" in levels and price >= position.entry_price * (1 + levels["PRICE_TARGET"] / 100):
+        return "PRICE_TARGET"
+    return None
+
+
+class _StockPlan:
+    """The active strategies targeting one stock, and the operands they read"""
+
+    __slots__ = ("strategies", "operands", "requests")
+
+    def __init__(self):
+        self.strategies: List[Tuple[Any, CompiledStrategy]] = []
+        self.operands: Set[Operand] = set()
+        self.requests = 0
+
+    def add(self, strategy: Any, compiled: CompiledStrategy):
+        self.strategies.append((strategy, compiled))
+        self.operands.update(compiled.operands)
+        self.requests += len(compiled.indicators)
+
+
+class StrategyEvaluator:
+    """Evaluates active strategies on price changes, in a background thread"""
+
+    def __init__(self, storage: Any, interval: float = 60.0, cache: IndicatorCache = indicator_cache,
+                 trader: Optional[PaperTrader] = None):
+        self.storage = storage
+        self.interval = interval
+        self.cache = cache
+        self.trader = trader
+
+        # (strategy ID, stock ID) -> open entry signal
+        self._open: Dict[Tuple[str, str], _OpenSignal] = {}
+        # Strategy ID -> updatedAt of a version that failed to compile
+        self._invalid: Dict[str, Any] = {}
+        # Active strategies by target stock, rebuilt when any (ID, updatedAt) changes
+        self._plans: Dict[str, _StockPlan] = {}
+        self._versions: Optional[List[Tuple[str, Any]]] = None
+
+        # Stocks changed since the last tick, guarded by _lock
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Serializes ticks from the thread and direct evaluate() calls
+        self._evaluating = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_HISTORY)
+        self.ticks = 0
+        self.last_report: Optional[TickReport] = None
+
+    def notify(self, stock_ids: Iterable[str]):
+        """Queue stocks for the next tick; usable as a storage price listener"""
+        with self._lock:
+            self._pending.update(stock_ids)
+        self._wake.set()
+
+    def start(self):
+        """Start the background thread"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="strategy-evaluator", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the background thread after its current tick"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            woken = self._wake.wait(self.interval)
+            if self._stopped.is_set():
+                break
+
+            with self._lock:
+                self._wake.clear()
+                stock_ids, self._pending = self._pending, set()
+
+            if woken and not stock_ids:
+                continue
+
+            try:
+                # A timeout re-evaluates every stock
+                self.evaluate(stock_ids if woken else None)
+            except Exception as e:
+                logger.error(f"Error in strategy evaluation: {str(e)}")
+
+    def evaluate(self, stock_ids: Optional[Iterable[str]] = None) -> TickReport:
+        """Run one tick over the given stocks (every target stock if None)"""
+        with self._evaluating:
+            started = time.perf_counter()
+            active = self._refresh_plans()
+
+            plans = self._plans
+            if stock_ids is not None:
+                plans = {stock_id: plans[stock_id] for stock_id in set(stock_ids) if stock_id in plans}
+
+            stocks = self.storage.get_stocks_by_ids(list(plans))
+            requests = 0
+            computations = 0
+            signals = []
+            fired = []
+
+            for stock_id, plan in plans.items():
+                stock = stocks.get(stock_id)
+                requests += plan.requests
+
+                values, computed = self._latest_values(stock_id, stock, plan.operands)
+                computations += computed
+                if values is None:
+                    continue
+
+                for strategy, compiled in plan.strategies:
+                    signal = self._step(strategy, compiled, stock_id, values)
+                    if signal is not None:
+                        signals.append(signal)
+                        fired.append((signal, strategy, compiled, stock))
+
+            self._send_notifications(fired)
+            if self.trader is not None and fired:
+                self.trader.execute(fired)
+
+            report = TickReport(len(plans), active, requests, computations, signals,
+                                (time.perf_counter() - started) * 1000)
+            self.ticks += 1
+            self.last_report = report
+            self._latencies.append(report.latency_ms)
+
+        logger.debug(f"Evaluated {report.strategies} strategies on {report.stocks} stocks in "
+                     f"{report.latency_ms:.1f} ms: {computations} indicator computations for "
+                     f"{requests} requests, {len(signals)} signals")
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        """Tick count, open signals and per-tick latency over recent ticks"""
+        latencies = sorted(self._latencies)
+        if not latencies:
+            return {"ticks": self.ticks, "openSignals": len(self._open)}
+
+        return {
+            "ticks": self.ticks,
+            "openSignals": len(self._open),
+            "lastLatencyMs": round(self.last_report.latency_ms, 3),
+            "meanLatencyMs": round(sum(latencies) / len(latencies), 3),
+            "p95LatencyMs": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+            "maxLatencyMs": round(latencies[-1], 3)
+        }
+
+    def _refresh_plans(self) -> int:
+        """Regroup the active strategies by target stock if any changed; returns their count"""
+        strategies = self.storage.get_active_strategies()
+        versions = [(strategy.id, strategy.updatedAt) for strategy in strategies]
+        if versions == self._versions:
+            return len(strategies)
+
+        plans: Dict[str, _StockPlan] = {}
+        for strategy in strategies:
+            compiled = self._compile(strategy)
+            if compiled is None:
+                continue
+            for stock_id in strategy.targetStocks:
+                plan = plans.get(stock_id)
+                if plan is None:
+                    plan = plans[stock_id] = _StockPlan()
+                plan.add(strategy, compiled)
+
+        # Signals of strategies since deactivated or deleted are dropped
+        active = {strategy.id for strategy in strategies}
+        for key in [key for key in self._open if key[0] not in active]:
+            del self._open[key]
+
+        self._plans = plans
+        self._versions = versions
+        return len(strategies)
+
+    def _compile(self, strategy: Any) -> Optional[CompiledStrategy]:
+        """A strategy's compiled form, or None (logged once) if it doesn't compile"""
+        try:
+            return self.storage.get_compiled_strategy(strategy.id)
+        except ValueError as e:
+            if self._invalid.get(strategy.id) != strategy.updatedAt:
+                self._invalid[strategy.id] = strategy.updatedAt
+                logger.warning(f"Skipping strategy {strategy.id} in evaluation: {str(e)}")
+            return None
+
+    def _latest_values(self, stock_id: str, stock: Any,
+                       operands: Iterable[Operand]) -> Tuple[Optional[Dict[Operand, float]], int]:
+        """The latest value of each operand (and of PRICE) for a stock, and the indicators computed"""
+        history = self.storage.get_stock_historical_data(stock_id, start_date=datetime.min)
+
+        price = getattr(stock, "currentPrice", None)
+        if price is None:
+            if not len(history):
+                return None, 0
+            price = history.close[-1]
+
+        values = {PRICE: float(price)}
+        outputs: Dict[Tuple[str, Tuple], Optional[Tuple[np.ndarray, ...]]] = {}
+        for operand in operands:
+            kind = operand[0]
+            if kind == "PRICE":
+                continue
+            if kind == "FUNDAMENTAL":
+                value = getattr(stock, operand[1], None)
+                values[operand] = math.nan if value is None else float(value)
+            else:
+                _, name, params, output = operand
+                if (name, params) not in outputs:
+                    outputs[name, params] = (
+                        self.cache.get(stock_id, name, dict(params), history) if len(history) else None
+                    )
+                columns = outputs[name, params]
+                values[operand] = float(columns[output][-1]) if columns is not None else math.nan
+
+        return values, len(outputs)
+
+    def _step(self, strategy: Any, compiled: CompiledStrategy, stock_id: str,
+              values: Dict[Operand, float]) -> Optional[Signal]:
+        """Check one strategy on one stock, updating its open signal"""
+        key = (strategy.id, stock_id)
+        price = values[PRICE]
+        position = self._open.get(key)
+
+        if position is None:
+            if not compiled.check_entry(values):
+                return None
+            self._open[key] = _OpenSignal(price)
+            return Signal(strategy.id, strategy.userId, stock_id, "BUY", price, "SIGNAL")
+
+        position.peak = max(position.peak, price)
+        reason = _exit_reason(compiled.price_exits, position, price)
+        if reason is None and compiled.check_exit(values):
+            reason = "SIGNAL"
+        if reason is None:
+            return None
+
+        del self._open[key]
+        return Signal(strategy.id, strategy.userId, stock_id, "SELL", price, reason)
+
+    def _send_notifications(self, fired: List[Tuple[Signal, Any, CompiledStrategy, Any]]):
+        """Create a STRATEGY notification for each signal, per the user's settings, in one write"""
+        enabled: Dict[str, bool] = {}
+        notifications = []
+        for signal, strategy, _, stock in fired:
+            if signal.user_id not in enabled:
+                settings = self.storage.get_notification_settings(signal.user_id) or {}
+                enabled[signal.user_id] = settings.get("tradingSignals", True)
+            if not enabled[signal.user_id]:
+                continue
+
+            name = f"{stock.name} ({stock.symbol})" if stock is not None else signal.stock_id
+            if signal.side == "BUY":
+                message = f"Your '{strategy.name}' has triggered a buy signal for {name}"
+            else:
+                reason = signal.reason.replace("_", " ").lower()
+                message = f"Your '{strategy.name}' has triggered a sell signal ({reason}) for {name}"
+
+            notifications.append({
+                "userId": signal.user_id,
+                "title": "Strategy Alert",
+                "message": message,
+                "type": "STRATEGY",
+                "relatedEntityId": strategy.id
+            })
+
+        if notifications:
+            self.storage.create_notifications(notifications)
@@ -0,0 +1,724 @@
+"""
+Technical indicators for StockVisionPro API
+
+Three layers:
+
+- Full-series functions (sma, ema, rsi, macd, bollinger, atr,
+  rolling_high, rolling_low) over NumPy arrays. Each returns arrays
+  aligned with its input, NaN for bars before it has enough history.
+- Incremental states that take one bar at a time in O(1) (amortized
+  for the rolling high/low), for bars that arrive after a full
+  computation.
+- IndicatorCache, an LRU memo of indicator results keyed by
+  (stockId, indicator, params). The shared indicator_cache instance is
+  used by the backtester, the strategy evaluator and the API, so they
+  compute each indicator once and extend it as bars are appended.
+"""
+
+import logging
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from python_server.data.historical import HistoricalWindow
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Largest growth factor allowed inside one block of exponential_filter;
+# far from float64 overflow, and rounding stays relative to the output
+_MAX_BLOCK_GROWTH = 1e100
+
+NAN = float("nan")
+
+
+def exponential_filter(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """Compute y[t] = (1 - alpha) * y[t - 1] + alpha * values[t], with y[-1] = initial
+
+    The recursion is unrolled in blocks: within a block each output is a
+    decayed cumulative sum, so the work is a handful of NumPy passes per
+    block instead of a Python loop per bar. Blocks are short enough that
+    the decay weights stay well inside float64 range.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.empty_like(values)
+    if not len(values):
+        return result
+
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        result[:] = values
+        return result
+
+    block = max(1, int(math.log(_MAX_BLOCK_GROWTH) / -math.log(decay)))
+    steps = np.arange(1, min(block, len(values)) + 1, dtype=np.float64)
+    growth = decay ** -steps
+    shrink = decay ** steps
+
+    previous = initial
+    for lo in range(0, len(values), block):
+        chunk = values[lo:lo + block]
+        size = len(chunk)
+        sums = np.cumsum(chunk * growth[:size]) * alpha
+        result[lo:lo + size] = (previous + sums) * shrink[:size]
+        previous = result[lo + size - 1]
+
+    return result
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average over period bars"""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if period < 1 or len(values) < period:
+        return result
+
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    result[period - 1:] = (sums[period:] - sums[:-period]) / period
+    return result
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """Exponential moving average, seeded with the SMA of the first period bars"""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if period < 1 or len(values) < period:
+        return result
+
+    seed = values[:period].mean()
+    result[period - 1] = seed
+    result[period:] = exponential_filter(values[period:], 2.0 / (period + 1), seed)
+    return result
+
+
+def _wilder_averages(values: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Wilder-smoothed average gain and loss, from bar period onwards"""
+    changes = np.diff(values)
+    gains = np.maximum(changes, 0.0)
+    losses = np.maximum(-changes, 0.0)
+
+    # Averages start from the mean of the first period changes
+    alpha = 1.0 / period
+    avg_gain = np.empty(len(changes) - period + 1)
+    avg_loss = np.empty_like(avg_gain)
+    avg_gain[0] = gains[:period].mean()
+    avg_loss[0] = losses[:period].mean()
+    avg_gain[1:] = exponential_filter(gains[period:], alpha, avg_gain[0])
+    avg_loss[1:] = exponential_filter(losses[period:], alpha, avg_loss[0])
+    return avg_gain, avg_loss
+
+
+def _strength(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    """RSI from average gain and loss"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        strength = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    # No losses at all reads as 100; a flat window reads as neutral
+    strength[avg_loss == 0.0] = 100.0
+    strength[(avg_loss == 0.0) & (avg_gain == 0.0)] = 50.0
+    return strength
+
+
+def rsi(values: np.ndarray, period: int) -> np.ndarray:
+    """Relative Strength Index with Wilder's smoothing"""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if period < 1 or len(values) <= period:
+        return result
+
+    result[period:] = _strength(*_wilder_averages(values, period))
+    return result
+
+
+def macd(values: np.ndarray, fast_period: int, slow_period: int,
+         signal_period: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line, signal line and histogram"""
+    values = np.asarray(values, dtype=np.float64)
+    line = ema(values, fast_period) - ema(values, slow_period)
+
+    # The signal line smooths the MACD line from its first defined bar
+    signal = np.full(len(values), np.nan)
+    first = max(fast_period, slow_period) - 1
+    if len(values) > first:
+        signal[first:] = ema(line[first:], signal_period)
+
+    return line, signal, line - signal
+
+
+def bollinger(values: np.ndarray, period: int,
+              std_dev: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger Bands: middle (SMA), upper and lower bands std_dev deviations away"""
+    values = np.asarray(values, dtype=np.float64)
+    middle = sma(values, period)
+    deviation = np.full(len(values), np.nan)
+    if period >= 1 and len(values) >= period:
+        deviation[period - 1:] = sliding_window_view(values, period).std(axis=1)
+
+    return middle, middle + std_dev * deviation, middle - std_dev * deviation
+
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range of each bar; the first bar has no previous close"""
+    previous = np.concatenate(([np.nan], close[:-1]))
+    with np.errstate(invalid="ignore"):
+        ranges = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+    return ranges
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    """Average True Range with Wilder's smoothing"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    result = np.full(len(close), np.nan)
+    if period < 1 or len(close) < period:
+        return result
+
+    ranges = _true_range(high, low, close)
+    seed = ranges[:period].mean()
+    result[period - 1] = seed
+    result[period:] = exponential_filter(ranges[period:], 1.0 / period, seed)
+    return result
+
+
+def rolling_high(values: np.ndarray, period: int) -> np.ndarray:
+    """Highest value of the last period bars"""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if period >= 1 and len(values) >= period:
+        result[period - 1:] = sliding_window_view(values, period).max(axis=1)
+    return result
+
+
+def rolling_low(values: np.ndarray, period: int) -> np.ndarray:
+    """Lowest value of the last period bars"""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    if period >= 1 and len(values) >= period:
+        result[period - 1:] = sliding_window_view(values, period).min(axis=1)
+    return result
+
+
+class IncrementalIndicator(ABC):
+    """Indicator state that advances one bar at a time
+
+    from_history() builds the state a full-series computation ends in;
+    update() then takes each new bar and returns the indicator's outputs
+    for it, matching what the full-series function would produce.
+    """
+
+    @classmethod
+    @abstractmethod
+    def from_history(cls, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                     **params) -> "IncrementalIndicator":
+        """Build the state a full-series computation over the history ends in"""
+
+    @abstractmethod
+    def update(self, high: float, low: float, close: float) -> Tuple[float, ...]:
+        """Advance by one bar and return the indicator's outputs for it"""
+
+
+class SMAState(IncrementalIndicator):
+    """Running sum over the last period closes"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+
+    @classmethod
+    def from_history(cls, high, low, close, period):
+        state = cls(period)
+        state.window.extend(close[-period:].tolist())
+        state.total = float(sum(state.window))
+        return state
+
+    def push(self, value: float) -> float:
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+        return self.total / self.period if len(self.window) == self.period else NAN
+
+    def update(self, high, low, close):
+        return (self.push(close),)
+
+
+class EMAState(IncrementalIndicator):
+    """Last EMA value, or the running seed sum until period values are seen"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = NAN
+
+    @classmethod
+    def from_history(cls, high, low, close, period):
+        state = cls(period)
+        state.count = len(close)
+        if state.count >= period:
+            state.value = float(ema(close, period)[-1])
+        else:
+            state.seed_total = float(np.sum(close))
+        return state
+
+    def push(self, value: float) -> float:
+        self.count += 1
+        if self.count < self.period:
+            self.seed_total += value
+        elif self.count == self.period:
+            self.value = (self.seed_total + value) / self.period
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+    def update(self, high, low, close):
+        return (self.push(close),)
+
+
+class RSIState(IncrementalIndicator):
+    """Wilder average gain and loss plus the previous close"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.previous = None
+        self.changes = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    @classmethod
+    def from_history(cls, high, low, close, period):
+        state = cls(period)
+        if not len(close):
+            return state
+
+        state.previous = float(close[-1])
+        state.changes = len(close) - 1
+        if state.changes >= period:
+            avg_gain, avg_loss = _wilder_averages(np.asarray(close, dtype=np.float64), period)
+            state.avg_gain, state.avg_loss = float(avg_gain[-1]), float(avg_loss[-1])
+        else:
+            # Seed sums of the changes seen so far
+            changes = np.diff(close)
+            state.avg_gain = float(np.maximum(changes, 0.0).sum())
+            state.avg_loss = float(np.maximum(-changes, 0.0).sum())
+        return state
+
+    def update(self, high, low, close):
+        if self.previous is None:
+            self.previous = close
+            return (NAN,)
+
+        change = close - self.previous
+        self.previous = close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self.changes += 1
+
+        if self.changes < self.period:
+            self.avg_gain += gain
+            self.avg_loss += loss
+            return (NAN,)
+        if self.changes == self.period:
+            self.avg_gain = (self.avg_gain + gain) / self.period
+            self.avg_loss = (self.avg_loss + loss) / self.period
+        else:
+            self.avg_gain += (gain - self.avg_gain) / self.period
+            self.avg_loss += (loss - self.avg_loss) / self.period
+
+        if self.avg_loss == 0.0:
+            return (50.0 if self.avg_gain == 0.0 else 100.0,)
+        return (100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss),)
+
+
+class MACDState(IncrementalIndicator):
+    """Fast and slow EMAs of the close, and the signal EMA of their difference"""
+
+    def __init__(self, fast_period: int, slow_period: int, signal_period: int):
+        self.fast = EMAState(fast_period)
+        self.slow = EMAState(slow_period)
+        self.signal = EMAState(signal_period)
+        self.first = max(fast_period, slow_period)
+
+    @classmethod
+    def from_history(cls, high, low, close, fast_period, slow_period, signal_period):
+        state = cls(fast_period, slow_period, signal_period)
+        state.fast = EMAState.from_history(high, low, close, fast_period)
+        state.slow = EMAState.from_history(high, low, close, slow_period)
+        line, _, _ = macd(close, fast_period, slow_period, signal_period)
+        state.signal = EMAState.from_history(None, None, line[state.first - 1:], signal_period)
+        return state
+
+    def update(self, high, low, close):
+        line = self.fast.push(close) - self.slow.push(close)
+        if self.slow.count < self.first:
+            return (NAN, NAN, NAN)
+        signal = self.signal.push(line)
+        return (line, signal, line - signal)
+
+
+class BollingerState(IncrementalIndicator):
+    """Running sum and sum of squares over the last period closes"""
+
+    def __init__(self, period: int, std_dev: float):
+        self.period = period
+        self.std_dev = std_dev
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.total_squares = 0.0
+
+    @classmethod
+    def from_history(cls, high, low, close, period, std_dev):
+        state = cls(period, std_dev)
+        state.window.extend(close[-period:].tolist())
+        state.total = float(sum(state.window))
+        state.total_squares = float(sum(value * value for value in state.window))
+        return state
+
+    def update(self, high, low, close):
+        if len(self.window) == self.period:
+            dropped = self.window[0]
+            self.total -= dropped
+            self.total_squares -= dropped * dropped
+        self.window.append(close)
+        self.total += close
+        self.total_squares += close * close
+
+        if len(self.window) < self.period:
+            return (NAN, NAN, NAN)
+
+        middle = self.total / self.period
+        deviation = math.sqrt(max(self.total_squares / self.period - middle * middle, 0.0))
+        return (middle, middle + self.std_dev * deviation, middle - self.std_dev * deviation)
+
+
+class ATRState(IncrementalIndicator):
+    """Wilder-smoothed true range plus the previous close"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.previous = None
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = NAN
+
+    @classmethod
+    def from_history(cls, high, low, close, period):
+        state = cls(period)
+        state.count = len(close)
+        if not state.count:
+            return state
+
+        state.previous = float(close[-1])
+        if state.count >= period:
+            state.value = float(atr(high, low, close, period)[-1])
+        else:
+            state.seed_total = float(_true_range(high, low, close).sum())
+        return state
+
+    def update(self, high, low, close):
+        if self.previous is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.previous), abs(low - self.previous))
+        self.previous = close
+        self.count += 1
+
+        if self.count < self.period:
+            self.seed_total += true_range
+        elif self.count == self.period:
+            self.value = (self.seed_total + true_range) / self.period
+        else:
+            self.value += (true_range - self.value) / self.period
+        return (self.value,)
+
+
+class RollingExtremeState(IncrementalIndicator):
+    """Monotonic deque of (bar, value) candidates for a rolling max or min"""
+
+    # Set on subclasses: the bar column to read, and whether to keep the max
+    column = "high"
+    keep_max = True
+
+    def __init__(self, period: int):
+        self.period = period
+        self.index = 0
+        self.candidates = deque()
+
+    @classmethod
+    def from_history(cls, high, low, close, period):
+        state = cls(period)
+        values = high if cls.column == "high" else low
+        start = max(0, len(values) - period)
+        state.index = start
+        for value in values[start:].tolist():
+            state.push(value)
+        return state
+
+    def push(self, value: float) -> float:
+        candidates = self.candidates
+        if self.keep_max:
+            while candidates and candidates[-1][1] <= value:
+                candidates.pop()
+        else:
+            while candidates and candidates[-1][1] >= value:
+                candidates.pop()
+        candidates.append((self.index, value))
+
+        if candidates[0][0] <= self.index - self.period:
+            candidates.popleft()
+        self.index += 1
+        return candidates[0][1] if self.index >= self.period else NAN
+
+    def update(self, high, low, close):
+        return (self.push(high if self.column == "high" else low),)
+
+
+class RollingHighState(RollingExtremeState):
+    column = "high"
+    keep_max = True
+
+
+class RollingLowState(RollingExtremeState):
+    column = "low"
+    keep_max = False
+
+
+class IndicatorSpec(NamedTuple):
+    """How to compute one indicator"""
+    defaults: Dict[str, Any]
+    outputs: Tuple[str, ...]
+    compute: Callable[..., Tuple[np.ndarray, ...]]
+    state: Type[IncrementalIndicator]
+
+
+# Indicator name -> spec; compute and state take the bar columns plus the params
+INDICATORS: Dict[str, IndicatorSpec] = {
+    "SMA": IndicatorSpec(
+        {"period": 20}, ("value",),
+        lambda high, low, close, period: (sma(close, period),), SMAState),
+    "EMA": IndicatorSpec(
+        {"period": 20}, ("value",),
+        lambda high, low, close, period: (ema(close, period),), EMAState),
+    "RSI": IndicatorSpec(
+        {"period": 14}, ("value",),
+        lambda high, low, close, period: (rsi(close, period),), RSIState),
+    "MACD": IndicatorSpec(
+        {"fast_period": 12, "slow_period": 26, "signal_period": 9}, ("macd", "signal", "histogram"),
+        lambda high, low, close, **params: macd(close, **params), MACDState),
+    "BOLLINGER": IndicatorSpec(
+        {"period": 20, "std_dev": 2.0}, ("middle", "upper", "lower"),
+        lambda high, low, close, **params: bollinger(close, **params), BollingerState),
+    "ATR": IndicatorSpec(
+        {"period": 14}, ("value",),
+        lambda high, low, close, period: (atr(high, low, close, period),), ATRState),
+    "ROLLING_HIGH": IndicatorSpec(
+        {"period": 20}, ("value",),
+        lambda high, low, close, period: (rolling_high(high, period),), RollingHighState),
+    "ROLLING_LOW": IndicatorSpec(
+        {"period": 20}, ("value",),
+        lambda high, low, close, period: (rolling_low(low, period),), RollingLowState)
+}
+
+# Client-facing (camelCase) parameter names
+PARAM_NAMES = {
+    "period": "period",
+    "fastPeriod": "fast_period",
+    "slowPeriod": "slow_period",
+    "signalPeriod": "signal_period",
+    "stdDev": "std_dev"
+}
+
+
+def indicator_params(name: str, params: Optional[Dict[str, Any]] = None) -> Tuple[Tuple[str, Any], ...]:
+    """Validate an indicator's params and fill in defaults, as a hashable tuple
+
+    params may use the client-facing names (fastPeriod) or the Python
+    ones (fast_period); names the indicator doesn't take are ignored.
+    """
+    spec = INDICATORS.get(name)
+    if spec is None:
+        raise ValueError(f"Unsupported indicator: {name}. Must be one of: {', '.join(INDICATORS)}")
+
+    values = dict(spec.defaults)
+    for key, value in (params or {}).items():
+        key = PARAM_NAMES.get(key, key)
+        if key in values:
+            values[key] = value
+
+    for key, value in values.items():
+        if key == "std_dev":
+            values[key] = float(value)
+            if not values[key] > 0:
+                raise ValueError(f"{name} stdDev must be positive")
+        else:
+            if isinstance(value, bool) or not float(value).is_integer():
+                raise ValueError(f"{name} {key} must be a whole number")
+            values[key] = int(value)
+            if values[key] < 1:
+                raise ValueError(f"{name} {key} must be positive")
+
+    return tuple(sorted(values.items()))
+
+
+def _last_bar(window: HistoricalWindow) -> Tuple[Any, ...]:
+    last = len(window) - 1
+    return (window.dates[last], window.high[last], window.low[last], window.close[last])
+
+
+class _CachedIndicator:
+    """One memoized result: output columns over the bars of window
+
+    window may be a view over a live series whose last bar can be
+    corrected in place, so that bar is also kept as a copy.
+    """
+
+    __slots__ = ("window", "last_bar", "columns", "state")
+
+    def __init__(self, window: HistoricalWindow, columns: List[np.ndarray]):
+        self.window = window
+        self.last_bar = _last_bar(window) if len(window) else None
+        self.columns = columns
+        self.state: Optional[IncrementalIndicator] = None
+
+    def __len__(self) -> int:
+        return len(self.window)
+
+
+class IndicatorCache:
+    """LRU memo of indicator results keyed by (stockId, indicator, params)
+
+    A result is reused for any window that starts on the same bar as the
+    one it was computed over:
+
+    - a window that ends at or before the cached bars reads a prefix,
+      since every indicator here depends only on earlier bars;
+    - a window with bars appended after the cached ones advances the
+      cached incremental state one bar at a time;
+    - anything else (a different first bar, a corrected last bar) is
+      recomputed in full.
+
+    Results are returned as read-only views. The cache is thread-safe,
+    and concurrent requests for the same key compute it once.
+    """
+
+    # Appending more bars than this recomputes in full instead
+    MAX_INCREMENTAL_BARS = 64
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, Tuple], _CachedIndicator]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, stock_id: str, name: str, params: Optional[Dict[str, Any]],
+            window: HistoricalWindow) -> Tuple[np.ndarray, ...]:
+        """An indicator's outputs over window, one array per output"""
+        normalized = indicator_params(name, params)
+        key = (stock_id, name, normalized)
+        count = len(window)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._extends(entry, window):
+                self._entries.move_to_end(key)
+                if count > len(entry):
+                    self._advance(entry, INDICATORS[name], normalized, window)
+                    self.updates += 1
+                else:
+                    self.hits += 1
+            else:
+                entry = self._compute(INDICATORS[name], normalized, window)
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                self.misses += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+            outputs = []
+            for column in entry.columns:
+                view = column[:count]
+                view.flags.writeable = False
+                outputs.append(view)
+            return tuple(outputs)
+
+    def invalidate(self, stock_id: Optional[str] = None):
+        """Drop the cached results of one stock, or of every stock"""
+        with self._lock:
+            if stock_id is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == stock_id]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits,
+                "misses": self.misses, "updates": self.updates}
+
+    def _extends(self, entry: _CachedIndicator, window: HistoricalWindow) -> bool:
+        """Whether window shares its first bars with the cached window"""
+        cached = entry.window
+        if not len(window) or not len(cached):
+            return False
+
+        if len(window) > len(cached) + self.MAX_INCREMENTAL_BARS:
+            return False
+        if window.dates[0] != cached.dates[0]:
+            return False
+
+        # The last bar the two windows have in common must be unchanged
+        shared = min(len(window), len(cached)) - 1
+        if shared < len(cached) - 1:
+            expected = (cached.dates[shared], cached.high[shared], cached.low[shared], cached.close[shared])
+        else:
+            expected = entry.last_bar
+        actual = (window.dates[shared], window.high[shared], window.low[shared], window.close[shared])
+        return actual == expected
+
+    def _compute(self, spec: IndicatorSpec, params: Tuple, window: HistoricalWindow) -> _CachedIndicator:
+        """Full-series computation, with room to append bars"""
+        outputs = spec.compute(window.high, window.low, window.close, **dict(params))
+        capacity = len(window) + self.MAX_INCREMENTAL_BARS
+        columns = []
+        for output in outputs:
+            column = np.empty(capacity)
+            column[:len(window)] = output
+            columns.append(column)
+        return _CachedIndicator(window, columns)
+
+    def _advance(self, entry: _CachedIndicator, spec: IndicatorSpec, params: Tuple,
+                 window: HistoricalWindow):
+        """Extend a cached result over the bars window adds"""
+        start, count = len(entry), len(window)
+        if entry.state is None:
+            cached = entry.window
+            entry.state = spec.state.from_history(cached.high, cached.low, cached.close, **dict(params))
+
+        if count > len(entry.columns[0]):
+            for position, column in enumerate(entry.columns):
+                grown = np.empty(max(count, len(column) * 2))
+                grown[:start] = column[:start]
+                entry.columns[position] = grown
+
+        bars = zip(window.high[start:].tolist(), window.low[start:].tolist(), window.close[start:].tolist())
+        for bar, (high, low, close) in enumerate(bars, start):
+            for column, value in zip(entry.columns, entry.state.update(high, low, close)):
+                column[bar] = value
+
+        entry.window = window
+        entry.last_bar = _last_bar(window)
+
+
+# The cache shared by everything in this process
+indicator_cache = IndicatorCache()
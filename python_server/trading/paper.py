@@ -0,0 +1,128 @@
+"""
+Paper trading for StockVisionPro API
+
+PaperTrader turns the signals of a live evaluation tick into simulated
+trades on the strategy owners' accounts: Transaction rows, Portfolio
+updates and account balance changes.
+
+- An entry signal buys the stock with a slot of the user's account
+  balance: riskManagement.maxPositionSize percent, capped at an equal
+  share across the strategy's target stocks (the backtest's sizing).
+- An exit signal, including the evaluator's stop-loss, trailing stop and
+  price target exits, sells the quantity the strategy bought.
+- All of a tick's trades go to storage.apply_trades() as one batch, so
+  they commit in one grouped write.
+
+Each strategy's open positions and running results are kept in its
+performanceMetrics["live"], updated by apply_fill() as trades complete.
+A position whose shares have left the portfolio some other way, such as
+a manual sale, is dropped by drop_position() when its exit fails, so the
+strategy can buy the stock again.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from python_server.trading.conditions import CompiledStrategy
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def apply_fill(metrics: Dict[str, Any], side: str, stock_id: str, quantity: float, price: float,
+               when: datetime):
+    """Update a strategy's live performance metrics with one completed trade"""
+    positions = metrics.setdefault("positions", {})
+
+    if side == "BUY":
+        positions[stock_id] = {"quantity": quantity, "entryPrice": price, "entryDate": when.isoformat()}
+    else:
+        position = positions.pop(stock_id, None)
+        if position is not None:
+            profit_loss = quantity * (price - position["entryPrice"])
+            metrics["trades"] = metrics.get("trades", 0) + 1
+            metrics["wins"] = metrics.get("wins", 0) + (1 if profit_loss > 0 else 0)
+            metrics["winRate"] = metrics["wins"] / metrics["trades"] * 100
+            metrics["realizedProfitLoss"] = metrics.get("realizedProfitLoss", 0.0) + profit_loss
+
+    metrics["openPositions"] = len(positions)
+    metrics["lastTradeAt"] = when.isoformat()
+
+
+def drop_position(metrics: Dict[str, Any], stock_id: str):
+    """Forget a live position the portfolio no longer holds, without counting a trade"""
+    positions = metrics.get("positions", {})
+    if positions.pop(stock_id, None) is not None:
+        metrics["openPositions"] = len(positions)
+
+
+class PaperTrader:
+    """Executes evaluator signals as simulated trades"""
+
+    def __init__(self, storage: Any):
+        self.storage = storage
+
+    def execute(self, fired: List[Tuple[Any, Any, CompiledStrategy, Any]]) -> List[Any]:
+        """Trade one tick's (signal, strategy, compiled, stock) tuples; returns the transactions"""
+        trades = []
+        # Cash at the start of the tick, and what this tick's buys leave of it
+        balances: Dict[str, Tuple[float, float]] = {}
+
+        for signal, strategy, compiled, stock in fired:
+            # The stored row, whose metrics earlier ticks' trades have updated
+            strategy = self.storage.get_strategy(strategy.id) or strategy
+            positions = strategy.performanceMetrics.get("live", {}).get("positions", {})
+            symbol = stock.symbol if stock is not None else signal.stock_id
+            notes = f"Paper trade by strategy '{strategy.name}' ({signal.reason.replace('_', ' ').lower()})"
+
+            if signal.side == "BUY":
+                if signal.stock_id in positions:
+                    continue
+
+                if signal.user_id not in balances:
+                    user = self.storage.get_user(signal.user_id)
+                    if user is None:
+                        continue
+                    balances[signal.user_id] = (user.accountBalance, user.accountBalance)
+                start_balance, available = balances[signal.user_id]
+
+                amount = min(available, start_balance * self._position_share(strategy, compiled))
+                if not amount > 0 or not signal.price > 0:
+                    logger.info(f"Skipping paper buy of {symbol} for {strategy.id}: no cash available")
+                    continue
+
+                balances[signal.user_id] = (start_balance, available - amount)
+                quantity = amount / signal.price
+            else:
+                position = positions.get(signal.stock_id)
+                if position is None:
+                    continue
+                quantity = position["quantity"]
+
+            trades.append({
+                "userId": signal.user_id,
+                "stockId": signal.stock_id,
+                "strategyId": strategy.id,
+                "type": signal.side,
+                "quantity": quantity,
+                "price": signal.price,
+                "notes": notes
+            })
+
+        if not trades:
+            return []
+
+        transactions = self.storage.apply_trades(trades)
+
+        failed = sum(1 for transaction in transactions if transaction.status != "COMPLETED")
+        logger.info(f"Executed {len(transactions) - failed} paper trades ({failed} failed)")
+        return transactions
+
+    @staticmethod
+    def _position_share(strategy: Any, compiled: CompiledStrategy) -> float:
+        """Fraction of the account balance one position may use"""
+        share = 1 / max(1, len(strategy.targetStocks))
+        if compiled.max_position:
+            share = min(share, compiled.max_position / 100)
+        return share
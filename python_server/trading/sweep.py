@@ -0,0 +1,391 @@
+"""
+Parameter sweeps and walk-forward optimization for StockVisionPro API
+
+A sweep expands a grid of strategy parameters into every combination and
+backtests each one in a process pool. The target stocks' bars are copied
+once into a shared memory block that every worker maps, so tasks only
+carry parameter values, never price arrays.
+
+Grid keys are dotted paths into the strategy definition. A list field is
+addressed by position or by the indicator the items refer to:
+
+- "riskManagement.stopLossPercent"
+- "indicators.RSI.period"          (every indicator of type RSI)
+- "exitConditions.TRAILING_STOP.value"
+- "entryConditions.1.value"
+
+With walk-forward enabled the date range is split into rolling train/test
+folds: every combination is backtested on a fold's train bars, and the
+best one by the objective is then backtested on the following test bars.
+
+Results are yielded as events while the pool works, so callers can
+stream them.
+"""
+
+import itertools
+import logging
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from copy import deepcopy
+from datetime import datetime
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from python_server.data.historical import DATE_DTYPE, HistoricalWindow, to_day
+from python_server.data.records import StrategyRecord
+from python_server.trading.backtest import run_backtest
+from python_server.trading.conditions import compile_strategy
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Largest grid a single sweep may expand to
+MAX_COMBINATIONS = 5000
+
+# Summary metrics a sweep can optimize, with 1 to maximize and -1 to minimize
+OBJECTIVES = {
+    "sharpeRatio": 1,
+    "totalReturn": 1,
+    "annualizedReturn": 1,
+    "winRate": 1,
+    "finalCapital": 1,
+    "maxDrawdown": -1
+}
+
+# Tasks queued per worker, so that slow chunks don't leave cores idle
+CHUNKS_PER_WORKER = 4
+
+# Strategy fields a grid path may start with
+SWEEPABLE_FIELDS = ("indicators", "entryConditions", "exitConditions", "riskManagement")
+
+Period = Tuple[np.datetime64, np.datetime64]
+
+
+def _set_parameter(definition: Dict[str, Any], path: str, value: Any):
+    """Set the value a dotted grid path addresses in a strategy definition"""
+    field, _, rest = path.partition(".")
+    if field not in SWEEPABLE_FIELDS or not rest:
+        raise ValueError(f"Invalid sweep parameter: {path}")
+
+    if field == "riskManagement":
+        definition[field][rest] = value
+        return
+
+    selector, _, key = rest.partition(".")
+    if not key:
+        raise ValueError(f"Invalid sweep parameter: {path}")
+
+    items = definition[field]
+    if selector.isdigit():
+        if int(selector) >= len(items):
+            raise ValueError(f"Invalid sweep parameter: {path} (no item {selector})")
+        targets = [items[int(selector)]]
+    else:
+        name_key = "type" if field == "indicators" else "indicator"
+        targets = [item for item in items if str(item.get(name_key, "")).upper() == selector.upper()]
+        if not targets:
+            raise ValueError(f"Invalid sweep parameter: {path} (no {selector} in {field})")
+
+    for item in targets:
+        item[key] = value
+
+
+def expand_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Every combination of a parameter grid, as {path: value} dicts"""
+    if not grid:
+        return [{}]
+
+    paths = list(grid)
+    for path in paths:
+        if not isinstance(grid[path], (list, tuple)) or not grid[path]:
+            raise ValueError(f"Sweep parameter {path} needs a non-empty list of values")
+
+    count = math.prod(len(grid[path]) for path in paths)
+    if count > MAX_COMBINATIONS:
+        raise ValueError(f"Sweep grid has {count} combinations; the limit is {MAX_COMBINATIONS}")
+
+    return [dict(zip(paths, values)) for values in itertools.product(*(grid[path] for path in paths))]
+
+
+def apply_parameters(definition: Dict[str, Any], parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """A copy of a strategy definition with grid parameters applied"""
+    definition = deepcopy(definition)
+    for path, value in parameters.items():
+        _set_parameter(definition, path, value)
+    return definition
+
+
+def walk_forward_periods(dates: np.ndarray, train_days: int, test_days: int) -> List[Tuple[Period, Period]]:
+    """Rolling (train, test) date ranges over trading days
+
+    Each fold trains on train_days bars and tests on the next test_days
+    bars; the next fold starts test_days later.
+    """
+    if train_days < 2 or test_days < 1:
+        raise ValueError("Walk-forward needs at least 2 train days and 1 test day")
+
+    folds = []
+    for lo in range(0, len(dates) - train_days - test_days + 1, test_days):
+        train = (dates[lo], dates[lo + train_days - 1])
+        test = (dates[lo + train_days], dates[lo + train_days + test_days - 1])
+        folds.append((train, test))
+
+    if not folds:
+        raise ValueError(f"Date range has {len(dates)} trading days, fewer than one walk-forward fold")
+
+    return folds
+
+
+class SharedBars:
+    """OHLCV windows copied into one shared memory block
+
+    The block holds six columns of total_rows values each (dates as int64
+    days, four float64 prices, int64 volume); each stock owns a row range
+    in every column. layout is what a worker needs to map it again.
+    """
+
+    COLUMNS = ("dates", "open", "high", "low", "close", "volume")
+
+    def __init__(self, windows: Sequence[HistoricalWindow]):
+        ranges = []
+        total_rows = 0
+        for window in windows:
+            ranges.append((window.stock_id, total_rows, len(window)))
+            total_rows += len(window)
+
+        self.memory = SharedMemory(create=True, size=max(1, total_rows * 8 * len(self.COLUMNS)))
+        self.layout = (self.memory.name, total_rows, ranges)
+
+        columns = self._columns(self.memory, total_rows)
+        for window, (_, lo, count) in zip(windows, ranges):
+            columns["dates"][lo:lo + count] = window.dates.astype("int64")
+            for name in self.COLUMNS[1:]:
+                columns[name][lo:lo + count] = getattr(window, name)
+
+    @classmethod
+    def _columns(cls, memory: SharedMemory, total_rows: int) -> Dict[str, np.ndarray]:
+        """Column arrays over a shared memory block"""
+        columns = {}
+        for position, name in enumerate(cls.COLUMNS):
+            dtype = np.float64 if name in ("open", "high", "low", "close") else np.int64
+            columns[name] = np.ndarray(total_rows, dtype=dtype, buffer=memory.buf,
+                                       offset=position * total_rows * 8)
+        return columns
+
+    @classmethod
+    def attach(cls, layout: Tuple[str, int, List[Tuple[str, int, int]]]) -> Tuple[SharedMemory, List[HistoricalWindow]]:
+        """Map the block from another process, as one window per stock"""
+        name, total_rows, ranges = layout
+        memory = SharedMemory(name=name)
+
+        columns = cls._columns(memory, total_rows)
+        columns["dates"] = columns["dates"].view(DATE_DTYPE)
+
+        windows = [
+            HistoricalWindow(stock_id, *(columns[column][lo:lo + count] for column in cls.COLUMNS))
+            for stock_id, lo, count in ranges
+        ]
+        return memory, windows
+
+    def release(self):
+        """Free the block once no worker needs it"""
+        self.memory.close()
+        self.memory.unlink()
+
+
+def _window_until(window: HistoricalWindow, end: np.datetime64) -> HistoricalWindow:
+    """Zero-copy view of a window's bars up to and including end"""
+    hi = int(np.searchsorted(window.dates, end, side="right"))
+    return HistoricalWindow(window.stock_id, window.dates[:hi], window.open[:hi], window.high[:hi],
+                            window.low[:hi], window.close[:hi], window.volume[:hi])
+
+
+# Per-worker state, set up once by _init_worker
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(layout: Tuple[str, int, List[Tuple[str, int, int]]], stocks: Dict[str, Any],
+                 initial_capital: float):
+    memory, windows = SharedBars.attach(layout)
+    _worker_state.update(memory=memory, windows=windows, stocks=stocks, initial_capital=initial_capital)
+
+
+def _run_chunk(definition: Dict[str, Any], chunk: List[Tuple[int, Dict[str, Any]]],
+               period: Period) -> List[Tuple[int, Dict[str, Any]]]:
+    """Backtest each (index, parameters) combination over one period"""
+    start, end = period
+    windows = [_window_until(window, end) for window in _worker_state["windows"]]
+
+    results = []
+    for index, parameters in chunk:
+        strategy = StrategyRecord.from_dict(apply_parameters(definition, parameters))
+        result = run_backtest(strategy, windows, _worker_state["stocks"], start,
+                              _worker_state["initial_capital"])
+        results.append((index, result.summary()))
+    return results
+
+
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for lo in range(0, len(items), size):
+        yield items[lo:lo + size]
+
+
+def _period_dict(period: Period) -> Dict[str, str]:
+    return {"startDate": str(period[0]), "endDate": str(period[1])}
+
+
+def run_sweep(storage: Any, strategy: Any, grid: Dict[str, Sequence[Any]],
+              start_date: datetime, end_date: datetime, initial_capital: float,
+              objective: str = "sharpeRatio", walk_forward: Optional[Dict[str, int]] = None,
+              max_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Backtest every combination of a parameter grid, yielding events as they finish
+
+    Events are dicts with a "type":
+
+    - "start": the combination and fold counts
+    - "result": one combination's metrics for a phase ("full", "train" or "test")
+    - "fold": a walk-forward fold's chosen parameters and test metrics
+    - "done": the best combination (full sweeps) or every fold (walk-forward)
+
+    The grid, objective and walk-forward settings are checked before the
+    first event, so errors in them raise ValueError from the first next().
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Invalid objective. Must be one of: {', '.join(OBJECTIVES)}")
+    if end_date < start_date:
+        raise ValueError("End date must not be before start date")
+    if not initial_capital > 0:
+        raise ValueError("Initial capital must be positive")
+    if walk_forward is not None and not isinstance(walk_forward, dict):
+        raise ValueError("walkForward must be an object with trainDays and testDays")
+
+    definition = strategy.model_dump()
+    combinations = expand_grid(grid)
+    for parameters in combinations:
+        # Compiling every combination up front rejects invalid values before any work starts
+        combination = StrategyRecord.from_dict(apply_parameters(definition, parameters))
+        try:
+            compile_strategy(combination)
+        except ValueError as e:
+            raise ValueError(f"Invalid parameters {parameters}: {e}") from None
+
+    windows = [
+        storage.get_stock_historical_data(stock_id, end_date=end_date)
+        for stock_id in strategy.targetStocks
+    ]
+    windows = [window for window in windows if len(window)]
+    if not windows:
+        raise ValueError("No historical data for the strategy's target stocks")
+
+    start, end = to_day(start_date), to_day(end_date)
+    trading_days = np.unique(np.concatenate([window.dates for window in windows]))
+    trading_days = trading_days[trading_days >= start]
+    if not len(trading_days):
+        raise ValueError("No historical data in the date range")
+
+    if walk_forward:
+        folds = walk_forward_periods(trading_days, int(walk_forward.get("trainDays", 0)),
+                                     int(walk_forward.get("testDays", 0)))
+        phases = [(fold, "train", train) for fold, (train, _) in enumerate(folds)]
+    else:
+        folds = []
+        phases = [(None, "full", (start, end))]
+
+    sign = OBJECTIVES[objective]
+    workers = max_workers or os.cpu_count() or 1
+    chunk_size = max(1, math.ceil(len(combinations) / (workers * CHUNKS_PER_WORKER)))
+    indexed = list(enumerate(combinations))
+
+    shared = SharedBars(windows)
+    pool = None
+
+    try:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(shared.layout, storage.get_stocks_by_ids(strategy.targetStocks), initial_capital)
+        )
+
+        yield {
+            "type": "start",
+            "combinations": len(combinations),
+            "folds": len(folds),
+            "workers": workers
+        }
+
+        # future -> (fold, phase)
+        pending: Dict[Future, Tuple[Optional[int], str]] = {}
+        for fold, phase, period in phases:
+            for chunk in _chunks(indexed, chunk_size):
+                pending[pool.submit(_run_chunk, definition, chunk, period)] = (fold, phase)
+
+        # Best (score, index, metrics) per fold, and train chunks still running
+        best: Dict[Optional[int], Tuple[float, int, Dict[str, Any]]] = {}
+        remaining = {fold: math.ceil(len(indexed) / chunk_size) for fold, _, _ in phases}
+        fold_results = []
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                fold, phase = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    # A combination the engine rejects ends the sweep
+                    logger.error(f"Error in sweep backtest: {str(e)}")
+                    yield {"type": "error", "details": str(e)}
+                    return
+
+                if phase == "test":
+                    score, index, train_metrics = best[fold]
+                    train, test = folds[fold]
+                    fold_result = {
+                        "type": "fold",
+                        "fold": fold,
+                        "train": _period_dict(train),
+                        "test": _period_dict(test),
+                        "parameters": combinations[index],
+                        "trainMetrics": train_metrics,
+                        "testMetrics": results[0][1]
+                    }
+                    fold_results.append(fold_result)
+                    yield fold_result
+                    continue
+
+                for index, metrics in results:
+                    yield {
+                        "type": "result",
+                        "fold": fold,
+                        "phase": phase,
+                        "parameters": combinations[index],
+                        "metrics": metrics
+                    }
+                    score = sign * metrics[objective]
+                    if fold not in best or score > best[fold][0]:
+                        best[fold] = (score, index, metrics)
+
+                # Once a fold's training is done, test its best combination
+                remaining[fold] -= 1
+                if phase == "train" and not remaining[fold]:
+                    index = best[fold][1]
+                    test = folds[fold][1]
+                    pending[pool.submit(_run_chunk, definition, [(index, combinations[index])], test)] = (fold, "test")
+
+        if walk_forward:
+            fold_results.sort(key=lambda item: item["fold"])
+            yield {"type": "done", "objective": objective, "folds": fold_results}
+        else:
+            _, index, metrics = best[None]
+            yield {
+                "type": "done",
+                "objective": objective,
+                "best": {"parameters": combinations[index], "metrics": metrics}
+            }
+
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        shared.release()
@@ -2,6 +2,7 @@
 Authentication helper utilities for StockVisionPro API
 """
 
+import hmac
 import logging
 import uuid
 from datetime import datetime, timedelta
@@ -10,7 +11,7 @@ from functools import wraps
 from typing import Dict, Any, Callable, Optional
 
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask import request, jsonify, Response, Request
+from flask import current_app, request, jsonify, Response, Request
 
 from python_server.data.storage import MemStorage
 
@@ -98,4 +99,29 @@ def jwt_required_with_storage(storage: MemStorage):
         
         return wrapper
     
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+def service_token_required(config_key: str):
+    """Service token decorator for machine-to-machine routes
+    
+    The X-Service-Token header must match the token in app.config under
+    config_key. While no token is configured the route is disabled.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            expected = current_app.config.get(config_key)
+            if not expected:
+                return jsonify({"error": "This endpoint is not enabled"}), 403
+            
+            # Constant-time comparison so the token can't be guessed byte by byte
+            provided = request.headers.get("X-Service-Token", "")
+            if not hmac.compare_digest(provided.encode("utf-8"), expected.encode("utf-8")):
+                return jsonify({"error": "Invalid service token"}), 401
+            
+            return fn(*args, **kwargs)
+        
+        return wrapper
+    
+    return decorator
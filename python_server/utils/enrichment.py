@@ -0,0 +1,56 @@
+"""
+Response enrichment helpers for StockVisionPro API
+
+Routes that list stock-related records (suggestions, holdings, watchlist
+items, transactions) attach stock details to each row. These helpers fetch
+every referenced stock in one bulk lookup instead of one lookup per row.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from models.schemas import Stock
+from python_server.data.storage import MemStorage
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Compact stock projection attached to list rows
+STOCK_SUMMARY_FIELDS = ("symbol", "name", "currentPrice", "dailyChangePercent")
+
+# Projection used by the portfolio and watchlist views
+STOCK_DETAIL_FIELDS = (
+    "symbol", "name", "currentPrice", "dailyChange",
+    "dailyChangePercent", "exchange", "sector"
+)
+
+
+def stock_summary(stock: Stock, fields: Optional[Sequence[str]] = STOCK_SUMMARY_FIELDS) -> Dict[str, Any]:
+    """Project a stock onto the given fields (all fields if None)"""
+    if fields is None:
+        return stock.model_dump()
+    return {field: getattr(stock, field) for field in fields}
+
+
+def attach_stocks(storage: MemStorage, records: List[Dict[str, Any]],
+                  fields: Optional[Sequence[str]] = STOCK_SUMMARY_FIELDS,
+                  include_missing: bool = False) -> List[Dict[str, Any]]:
+    """Attach a "stock" projection to each record dict, in place
+
+    Stocks are fetched with a single bulk lookup keyed by each record's
+    stockId. Records whose stock does not exist get "stock": None if
+    include_missing is set, and are left without the key otherwise.
+    """
+    stocks = storage.get_stocks_by_ids(record["stockId"] for record in records)
+
+    # Project each distinct stock once, however many rows reference it
+    projections = {stock_id: stock_summary(stock, fields) for stock_id, stock in stocks.items()}
+
+    for record in records:
+        projection = projections.get(record["stockId"])
+        if projection is not None:
+            record["stock"] = projection
+        elif include_missing:
+            record["stock"] = None
+
+    return records
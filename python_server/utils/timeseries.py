@@ -0,0 +1,114 @@
+"""
+Time series helpers for StockVisionPro API
+
+Vectorized resampling and downsampling of columnar OHLCV windows, so that
+long date ranges can be served with bounded payloads.
+"""
+
+import logging
+
+import numpy as np
+
+from python_server.data.historical import HistoricalWindow
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Supported aggregation intervals
+INTERVALS = ("1d", "1w", "1M")
+
+
+def _bucket_keys(dates: np.ndarray, interval: str) -> np.ndarray:
+    """Map each bar date to the key of the bucket it falls in"""
+    if interval == "1w":
+        # 1970-01-01 was a Thursday; shift so that weeks start on Monday
+        return (dates.astype("int64") + 3) // 7
+    if interval == "1M":
+        return dates.astype("datetime64[M]").astype("int64")
+    raise ValueError(f"Invalid interval. Must be one of: {', '.join(INTERVALS)}")
+
+
+def resample_window(window: HistoricalWindow, interval: str) -> HistoricalWindow:
+    """Aggregate daily bars into weekly or monthly bars
+
+    Each output bar is dated at the first trading day of its bucket and
+    takes the first open, last close, highest high, lowest low and total
+    volume of the bars in it.
+    """
+    if interval == "1d" or len(window) == 0:
+        if interval not in INTERVALS:
+            raise ValueError(f"Invalid interval. Must be one of: {', '.join(INTERVALS)}")
+        return window
+
+    keys = _bucket_keys(window.dates, interval)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.concatenate((starts[1:], [len(keys)])) - 1
+
+    return HistoricalWindow(
+        window.stock_id,
+        window.dates[starts],
+        window.open[starts],
+        np.maximum.reduceat(window.high, starts),
+        np.minimum.reduceat(window.low, starts),
+        window.close[ends],
+        np.add.reduceat(window.volume, starts)
+    )
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Pick indices of threshold points with Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept. Bucket bounds and bucket
+    averages are computed in one vectorized pass; only the per-bucket
+    choice, which depends on the previously chosen point, is sequential.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Interior points are split into threshold - 2 buckets
+    bounds = (np.floor(np.arange(threshold - 1) * ((n - 2) / (threshold - 2))) + 1).astype(np.int64)
+    bounds[-1] = n - 1
+    starts, ends = bounds[:-1], bounds[1:]
+
+    # Average of each bucket, plus the last point as the final "next bucket"
+    counts = ends - starts
+    avg_x = np.append(np.add.reduceat(x[:-1], starts) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], starts) / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+
+    for i in range(threshold - 2):
+        lo, hi = starts[i], ends[i]
+        area = np.abs(
+            (x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a]) -
+            (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def downsample_window(window: HistoricalWindow, max_points: int) -> HistoricalWindow:
+    """Thin a window to at most max_points bars, preserving the close shape"""
+    if len(window) <= max_points:
+        return window
+
+    indices = lttb_indices(window.dates.astype("int64"), window.close, max_points)
+
+    return HistoricalWindow(
+        window.stock_id,
+        window.dates[indices],
+        window.open[indices],
+        window.high[indices],
+        window.low[indices],
+        window.close[indices],
+        window.volume[indices]
+    )